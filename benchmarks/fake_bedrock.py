@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+
+from bring_a_crew_bedrock.conversation_memory import estimate_tokens
+
+
+class FakeThrottlingException(Exception):
+    """Looks like the botocore ClientError that Bedrock raises when a quota is exceeded."""
+    def __init__(self):
+        super().__init__("An error occurred (ThrottlingException) when calling the Converse operation")
+        self.response = {"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}}
+
+
+class FakeBedrockRuntime:
+    """
+    Stand-in for a bedrock-runtime client that plays canned responses, so agents run without network.
+
+    The scripts map a marker to a list of responses. The first marker found in the system prompt selects
+    the script, the number of user messages in the request selects the response. A response is either a
+    string, a list of content blocks (for instance toolUse blocks), or a callable that receives the messages
+    and returns one of those. With quota_requests_per_second set, calls above that rate fail with a
+    throttling error, like an account quota does.
+    """
+    def __init__(self, scripts: dict, latency_seconds: float = 0.0, chunk_size: int = 16,
+                 quota_requests_per_second: int = None):
+        self.scripts = scripts
+        self.latency_seconds = latency_seconds
+        self.chunk_size = chunk_size
+        self.quota_requests_per_second = quota_requests_per_second
+        self.calls = 0
+        self.throttled = 0
+        self._recent_calls = deque()
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+
+    def __respond(self, request: dict) -> str:
+        with self._lock:
+            if self.quota_requests_per_second is not None:
+                now = time.monotonic()
+                while self._recent_calls and now - self._recent_calls[0] >= 1.0:
+                    self._recent_calls.popleft()
+                if len(self._recent_calls) >= self.quota_requests_per_second:
+                    self.throttled += 1
+                    raise FakeThrottlingException()
+                self._recent_calls.append(now)
+            self.calls += 1
+        system_text = " ".join(block.get("text", "") for block in request.get("system", []))
+        for marker, responses in self.scripts.items():
+            if marker in system_text:
+                user_turns = sum(1 for message in request["messages"] if message["role"] == "user")
+                response = responses[min(user_turns, len(responses)) - 1]
+                return response(request["messages"]) if callable(response) else response
+        raise Exception("No script for system prompt: {}".format(system_text[:80]))
+
+    def __usage(self, request: dict, text: str) -> dict:
+        input_tokens = sum(estimate_tokens(message) for message in request["messages"])
+        output_tokens = len(text) // 4
+
+        # Like Bedrock, system blocks before a cache point are written to the cache once and read afterwards
+        system = request.get("system", [])
+        cache_points = [index for index, block in enumerate(system) if "cachePoint" in block]
+        prefix_end = cache_points[-1] if cache_points else 0
+        prefix = "".join(block.get("text", "") for block in system[:prefix_end])
+        input_tokens += sum(len(block.get("text", "")) // 4 for block in system[prefix_end:])
+        cache_read, cache_write = 0, 0
+        if prefix:
+            with self._lock:
+                if prefix in self._cached_prefixes:
+                    cache_read = len(prefix) // 4
+                else:
+                    self._cached_prefixes.add(prefix)
+                    cache_write = len(prefix) // 4
+        return {"inputTokens": input_tokens, "outputTokens": output_tokens,
+                "totalTokens": input_tokens + output_tokens + cache_read + cache_write,
+                "cacheReadInputTokens": cache_read, "cacheWriteInputTokens": cache_write}
+
+    def converse(self, **request):
+        response = self.__respond(request)
+        content = [{"text": response}] if isinstance(response, str) else response
+        text = "".join(str(block) for block in content)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return {
+            "output": {"message": {"role": "assistant", "content": content}},
+            "stopReason": "tool_use" if any("toolUse" in block for block in content) else "end_turn",
+            "usage": self.__usage(request, text),
+            "metrics": {"latencyMs": int(self.latency_seconds * 1000)},
+        }
+
+    def converse_stream(self, **request):
+        text = self.__respond(request)
+        return {"stream": self.__stream(request, text)}
+
+    def __stream(self, request, text):
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        yield {"messageStart": {"role": "assistant"}}
+        for chunk in chunks:
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds / len(chunks))
+            yield {"contentBlockDelta": {"delta": {"text": chunk}, "contentBlockIndex": 0}}
+        yield {"contentBlockStop": {"contentBlockIndex": 0}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {"metadata": {"usage": self.__usage(request, text),
+                            "metrics": {"latencyMs": int(self.latency_seconds * 1000)}}}
+
+
+class FakeBedrockAgentRuntime:
+    """
+    Stand-in for a bedrock-agent-runtime client that answers invoke_inline_agent with a scripted completion
+    stream: a pre-processing trace, one orchestration step per step with its rationale, and the answer chunk.
+    answer and latency_seconds are values or callables that receive the request parameters, the latency is
+    spread over the steps while the stream is read, like a real agent that works while it streams. files,
+    a list of dicts with name, type and bytes, are sent in a files event before the answer. hang receives
+    the request parameters, the streams it returns True for block after their first event until release().
+    """
+    def __init__(self, answer="The answer", latency_seconds=0.0, steps: int = 2, files=None, hang=None):
+        self.answer = answer
+        self.files = files
+        self.hang = hang
+        self._released = threading.Event()
+        self.latency_seconds = latency_seconds
+        self.steps = steps
+        self.calls = 0
+        self.sessions = set()
+        self._lock = threading.Lock()
+
+    def invoke_inline_agent(self, **request):
+        with self._lock:
+            self.calls += 1
+            request_number = self.calls
+            self.sessions.add(request["sessionId"])
+        return {
+            "ResponseMetadata": {"RequestId": f"fake-request-{request_number}", "HTTPStatusCode": 200,
+                                 "RetryAttempts": 0},
+            "sessionId": request["sessionId"],
+            "completion": self.__stream(request),
+        }
+
+    def release(self):
+        """Let the blocked streams continue."""
+        self._released.set()
+
+    def __stream(self, request: dict):
+        answer = self.answer(request) if callable(self.answer) else self.answer
+        latency = self.latency_seconds(request) if callable(self.latency_seconds) else self.latency_seconds
+        input_tokens = len(request["inputText"]) // 4 + 100
+        yield {"trace": {"trace": {"preProcessingTrace": {"modelInvocationOutput": {
+            "metadata": {"usage": {"inputTokens": input_tokens, "outputTokens": 10}}}}}}}
+        if self.hang is not None and self.hang(request):
+            self._released.wait()
+        for step in range(1, self.steps + 1):
+            if latency:
+                time.sleep(latency / self.steps)
+            yield {"trace": {"trace": {"orchestrationTrace": {"modelInvocationOutput": {
+                "traceId": f"step-{step}", "metadata": {"usage": {"inputTokens": input_tokens * step,
+                                                                  "outputTokens": 20}}}}}}}
+            yield {"trace": {"trace": {"orchestrationTrace": {"rationale": {"text": f"Working on step {step}"}}}}}
+        yield {"trace": {"trace": {"orchestrationTrace": {"observation": {"finalResponse": {"text": answer}}}}}}
+        if self.files:
+            yield {"files": {"files": self.files}}
+        yield {"chunk": {"bytes": answer.encode("utf8")}}
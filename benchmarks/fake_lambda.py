@@ -0,0 +1,217 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeClientError(Exception):
+    """Looks like a botocore ClientError, with the error code in response."""
+    code = "ClientError"
+
+    def __init__(self, message: str = "", operation: str = "operation"):
+        super().__init__(f"An error occurred ({self.code}) when calling the {operation} operation: {message}")
+        self.response = {"Error": {"Code": self.code, "Message": message}}
+
+
+class FakeNoSuchEntityException(FakeClientError):
+    code = "NoSuchEntity"
+
+
+class FakeResourceNotFoundException(FakeClientError):
+    code = "ResourceNotFoundException"
+
+
+class FakeInvalidParameterValueException(FakeClientError):
+    code = "InvalidParameterValueException"
+
+
+class FakeResourceConflictException(FakeClientError):
+    code = "ResourceConflictException"
+
+
+class _FakeWaiter:
+    def __init__(self, ready):
+        self.ready = ready
+
+    def wait(self, WaiterConfig=None, **kwargs):
+        delay = (WaiterConfig or {}).get("Delay", 1)
+        attempts = (WaiterConfig or {}).get("MaxAttempts", 20)
+        for _ in range(attempts):
+            if self.ready(**kwargs):
+                return
+            time.sleep(delay)
+        raise Exception("Waiter failed: max attempts exceeded")
+
+
+class FakeIamClient:
+    """
+    Stand-in for an IAM client with the calls lambda_creator makes. A new role exists after
+    creation_seconds, and Lambda can only assume it after propagation_seconds, like IAM's eventual consistency.
+    """
+    exceptions = SimpleNamespace(NoSuchEntityException=FakeNoSuchEntityException, ClientError=FakeClientError)
+
+    def __init__(self, latency_seconds: float = 0.0, creation_seconds: float = 0.0, propagation_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.creation_seconds = creation_seconds
+        self.propagation_seconds = propagation_seconds
+        self.roles = {}
+        self.attached = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def __visible_role(self, role_name: str) -> dict:
+        role = self.roles.get(role_name)
+        if role is None or time.monotonic() - role["created"] < self.creation_seconds:
+            raise FakeNoSuchEntityException(f"The role with name {role_name} cannot be found.", "GetRole")
+        return role
+
+    def get_role(self, RoleName):
+        self.__call()
+        return {"Role": self.__visible_role(RoleName)["Role"]}
+
+    def create_role(self, RoleName, AssumeRolePolicyDocument):
+        self.__call()
+        role = {"RoleName": RoleName, "Arn": f"arn:aws:iam::123456789012:role/{RoleName}"}
+        with self._lock:
+            self.roles[RoleName] = {"Role": role, "created": time.monotonic()}
+        return {"Role": role}
+
+    def attach_role_policy(self, RoleName, PolicyArn):
+        self.__call()
+        self.__visible_role(RoleName)
+        with self._lock:
+            self.attached.setdefault(RoleName, set()).add(PolicyArn)
+
+    def detach_role_policy(self, RoleName, PolicyArn):
+        self.__call()
+        self.__visible_role(RoleName)
+        with self._lock:
+            if PolicyArn not in self.attached.get(RoleName, set()):
+                raise FakeNoSuchEntityException(f"Policy {PolicyArn} was not found.", "DetachRolePolicy")
+            self.attached[RoleName].discard(PolicyArn)
+
+    def delete_role(self, RoleName):
+        self.__call()
+        self.__visible_role(RoleName)
+        with self._lock:
+            del self.roles[RoleName]
+            self.attached.pop(RoleName, None)
+
+    def can_assume(self, role_arn: str) -> bool:
+        role_name = role_arn.rsplit("/", 1)[-1]
+        role = self.roles.get(role_name)
+        return role is not None and time.monotonic() - role["created"] >= self.propagation_seconds
+
+    def get_waiter(self, name):
+        if name != "role_exists":
+            raise ValueError(f"Waiter {name} does not exist")
+
+        def _exists(RoleName):
+            try:
+                self.get_role(RoleName=RoleName)
+                return True
+            except FakeNoSuchEntityException:
+                return False
+        return _FakeWaiter(_exists)
+
+
+class FakeLambdaClient:
+    """
+    Stand-in for a Lambda client with the calls lambda_creator makes. Creating a function fails while the
+    role can not be assumed yet, and a new function is Pending for activation_seconds before it is Active.
+    Functions report the CodeSha256 of their zip like Lambda does, uploaded_bytes counts the uploaded code.
+    """
+    exceptions = SimpleNamespace(ResourceNotFoundException=FakeResourceNotFoundException, ClientError=FakeClientError)
+
+    def __init__(self, iam_client: FakeIamClient, latency_seconds: float = 0.0, activation_seconds: float = 0.0):
+        self.iam_client = iam_client
+        self.latency_seconds = latency_seconds
+        self.activation_seconds = activation_seconds
+        self.functions = {}
+        self.policies = {}
+        self.calls = {}
+        self.uploaded_bytes = 0
+        self._lock = threading.Lock()
+
+    def __call(self, operation: str):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def __function(self, name: str, operation: str) -> dict:
+        function = self.functions.get(name)
+        if function is None:
+            raise FakeResourceNotFoundException(f"Function not found: {name}", operation)
+        state = "Active" if time.monotonic() - function["created"] >= self.activation_seconds else "Pending"
+        return dict(function["Configuration"], State=state)
+
+    def get_function(self, FunctionName):
+        self.__call("GetFunction")
+        return {"Configuration": self.__function(FunctionName, "GetFunction")}
+
+    def create_function(self, FunctionName, Role, Code, **kwargs):
+        self.__call("CreateFunction")
+        if not self.iam_client.can_assume(Role):
+            raise FakeInvalidParameterValueException("The role defined for the function cannot be assumed by Lambda.",
+                                                     "CreateFunction")
+        configuration = {"FunctionName": FunctionName, "Role": Role,
+                         "FunctionArn": f"arn:aws:lambda:eu-west-1:123456789012:function:{FunctionName}",
+                         "CodeSha256": self.__code_sha256(Code["ZipFile"]), **kwargs}
+        with self._lock:
+            self.uploaded_bytes += len(Code["ZipFile"])
+            if FunctionName in self.functions:
+                raise FakeResourceConflictException(f"Function already exist: {FunctionName}", "CreateFunction")
+            self.functions[FunctionName] = {"Configuration": configuration, "Code": Code["ZipFile"],
+                                            "created": time.monotonic()}
+        return dict(configuration, State="Pending")
+
+    @staticmethod
+    def __code_sha256(zip_content: bytes) -> str:
+        return base64.b64encode(hashlib.sha256(zip_content).digest()).decode("ascii")
+
+    def update_function_code(self, FunctionName, ZipFile):
+        self.__call("UpdateFunctionCode")
+        self.__function(FunctionName, "UpdateFunctionCode")
+        with self._lock:
+            self.uploaded_bytes += len(ZipFile)
+            function = self.functions[FunctionName]
+            function["Code"] = ZipFile
+            function["Configuration"] = dict(function["Configuration"], CodeSha256=self.__code_sha256(ZipFile))
+        return dict(function["Configuration"], LastUpdateStatus="InProgress")
+
+    def delete_function(self, FunctionName):
+        self.__call("DeleteFunction")
+        self.__function(FunctionName, "DeleteFunction")
+        with self._lock:
+            del self.functions[FunctionName]
+            self.policies.pop(FunctionName, None)
+
+    def get_policy(self, FunctionName):
+        self.__call("GetPolicy")
+        self.__function(FunctionName, "GetPolicy")
+        statements = self.policies.get(FunctionName)
+        if not statements:
+            raise FakeResourceNotFoundException("The resource you requested does not exist.", "GetPolicy")
+        return {"Policy": json.dumps({"Statement": statements})}
+
+    def add_permission(self, FunctionName, StatementId, **kwargs):
+        self.__call("AddPermission")
+        self.__function(FunctionName, "AddPermission")
+        with self._lock:
+            self.policies.setdefault(FunctionName, []).append({"Sid": StatementId, **kwargs})
+
+    def get_waiter(self, name):
+        if name not in ("function_active_v2", "function_updated_v2"):
+            raise ValueError(f"Waiter {name} does not exist")
+        # Code updates are applied at once, an updated function is only waited for until it is active
+        return _FakeWaiter(lambda FunctionName: self.get_function(FunctionName=FunctionName)
+                           ["Configuration"]["State"] == "Active")
@@ -0,0 +1,222 @@
+"""
+Local harness for the action group Lambda handlers, no deploy needed. For every handler it measures:
+- cold start: a fresh interpreter that imports the deployment package and handles its first event
+- warm latency and allocations per invocation, for a synthetic event of every apiPath
+- throughput of concurrent invocations on a process pool
+
+The events are built from the OpenAPI payloads the agents use. Every run is appended as one JSON line, and
+compared with the previous line of the same file.
+
+Run with: python -m benchmarks.lambda_harness --output lambda_results.jsonl
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from bring_a_crew_bedrock import lambda_creator
+from benchmarks.run_benchmarks import measure
+
+LAMBDAS_DIRECTORY = os.path.join(os.path.dirname(lambda_creator.__file__), "lambdas")
+HANDLERS = {"facility": "lambda_function_facility", "schedule": "lambda_function_schedule",
+            "caterer": "lambda_function_caterer"}
+SAMPLE_VALUES = {"string": "2026-10-20", "integer": "4", "number": "4.5", "boolean": "true"}
+SAMPLE_VALUES_BY_NAME = {"person": "Bob", "timeslot": "morning", "room_id": "max_4_people", "lunch_option": "Pizza"}
+
+# Runs in the fresh interpreter, with the unpacked deployment package as working directory
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import lambda_function
+imported = time.perf_counter()
+lambda_function.lambda_handler(json.loads(sys.argv[1]), None)
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_invocation_ms": (done - imported) * 1000}))
+"""
+
+
+def synthetic_events(name: str) -> dict:
+    """A Bedrock action group event for every apiPath of the handler's OpenAPI payload, by apiPath."""
+    with open(os.path.join(LAMBDAS_DIRECTORY, f"payload-{name}.json"), encoding="utf-8") as file:
+        payload = json.load(file)
+    events = {}
+    for api_path, methods in payload["paths"].items():
+        for method, operation in methods.items():
+            parameters = []
+            for parameter in operation.get("parameters", []):
+                schema = parameter.get("schema", {})
+                value = (SAMPLE_VALUES_BY_NAME.get(parameter["name"]) or (schema.get("enum") or [None])[0]
+                         or SAMPLE_VALUES.get(schema.get("type"), "value"))
+                parameters.append({"name": parameter["name"], "type": schema.get("type", "string"), "value": value})
+            events[api_path] = {
+                "messageVersion": "1.0",
+                "agent": {"name": "harness", "id": "HARNESS", "alias": "TSTALIASID", "version": "DRAFT"},
+                "sessionId": "harness-session",
+                "actionGroup": f"{name}_actions",
+                "apiPath": api_path,
+                "httpMethod": method.upper(),
+                "parameters": parameters,
+                "inputText": f"Call {api_path}",
+            }
+    return events
+
+
+def _load_handler(module_name: str):
+    return importlib.import_module(f"bring_a_crew_bedrock.lambdas.{module_name}").lambda_handler
+
+
+def cold_start(name: str, event: dict, runs: int) -> dict:
+    """Import time and first invocation in fresh interpreters, from the files lambda_creator deploys."""
+    files = lambda_creator.package_files(os.path.join(LAMBDAS_DIRECTORY, f"{HANDLERS[name]}.py"))
+    samples = []
+    with tempfile.TemporaryDirectory() as directory:
+        for arcname, path in files.items():
+            with open(path, "rb") as source, open(os.path.join(directory, arcname), "wb") as target:
+                target.write(source.read())
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, json.dumps(event)], cwd=directory,
+                                    capture_output=True, text=True, check=True,
+                                    env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+            sample = json.loads(output.stdout.strip().splitlines()[-1])
+            sample["process_ms"] = (time.perf_counter() - start) * 1000
+            samples.append(sample)
+    return {key: statistics.median(sample[key] for sample in samples)
+            for key in ("import_ms", "first_invocation_ms", "process_ms")} | {"runs": runs}
+
+
+def warm(name: str, events: dict, repeat: int) -> dict:
+    """Latency and allocations of one invocation for every apiPath, after the first one."""
+    handler = _load_handler(HANDLERS[name])
+    results = {}
+    for api_path, event in events.items():
+        handler(event, None)
+        timings = measure(lambda: handler(event, None), repeat)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        handler(event, None)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        differences = after.compare_to(before, "filename")
+        timings["allocated_bytes"] = sum(max(0, difference.size_diff) for difference in differences)
+        timings["allocated_blocks"] = sum(max(0, difference.count_diff) for difference in differences)
+        results[api_path] = timings
+    return results
+
+
+def _invoke_batch(module_name: str, events: list, invocations: int) -> int:
+    logging.disable(logging.INFO)
+    handler = _load_handler(module_name)
+    for index in range(invocations):
+        handler(events[index % len(events)], None)
+    return invocations
+
+
+def throughput(name: str, events: dict, workers: int, invocations: int) -> dict:
+    """Invocations per second over all apiPaths, spread over a process pool like concurrent Lambda instances."""
+    batch = invocations // workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Warm up the workers, so the import is not part of the measurement
+        list(executor.map(_invoke_batch, [HANDLERS[name]] * workers, [list(events.values())] * workers,
+                          [1] * workers))
+        start = time.perf_counter()
+        done = sum(executor.map(_invoke_batch, [HANDLERS[name]] * workers, [list(events.values())] * workers,
+                                [batch] * workers))
+        seconds = time.perf_counter() - start
+    return {"workers": workers, "invocations": done, "seconds": seconds, "invocations_per_second": done / seconds}
+
+
+def run(repeat: int, cold_runs: int, workers: int, invocations: int) -> dict:
+    # The handlers log at INFO, measure the handler and not the console
+    logging.disable(logging.INFO)
+    results = {}
+    for name in HANDLERS:
+        events = synthetic_events(name)
+        results[name] = {
+            "cold_start": cold_start(name, next(iter(events.values())), cold_runs),
+            "warm": warm(name, events, repeat),
+            "throughput": throughput(name, events, workers, invocations),
+        }
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(previous: dict, current: dict) -> list:
+    """Relative change of the main metrics per handler, positive is slower."""
+    changes = []
+    for name, result in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if before is None:
+            continue
+        metrics = [("cold_start.import_ms", before["cold_start"]["import_ms"], result["cold_start"]["import_ms"]),
+                   ("cold_start.first_invocation_ms", before["cold_start"]["first_invocation_ms"],
+                    result["cold_start"]["first_invocation_ms"]),
+                   ("throughput.us_per_invocation", 1e6 / before["throughput"]["invocations_per_second"],
+                    1e6 / result["throughput"]["invocations_per_second"])]
+        for api_path, timings in result["warm"].items():
+            if api_path in before["warm"]:
+                metrics.append((f"warm.{api_path}.p50_us", before["warm"][api_path]["p50_us"], timings["p50_us"]))
+        for metric, old, new in metrics:
+            changes.append({"handler": name, "metric": metric, "before": old, "after": new,
+                            "change": (new - old) / old if old else 0.0})
+    return changes
+
+
+def _previous_run(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        lines = [line for line in file if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local cold start, latency and throughput of the Lambda handlers")
+    parser.add_argument("--repeat", type=int, default=2000, help="Warm invocations per apiPath")
+    parser.add_argument("--cold-runs", type=int, default=5, help="Fresh interpreters per handler")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--invocations", type=int, default=20000, help="Invocations per throughput run")
+    parser.add_argument("--output", help="Append the results as one JSON line and compare with the previous line")
+    parser.add_argument("--max-regression", type=float,
+                        help="Exit with an error when a metric is this fraction slower than the previous run")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.cold_runs, args.workers, args.invocations)
+    print(json.dumps(results, indent=2))
+    if not args.output:
+        return
+
+    previous = _previous_run(args.output)
+    with open(args.output, "a", encoding="utf-8") as file:
+        file.write(json.dumps(results) + "\n")
+    if previous is None:
+        return
+    changes = compare(previous, results)
+    for change in changes:
+        print(f"{change['handler']:>9} {change['metric']:<45} {change['before']:>10.2f} -> {change['after']:>10.2f} "
+              f"({change['change']:+.0%})")
+    if args.max_regression is not None:
+        regressions = [change for change in changes if change["change"] > args.max_regression]
+        if regressions:
+            sys.exit(f"{len(regressions)} metrics regressed more than {args.max_regression:.0%}")
+
+
+if __name__ == "__main__":
+    main()
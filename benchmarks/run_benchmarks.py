@@ -0,0 +1,387 @@
+"""
+Offline micro-benchmarks for the agent framework. The bedrock-runtime client is replaced by a scripted
+FakeBedrockRuntime, so only the overhead of the framework itself is measured and no network is needed.
+
+Run with: python -m benchmarks.run_benchmarks --output bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+
+from bring_a_crew_bedrock.action_agent import ActionAgent, create_system_prompt
+from bring_a_crew_bedrock.bedrock_clients import set_bedrock_client
+from bring_a_crew_bedrock.conversation_memory import estimate_tokens
+from bring_a_crew_bedrock.artifact_store import ArtifactStore
+from bring_a_crew_bedrock.inline_agent_events import FilesProduced
+from bring_a_crew_bedrock.inline_agent_sinks import ArtifactSink, InlineAgentSink, MetricsSink
+from bring_a_crew_bedrock.inline_agent_utils import invoke_inline_agent_helper, invoke_inline_agents
+from bring_a_crew_bedrock.rate_limiter import AdaptiveRateLimiter, set_rate_limiter
+from bring_a_crew_bedrock.speculation import Speculator
+from bring_a_crew_bedrock.react_parser import parse_response
+from bring_a_crew_bedrock.team import room_manager_action_agent, schedule_manager_action_agent
+from bring_a_crew_bedrock.team.orchestration_agent import create_system_prompt as create_orchestration_prompt
+from bring_a_crew_bedrock.tracing import LLM_CALL, Tracer, use_tracer
+from benchmarks.fake_bedrock import FakeBedrockAgentRuntime, FakeBedrockRuntime
+from benchmarks.fake_lambda import FakeIamClient, FakeLambdaClient
+from benchmarks.transcripts import AVAILABILITY_QUESTION, AVAILABILITY_REACT_SCRIPTS, AVAILABILITY_TOOL_USE_SCRIPTS, \
+    DATED_QUESTION, MEETING_SCRIPTS, ORCHESTRATOR_TURNS, QUESTION, STRUCTURED_MEETING_SCRIPTS
+
+
+def measure(function, repeat: int) -> dict:
+    """Call function repeat times and return timing statistics in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        function()
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "mean_us": statistics.fmean(samples),
+        "p50_us": samples[len(samples) // 2],
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_us": samples[0],
+    }
+
+
+def bench_system_prompts(repeat: int) -> dict:
+    agent = schedule_manager_action_agent.create_agent(client=FakeBedrockRuntime({}))
+    actions = {name: {"description": "description", "function": None,
+                      "arguments": [{"name": "date", "type": "str"}, {"name": "person", "type": "str"}]}
+               for name in ("check_availability", "book_person")}
+    return {
+        "action_agent_prompt": measure(lambda: create_system_prompt(actions, agent.intro), repeat),
+        "orchestration_prompt": measure(lambda: create_orchestration_prompt([agent, agent, agent]), repeat),
+    }
+
+
+def bench_parsing(repeat: int) -> dict:
+    agent = ActionAgent("bench", "bench", {}, client=FakeBedrockRuntime({}))
+    extract_answer = agent._ActionAgent__extract_answer
+    action_turn = ORCHESTRATOR_TURNS[0]
+    answer_turn = ORCHESTRATOR_TURNS[-1]
+    return {
+        "parse_action_turn": measure(lambda: parse_response(action_turn), repeat),
+        "parse_and_extract_answer": measure(lambda: extract_answer(parse_response(answer_turn)), repeat),
+    }
+
+
+def bench_memory_growth(calls: int) -> dict:
+    """Repeated delegations to one sub-agent, as the orchestrator does within a session."""
+    results = {}
+    for scoped in (False, True):
+        agent = room_manager_action_agent.create_agent(client=FakeBedrockRuntime(MEETING_SCRIPTS),
+                                                       scoped_sessions=scoped)
+        tracemalloc.start()
+        growth = []
+        for _ in range(calls):
+            agent.perform_action("Check for an available room for 2 people on 2026-10-20 in the morning")
+            growth.append({
+                "messages": len(agent.memory),
+                "estimated_tokens": sum(estimate_tokens(message) for message in agent.memory),
+            })
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results["scoped" if scoped else "unscoped"] = {"per_call": growth, "peak_traced_bytes": peak}
+    return results
+
+
+def bench_tool_use_vs_react(repeat: int, latency_seconds: float) -> dict:
+    """The same two person availability question, answered through ReAct parsing and through Converse tool use."""
+    results = {}
+    for mode, scripts in (("react", AVAILABILITY_REACT_SCRIPTS), ("tool_use", AVAILABILITY_TOOL_USE_SCRIPTS)):
+        fake = FakeBedrockRuntime(scripts, latency_seconds=latency_seconds)
+        agent = schedule_manager_action_agent.create_agent(client=fake, scoped_sessions=True,
+                                                           tool_use=mode == "tool_use")
+        timings = measure(lambda: agent.perform_action(AVAILABILITY_QUESTION), repeat)
+        timings["llm_calls_per_question"] = fake.calls / repeat
+        results[mode] = timings
+    return results
+
+
+def bench_planning(repeat: int, latency_seconds: float) -> dict:
+    """The meeting question with ReAct turns and with one plan that runs as a DAG."""
+    from bring_a_crew_bedrock.run_orchestration import create_orchestration_agent
+
+    results = {}
+    for mode in ("react", "planning"):
+        fake = FakeBedrockRuntime(MEETING_SCRIPTS, latency_seconds=latency_seconds)
+        agent = create_orchestration_agent(client=fake, planning=mode == "planning")
+        tracer = Tracer()
+
+        def _ask():
+            agent.reset()
+            agent.call_agent(QUESTION)
+
+        with use_tracer(tracer):
+            timings = measure(_ask, repeat)
+        timings["llm_calls_per_question"] = fake.calls / repeat
+        timings["orchestrator_calls_per_question"] = sum(
+            1 for span in tracer.spans if span.name == LLM_CALL and span.attributes.get("agent") == "orchestrator"
+        ) / repeat
+        results[mode] = timings
+    return results
+
+
+def bench_structured_delegation(repeat: int, latency_seconds: float) -> dict:
+    """The meeting question with free-text delegations and with direct calls of the sub-agent actions."""
+    from bring_a_crew_bedrock.run_orchestration import create_orchestration_agent
+
+    results = {}
+    for mode, scripts in (("free_text", MEETING_SCRIPTS), ("structured", STRUCTURED_MEETING_SCRIPTS)):
+        fake = FakeBedrockRuntime(scripts, latency_seconds=latency_seconds)
+        agent = create_orchestration_agent(client=fake)
+
+        def _ask():
+            agent.reset()
+            agent.call_agent(QUESTION)
+
+        timings = measure(_ask, repeat)
+        timings["llm_calls_per_question"] = fake.calls / repeat
+        results[mode] = timings
+    return results
+
+
+def bench_speculation(repeat: int, latency_seconds: float) -> dict:
+    """The meeting question with and without prefetching the availability checks of the named people."""
+    from bring_a_crew_bedrock.run_orchestration import create_orchestration_agent
+
+    results = {}
+    for question_name, question in (("next_week", QUESTION), ("dated", DATED_QUESTION)):
+        for mode in ("plain", "speculation"):
+            # The transcripts ask for the week starting 2026-10-19, the week after this fixed day
+            speculator = Speculator(today=date(2026, 10, 14)) if mode == "speculation" else None
+            fake = FakeBedrockRuntime(MEETING_SCRIPTS, latency_seconds=latency_seconds)
+            agent = create_orchestration_agent(client=fake, speculator=speculator)
+
+            def _ask():
+                agent.reset()
+                agent.call_agent(question)
+
+            timings = measure(_ask, repeat)
+            timings["llm_calls_per_question"] = fake.calls / repeat
+            if speculator is not None:
+                timings["speculation"] = speculator.stats()
+            results[f"{question_name}_{mode}"] = timings
+    return results
+
+
+def bench_rate_limiter(questions: int, quota_requests_per_second: int) -> dict:
+    """Many concurrent sub-agent questions against a throttling quota, with retries only and with the limiter."""
+    results = {}
+    limiters = (("retry_only", AdaptiveRateLimiter(requests_per_second=None, tokens_per_minute=None)),
+                ("adaptive", AdaptiveRateLimiter(requests_per_second=quota_requests_per_second)))
+    for mode, limiter in limiters:
+        set_rate_limiter(limiter)
+        fake = FakeBedrockRuntime(MEETING_SCRIPTS, latency_seconds=0.01,
+                                  quota_requests_per_second=quota_requests_per_second)
+        agents = [room_manager_action_agent.create_agent(client=fake, scoped_sessions=True) for _ in range(questions)]
+
+        def _ask(agent):
+            try:
+                agent.perform_action("Check for an available room for 2 people on 2026-10-20 in the morning")
+                return True
+            except Exception:
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            answered = sum(executor.map(_ask, agents))
+        wall_seconds = time.perf_counter() - start
+        results[mode] = {"wall_seconds": wall_seconds, "answered": answered, "failed": questions - answered,
+                         "calls": fake.calls, "throttled": fake.throttled,
+                         "calls_per_second": fake.calls / wall_seconds, "limiter": limiter.stats()}
+    set_rate_limiter(AdaptiveRateLimiter(requests_per_second=None, tokens_per_minute=None))
+    return results
+
+
+def bench_inline_agents(requests: int, latency_seconds: float, max_workers: int = 8) -> dict:
+    """Evaluation prompts fanned out to inline agents, read one stream at a time and on a worker pool."""
+    prompts = [{"inputText": f"Evaluation prompt {index}", "enableTrace": True} for index in range(requests)]
+    # Every eighth agent hangs, the concurrent run gives up on it after the timeout
+    slow = FakeBedrockAgentRuntime(latency_seconds=lambda request: latency_seconds * (
+        20 if request["inputText"].endswith("7") else 1))
+    results = {}
+
+    fake = FakeBedrockAgentRuntime(latency_seconds=latency_seconds)
+    start = time.perf_counter()
+    for index, prompt in enumerate(prompts):
+        invoke_inline_agent_helper(fake, dict(prompt, sessionId=f"session-{index}"), sinks=[])
+    results["sequential"] = {"wall_seconds": time.perf_counter() - start, "answered": requests}
+
+    for mode, client, timeout_seconds in (("concurrent", fake, None),
+                                          ("concurrent_with_timeout", slow, latency_seconds * 5)):
+        metrics = MetricsSink()
+        start = time.perf_counter()
+        outcomes = list(invoke_inline_agents(client, prompts, max_workers=max_workers,
+                                             timeout_seconds=timeout_seconds, sinks=[metrics]))
+        results[mode] = {"wall_seconds": time.perf_counter() - start,
+                         "answered": sum(1 for _, result in outcomes if result.error is None),
+                         "timed_out": sum(1 for _, result in outcomes if result.error is not None),
+                         "completion_order": [index for index, _ in outcomes][:10],
+                         "metrics": metrics.snapshot()}
+    return results
+
+
+class _SynchronousFileSink(InlineAgentSink):
+    """Writes the files inside the event loop to <directory>/<name>, like the helper did before the artifact store."""
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def handle(self, event):
+        if isinstance(event, FilesProduced):
+            for file in event.files:
+                with open(os.path.join(self.directory, file["name"]), "wb") as f:
+                    f.write(file["bytes"])
+
+
+def bench_artifacts(sessions: int, file_megabytes: int) -> dict:
+    """Sessions that each return the same large chart, written in the event loop and by the artifact store."""
+    files = [{"name": "chart.png", "type": "image/png", "bytes": os.urandom(file_megabytes * 1024 * 1024)}]
+    fake = FakeBedrockAgentRuntime(files=files)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        sink = _SynchronousFileSink(directory)
+        start = time.perf_counter()
+        for index in range(sessions):
+            invoke_inline_agent_helper(fake, {"inputText": "Plot it", "sessionId": f"session-{index}"}, sinks=[sink])
+        results["synchronous"] = {"stream_seconds": time.perf_counter() - start,
+                                  "files_kept": len(os.listdir(directory))}
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ArtifactStore(directory, max_bytes=4 * file_megabytes * 1024 * 1024)
+        sink = ArtifactSink(store)
+        start = time.perf_counter()
+        for index in range(sessions):
+            invoke_inline_agent_helper(fake, {"inputText": "Plot it", "sessionId": f"session-{index}"}, sinks=[sink])
+        stream_seconds = time.perf_counter() - start
+        store.flush()
+        results["artifact_store"] = {"stream_seconds": stream_seconds,
+                                     "written_seconds": time.perf_counter() - start,
+                                     "files_kept": len(os.listdir(os.path.join(directory, "sessions"))),
+                                     "store": store.stats()}
+        store.close()
+    return results
+
+
+def bench_lambda_provisioning(propagation_seconds: float, activation_seconds: float) -> dict:
+    """Provision and tear down the three Lambdas of the manifest one after the other and concurrently."""
+    from bring_a_crew_bedrock import lambda_creator
+
+    manifest = lambda_creator.load_manifest(os.path.join(os.path.dirname(lambda_creator.__file__), "lambdas",
+                                                         "manifest.json"))
+    results = {}
+    for mode, max_workers in (("sequential", 1), ("concurrent", len(manifest))):
+        iam_client = FakeIamClient(latency_seconds=0.02, propagation_seconds=propagation_seconds)
+        lambda_client = FakeLambdaClient(iam_client, latency_seconds=0.02, activation_seconds=activation_seconds)
+        start = time.perf_counter()
+        lambda_creator.provision_lambdas(manifest, "eu-west-1", "123456789012", iam_client, lambda_client,
+                                         max_workers=max_workers)
+        provision_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        lambda_creator.teardown_lambdas(manifest, "eu-west-1", "123456789012", iam_client, lambda_client,
+                                        max_workers=max_workers)
+        results[mode] = {"provision_seconds": provision_seconds, "teardown_seconds": time.perf_counter() - start,
+                         "lambda_calls": lambda_client.calls, "functions_left": len(lambda_client.functions),
+                         "roles_left": len(iam_client.roles)}
+    return results
+
+
+def bench_incremental_deploy() -> dict:
+    """Deploy the manifest, deploy it again unchanged, then after changing one handler."""
+    import shutil
+    from bring_a_crew_bedrock import lambda_creator
+
+    lambdas_directory = os.path.join(os.path.dirname(lambda_creator.__file__), "lambdas")
+    iam_client = FakeIamClient()
+    lambda_client = FakeLambdaClient(iam_client)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        sources = shutil.copytree(lambdas_directory, os.path.join(directory, "lambdas"),
+                                  ignore=shutil.ignore_patterns("__pycache__"))
+        cache_directory = os.path.join(directory, "cache")
+        manifest = lambda_creator.load_manifest(os.path.join(sources, "manifest.json"))
+        for deploy in ("first", "unchanged", "one_changed"):
+            if deploy == "one_changed":
+                with open(manifest[0]["code_path"], "a", encoding="utf-8") as file:
+                    file.write("\n# changed\n")
+            calls_before = dict(lambda_client.calls)
+            bytes_before = lambda_client.uploaded_bytes
+            start = time.perf_counter()
+            lambda_creator.provision_lambdas(manifest, "eu-west-1", "123456789012", iam_client, lambda_client,
+                                             cache_directory=cache_directory)
+            results[deploy] = {
+                "seconds": time.perf_counter() - start,
+                "uploads": sum(lambda_client.calls.get(call, 0) - calls_before.get(call, 0)
+                               for call in ("CreateFunction", "UpdateFunctionCode")),
+                "uploaded_bytes": lambda_client.uploaded_bytes - bytes_before,
+            }
+        results["cached_packages"] = len(os.listdir(cache_directory))
+    return results
+
+
+def bench_orchestration_round(repeat: int, latency_seconds: float) -> dict:
+    from bring_a_crew_bedrock import run_orchestration
+
+    fake = FakeBedrockRuntime(MEETING_SCRIPTS, latency_seconds=latency_seconds)
+    set_bedrock_client(fake)
+    run_orchestration.get_agent_pool()
+
+    calls_before = fake.calls
+    timings = measure(lambda: run_orchestration.main(QUESTION), repeat)
+    timings["llm_calls_per_round"] = (fake.calls - calls_before) / repeat
+    timings["fake_latency_seconds"] = latency_seconds
+    return timings
+
+
+def run(repeat: int, latency_seconds: float) -> dict:
+    # The fake runtime has no quota, measure the framework without waiting on the default limits
+    set_rate_limiter(AdaptiveRateLimiter(requests_per_second=None, tokens_per_minute=None))
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": {
+            "system_prompts": bench_system_prompts(repeat),
+            "parsing": bench_parsing(repeat),
+            "memory_growth": bench_memory_growth(calls=10),
+            "tool_use_vs_react": bench_tool_use_vs_react(max(1, repeat // 10), latency_seconds),
+            "orchestration_round": bench_orchestration_round(max(1, repeat // 100), latency_seconds),
+            "planning": bench_planning(max(1, repeat // 100), latency_seconds),
+            "structured_delegation": bench_structured_delegation(max(1, repeat // 100), latency_seconds),
+            "speculation": bench_speculation(max(1, repeat // 100), latency_seconds),
+            "rate_limiter": bench_rate_limiter(questions=100, quota_requests_per_second=20),
+            "inline_agents": bench_inline_agents(requests=32, latency_seconds=max(latency_seconds, 0.01)),
+            "artifacts": bench_artifacts(sessions=8, file_megabytes=16),
+            "lambda_provisioning": bench_lambda_provisioning(propagation_seconds=1.0, activation_seconds=0.5),
+            "incremental_deploy": bench_incremental_deploy(),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for bring_a_crew_bedrock")
+    parser.add_argument("--repeat", type=int, default=1000, help="Iterations per micro-benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated model latency in seconds")
+    parser.add_argument("--output", help="Append the results as one JSON line to this file")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.latency)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as file:
+            file.write(json.dumps(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Canned ReAct transcripts for the meeting flow of run_orchestration, played by the FakeBedrockRuntime."""
+
+ORCHESTRATOR_MARKER = "You are an AI Orchestration agent"
+PLANNER_MARKER = "You are an AI Orchestration planner"
+ROOM_MANAGER_MARKER = "This agent checks the availability of rooms and books them."
+SCHEDULE_MANAGER_MARKER = "This agent manages the schedule of people."
+FOOD_MANAGER_MARKER = "This agent prepares and serves food for the meetings."
+
+QUESTION = "Organise a meeting between Bob and Alice somewhere next week, book a room and order lunch."
+# The same meeting with the date and timeslot given, so the room check can be predicted as well
+DATED_QUESTION = "Organise a meeting between Bob and Alice on 2026-10-20 in the morning, book a room and order lunch."
+
+
+def _command(messages) -> str:
+    return messages[0]["content"][0]["text"]
+
+
+def _answer_from_observation(messages) -> str:
+    observation = messages[-1]["content"][0]["text"].removeprefix("Observation: ")
+    return f"Think: Now that I have the result, I can provide the final answer.\nAnswer: {observation}"
+
+
+def _schedule_manager(messages) -> str:
+    command = _command(messages)
+    person = next((name for name in ("Alice", "Bob", "Charlie") if name in command), "Bob")
+    if command.lower().startswith("book"):
+        return (f"Think: I need to book {person} for the meeting.\n"
+                f'Action: book_person: {{"date": "2026-10-20", "timeslot": "morning", "person": "{person}"}}')
+    return (f"Think: I need to check the availability of {person}.\n"
+            f'Action: check_availability: {{"date": "2026-10-19", "person": "{person}"}}')
+
+
+def _room_manager(messages) -> str:
+    command = _command(messages)
+    action = "book_room" if command.lower().startswith("book") else "check_available_room"
+    return (f"Think: I need to call {action} for 2 people.\n"
+            f'Action: {action}: {{"req_date": "2026-10-20", "timeslot": "morning", "number_of_people": 2}}')
+
+
+def _food_manager(messages) -> str:
+    return ("Think: I need to prepare lunch.\n"
+            'Action: prepare_lunch: {"date": "2026-10-20", "timeslot": "morning", "number_of_people": 2, '
+            '"room_id": "max_2_people"}')
+
+
+ORCHESTRATOR_TURNS = [
+    "Question: " + QUESTION + "\n"
+    "Think: I need the availability of Bob and Alice and a room for 2 people.\n"
+    "Action: schedule_manager: Check the availability of Bob for the week starting 2026-10-19\n"
+    "Action: schedule_manager: Check the availability of Alice for the week starting 2026-10-19\n"
+    "Action: room_manager: Check for an available room for 2 people on 2026-10-20 in the morning",
+    "Think: Bob is available on Tuesday, Charlie replaces Alice. I book the room and the people.\n"
+    "Action: room_manager: Book a room for 2 people on 2026-10-20 in the morning\n"
+    "Action: schedule_manager: Book Bob for a meeting on 2026-10-20 in the morning\n"
+    "Action: schedule_manager: Book Charlie for a meeting on 2026-10-20 in the morning",
+    "Think: The room is booked, I need to order lunch.\n"
+    "Action: food_manager: Prepare lunch for 2 people on 2026-10-20 in the morning in room max_2_people",
+    "Think: Now that I have the result, I can provide the final answer.\n"
+    "Answer: The meeting between Bob and Charlie, who replaces Alice, is booked on 2026-10-20 in the morning "
+    "in room max_2_people, including lunch.",
+]
+
+# The meeting flow with structured delegations, every action of a sub-agent is called with JSON arguments
+STRUCTURED_ORCHESTRATOR_TURNS = [
+    "Question: " + QUESTION + "\n"
+    "Think: I need the availability of Bob and Alice and a room for 2 people.\n"
+    'Action: schedule_manager.check_availability: {"date": "2026-10-19", "person": "Bob"}\n'
+    'Action: schedule_manager.check_availability: {"date": "2026-10-19", "person": "Alice"}\n'
+    'Action: room_manager.check_available_room: {"req_date": "2026-10-20", "timeslot": "morning", '
+    '"number_of_people": 2}',
+    "Think: Bob is available on Tuesday, Charlie replaces Alice. I book the room and the people.\n"
+    'Action: room_manager.book_room: {"req_date": "2026-10-20", "timeslot": "morning", "number_of_people": 2}\n'
+    'Action: schedule_manager.book_person: {"date": "2026-10-20", "timeslot": "morning", "person": "Bob"}\n'
+    'Action: schedule_manager.book_person: {"date": "2026-10-20", "timeslot": "morning", "person": "Charlie"}',
+    "Think: The room is booked, I need to order lunch.\n"
+    'Action: food_manager.prepare_lunch: {"date": "2026-10-20", "timeslot": "morning", "number_of_people": "2", '
+    '"room_id": "max_2_people"}',
+    ORCHESTRATOR_TURNS[-1],
+]
+
+PLANNER_TURNS = [
+    '{"steps": [\n'
+    '  {"id": "bob", "agent": "schedule_manager", "request": "Check the availability of Bob for the week starting '
+    '2026-10-19", "depends_on": []},\n'
+    '  {"id": "alice", "agent": "schedule_manager", "request": "Check the availability of Alice for the week '
+    'starting 2026-10-19", "depends_on": []},\n'
+    '  {"id": "room", "agent": "room_manager", "request": "Check for an available room for 2 people on 2026-10-20 '
+    'in the morning", "depends_on": []},\n'
+    '  {"id": "book_room", "agent": "room_manager", "request": "Book a room for 2 people on 2026-10-20 in the '
+    'morning, availability: {room}", "depends_on": ["room", "bob", "alice"]},\n'
+    '  {"id": "book_bob", "agent": "schedule_manager", "request": "Book Bob for a meeting on 2026-10-20 in the '
+    'morning", "depends_on": ["bob"]},\n'
+    '  {"id": "book_alice", "agent": "schedule_manager", "request": "Book Alice, or who replaces her according to: '
+    '{alice}, for a meeting on 2026-10-20 in the morning", "depends_on": ["alice"]},\n'
+    '  {"id": "lunch", "agent": "food_manager", "request": "Prepare lunch for 2 people on 2026-10-20 in the '
+    'morning in the room of this booking: {book_room}", "depends_on": ["book_room"]}\n'
+    ']}',
+    ORCHESTRATOR_TURNS[-1],
+]
+
+AVAILABILITY_QUESTION = "Check the availability of Bob and Alice for the week starting 2026-10-19"
+
+AVAILABILITY_REACT_SCRIPTS = {
+    SCHEDULE_MANAGER_MARKER: [
+        "Think: I need the availability of Bob first.\n"
+        'Action: check_availability: {"date": "2026-10-19", "person": "Bob"}',
+        "Think: Now I need the availability of Alice.\n"
+        'Action: check_availability: {"date": "2026-10-19", "person": "Alice"}',
+        "Think: Now that I have the result, I can provide the final answer.\n"
+        "Answer: Bob is available on Monday, Tuesday and Thursday, Charlie replaces Alice.",
+    ],
+}
+
+AVAILABILITY_TOOL_USE_SCRIPTS = {
+    SCHEDULE_MANAGER_MARKER: [
+        [
+            {"toolUse": {"toolUseId": "tooluse_1", "name": "check_availability",
+                         "input": {"date": "2026-10-19", "person": "Bob"}}},
+            {"toolUse": {"toolUseId": "tooluse_2", "name": "check_availability",
+                         "input": {"date": "2026-10-19", "person": "Alice"}}},
+        ],
+        "Bob is available on Monday, Tuesday and Thursday, Charlie replaces Alice.",
+    ],
+}
+
+MEETING_SCRIPTS = {
+    ORCHESTRATOR_MARKER: ORCHESTRATOR_TURNS,
+    PLANNER_MARKER: PLANNER_TURNS,
+    ROOM_MANAGER_MARKER: [_room_manager, _answer_from_observation],
+    SCHEDULE_MANAGER_MARKER: [_schedule_manager, _answer_from_observation],
+    FOOD_MANAGER_MARKER: [_food_manager, _answer_from_observation],
+}
+
+STRUCTURED_MEETING_SCRIPTS = dict(MEETING_SCRIPTS, **{ORCHESTRATOR_MARKER: STRUCTURED_ORCHESTRATOR_TURNS})
@@ -1,24 +1,41 @@
+import asyncio
+import copy
+import inspect
 import json
 import re
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import boto3
-
 from . import action_agent_log
+from .action_cache import ActionResultCache, needs_action_cache, wrap_action
+from .bedrock_clients import get_bedrock_client
+from .conversation_memory import ConversationMemory
+from .async_bedrock import call_action_function, run_blocking
+from .parallel_dispatch import DEFAULT_MAX_WORKERS, dispatch_actions, dispatch_actions_async, format_observations, \
+    submit_in_context
+from .model_router import DEFAULT_MODEL_ID, ModelRouter, RoutedBedrockClient
+from .rate_limiter import rate_limited
+from .react_parser import parse_response, stream_react_turn
+from .tool_use import create_tool_config, create_tool_use_system_prompt, message_text, tool_result_message, \
+    tool_uses, validate_arguments, ArgumentError
+from .tracing import LLM_CALL, PERFORM_ACTION, TOOL, get_tracer, record_usage
+
+PARALLEL_ACTIONS_RULE = """
+5. When actions do not depend on each other, you can write multiple Action lines in one turn before the PAUSE. All of them are executed together and you receive one Observation block with a numbered result per action, in the same order as the actions.
+""".strip()
 
 
-def create_system_prompt(actions, agent_intro: str):
+def create_system_prompt(actions, agent_intro: str, parallel_actions: bool = False):
     def _extract_arguments(arguments):
         return ",".join([f" `{argument["name"]}`({argument["type"]})" for argument in arguments])
     actions_str = "\n".join([f" - `{action}`; for {value["description"]} with arguments {_extract_arguments(value["arguments"])}" for action, value in actions.items()])
+    extra_rules = f"\n{PARALLEL_ACTIONS_RULE}" if parallel_actions else ""
     return f"""
 {agent_intro}
 
 You are an AI agent following the ReAct framework, where you **Think**, **Act**, and process **Observations** in response to a given **Question**.  During thinking you analyse the question, break it down into subquestions, and decide on the actions to take to answer the question. You then act by performing the actions you decided on. After each action, you pause to observe the results of the action. You then continue the cycle by thinking about the new observation and deciding on the next action to take. You continue this cycle until you have enough information to answer the original question.
 
-The date for today is: {datetime.now().strftime("%Y-%m-%d")}
-
 Arguments for an action are provided as a json document with the arguments as keys and the values as the values.
 
 You will always follow this structured format:
@@ -41,7 +58,7 @@ Rules:
 2. Never generate output after "PAUSE"
 3. Observations will be provided as a response to an action; never generate your own output for an action.
 4. These are the only available actions, and there arguments:
-{actions_str}
+{actions_str}{extra_rules}
 
 Example Interactions:
 - User Input:
@@ -62,29 +79,125 @@ Answer: The average weight for a Bulldog is 40 lbs.
 """.strip()
 
 
+def create_context_prompt():
+    """The volatile part of the system prompt, it goes after the cache point so the static part stays cacheable."""
+    return f"The date for today is: {datetime.now().strftime('%Y-%m-%d')}"
+
+
+def create_system_blocks(system_prompt: str, prompt_caching: bool = True):
+    """System content blocks for converse: the static prompt, a cache point, and the volatile context."""
+    if prompt_caching:
+        return [{"text": system_prompt}, {"cachePoint": {"type": "default"}}, {"text": create_context_prompt()}]
+    return [{"text": system_prompt}, {"text": create_context_prompt()}]
+
+
 class ActionAgent(ABC):
-    def __init__(self, name: str, intro: str, actions=None):
+    def __init__(self, name: str, intro: str, actions=None, parallel_actions: bool = False,
+                 max_parallel_actions: int = DEFAULT_MAX_WORKERS, stream: bool = False, client=None,
+                 action_cache: ActionResultCache = None, memory_manager: ConversationMemory = None,
+                 scoped_sessions: bool = False, prompt_caching: bool = True, tool_use: bool = False,
+                 router: ModelRouter = None):
         self.log = action_agent_log
         self.log.info("Initializing Agent")
         self.name = name
         self.intro = intro
-        self.model = "eu.amazon.nova-lite-v1:0"
-        self.client = boto3.client("bedrock-runtime", region_name="eu-west-1")
+        # The default model, with a router the model of every call is on its LLM_CALL span
+        self.model = DEFAULT_MODEL_ID
+        # With a router the model and region of every call are chosen per call for the role of this agent
+        if router is not None:
+            if client is not None:
+                raise Exception("Pass either a client or a router, not both. A RoutedBedrockClient with a "
+                                "client_factory combines them")
+            client = RoutedBedrockClient(router, role=name)
+        self.client = rate_limited(client if client is not None else get_bedrock_client())
 
         # Initialize the messages with the system message
         self.memory = []
-        self.system_prompt = create_system_prompt(actions, intro)
+        # Optional manager that keeps the messages sent to the model within a token budget
+        self.memory_manager = memory_manager
+        # When enabled, every perform_action starts with an empty memory, a scratchpad for that request only
+        self.scoped_sessions = scoped_sessions
+        # With tool_use the actions are offered as Converse tools instead of through the ReAct prompt
+        self.tool_use = tool_use
+        if tool_use:
+            self.system_prompt = create_tool_use_system_prompt(intro)
+            self.tool_config = create_tool_config(actions or {})
+        else:
+            self.system_prompt = create_system_prompt(actions, intro, parallel_actions=parallel_actions)
+        # Mark the static system prompt with a Bedrock cache point, so it is not processed again every call
+        self.prompt_caching = prompt_caching
 
-        # Initialize the known actions
+        # Keep the specs of the actions, callers can run an action directly with validated arguments
+        self.action_specs = actions or {}
+
+        # Initialize the known actions, actions that declare caching or invalidation get wrapped
+        self.action_cache = action_cache
+        if self.action_cache is None and needs_action_cache(actions):
+            self.action_cache = ActionResultCache()
         self.known_actions = {}
         if actions is not None:
             for action, value in actions.items():
-                self.known_actions[action] = value["function"]
+                if self.action_cache is not None:
+                    self.known_actions[action] = wrap_action(action, value, self.action_cache)
+                else:
+                    self.known_actions[action] = value["function"]
+
+        # When enabled, all actions of one turn run together instead of only the first one
+        self.parallel_actions = parallel_actions
+        self.max_parallel_actions = max_parallel_actions
+        # When enabled, the response is streamed and actions start as soon as their line is complete
+        self.stream = stream
 
         self.max_turns = 10
         self.action_re = re.compile(r'^Action: (\w+): (.*)$')
         self.answer_re = re.compile(r'^Answer: (.*)$')
 
+    def clone(self):
+        """Return a copy of this agent that shares its configuration and client, but starts with an empty memory."""
+        twin = copy.copy(self)
+        twin.memory = []
+        return twin
+
+    def reset(self):
+        """Forget the conversation, so the agent can be reused for a new request."""
+        self.memory = []
+        if self.memory_manager is not None:
+            self.memory_manager.reset_stats()
+
+    def tokens_saved(self) -> int:
+        """Estimated input tokens the memory manager kept out of the requests since the last reset."""
+        return self.memory_manager.tokens_saved if self.memory_manager is not None else 0
+
+    def call_action(self, action, arguments: dict):
+        """
+        Run one action directly with the arguments of the caller, without any LLM turn. The arguments are
+        validated against the spec of the action, an ArgumentError is raised when they do not match.
+        """
+        function, arguments = self.__validated_action(action, arguments)
+        self.log.info(" -- running %s %s", action, arguments)
+        with get_tracer().span(TOOL, agent=self.name, action=action, structured=True):
+            observation = function(**arguments)
+            if inspect.isawaitable(observation):
+                observation = asyncio.run(observation)
+
+        self.log.info("Observation: %s", observation)
+        return observation
+
+    async def call_action_async(self, action, arguments: dict):
+        """Async variant of call_action."""
+        function, arguments = self.__validated_action(action, arguments)
+        self.log.info(" -- running %s %s", action, arguments)
+        with get_tracer().span(TOOL, agent=self.name, action=action, structured=True):
+            observation = await call_action_function(function, arguments)
+
+        self.log.info("Observation: %s", observation)
+        return observation
+
+    def __validated_action(self, action, arguments):
+        if action not in self.known_actions:
+            raise ArgumentError("Unknown action for {}: {}".format(self.name, action))
+        return self.known_actions[action], validate_arguments(self.action_specs[action]["arguments"], arguments)
+
     def __handle_user_message(self, message):
         self.log.info(f"Received message: {message}")
         self.memory.append({"role": "user", "content": [{"text": message}]})
@@ -92,51 +205,238 @@ class ActionAgent(ABC):
         self.memory.append({"role": "assistant", "content": [{"text": result}]})
         return result
 
+    def __handle_user_message_streaming(self, message):
+        self.log.info(f"Received message: {message}")
+        self.memory.append({"role": "user", "content": [{"text": message}]})
+
+        started = []
+        with ThreadPoolExecutor(max_workers=self.max_parallel_actions) as executor:
+            def _start_action(index, action, action_input):
+                started.append((action, submit_in_context(executor, self.__run_action, index, action, action_input)))
+
+            with get_tracer().span(LLM_CALL, agent=self.name, model=self.model, stream=True) as span:
+                parsed = stream_react_turn(self.client, self.__converse_request(), _start_action,
+                                           max_actions=None if self.parallel_actions else 1,
+                                           action_re=self.action_re, answer_re=self.answer_re)
+                record_usage(span, parsed.usage, parsed.metrics)
+            self.log.info(f"Response: {parsed.text}")
+            self.memory.append({"role": "assistant", "content": [{"text": parsed.text}]})
+            results = [(action, future.result()) for action, future in started]
+        return parsed, format_observations(results) if results else None
+
+    async def __handle_user_message_async(self, message):
+        self.log.info(f"Received message: {message}")
+        self.memory.append({"role": "user", "content": [{"text": message}]})
+        result = await self.__call_llm_async()
+        self.memory.append({"role": "assistant", "content": [{"text": result}]})
+        return result
+
     def perform_action(self, command):
+        with get_tracer().span(PERFORM_ACTION, agent=self.name, command=command):
+            if self.scoped_sessions:
+                self.memory = []
+            if self.tool_use:
+                return self.__perform_tool_use(command)
+            i = 0
+            next_prompt = command
+            while i < self.max_turns:
+                i += 1
+                # Check if there is an action to run or an answer to return
+                if self.stream:
+                    parsed, observation = self.__handle_user_message_streaming(next_prompt)
+                else:
+                    parsed = parse_response(self.__handle_user_message(next_prompt), self.action_re, self.answer_re)
+                    observation = self.__execute_action(parsed.actions) if parsed.actions else None
+
+                if observation is None:
+                    return self.__extract_answer(parsed)
+                next_prompt = observation
+
+    async def perform_action_async(self, command):
+        """Async variant of perform_action, the Bedrock calls and actions do not block the event loop."""
+        with get_tracer().span(PERFORM_ACTION, agent=self.name, command=command):
+            if self.scoped_sessions:
+                self.memory = []
+            if self.tool_use:
+                return await self.__perform_tool_use_async(command)
+            i = 0
+            next_prompt = command
+            while i < self.max_turns:
+                i += 1
+                result = await self.__handle_user_message_async(next_prompt)
+
+                # Check if there is an action to run or an answer to return
+                parsed = parse_response(result, self.action_re, self.answer_re)
+                if parsed.actions:
+                    next_prompt = await self.__execute_action_async(parsed.actions)
+                else:
+                    return self.__extract_answer(parsed)
+
+    def __perform_tool_use(self, command):
+        self.log.info(f"Received message: {command}")
+        self.memory.append({"role": "user", "content": [{"text": command}]})
         i = 0
-        next_prompt = command
         while i < self.max_turns:
             i += 1
-            result = self.__handle_user_message(next_prompt)
+            message = self.__call_llm_tools()
+            self.memory.append(message)
+
+            # Without tool calls the text of the message is the answer
+            calls = tool_uses(message)
+            if not calls:
+                return self.__tool_use_answer(message)
+            results = dispatch_actions([(call["name"], call) for call in calls], self.__run_tool,
+                                       max_workers=self.max_parallel_actions)
+            self.memory.append(tool_result_message(
+                [(call, observation, error) for call, (_, (observation, error)) in zip(calls, results)]))
+
+    async def __perform_tool_use_async(self, command):
+        self.log.info(f"Received message: {command}")
+        self.memory.append({"role": "user", "content": [{"text": command}]})
+        i = 0
+        while i < self.max_turns:
+            i += 1
+            message = await self.__call_llm_tools_async()
+            self.memory.append(message)
+
+            # Without tool calls the text of the message is the answer
+            calls = tool_uses(message)
+            if not calls:
+                return self.__tool_use_answer(message)
+            results = await dispatch_actions_async([(call["name"], call) for call in calls], self.__run_tool_async,
+                                                   max_workers=self.max_parallel_actions)
+            self.memory.append(tool_result_message(
+                [(call, observation, error) for call, (_, (observation, error)) in zip(calls, results)]))
+
+    def __tool_use_answer(self, message):
+        answer = message_text(message)
+        self.log.info("Final answer: %s", answer)
+        return answer
+
+    def __run_tool(self, index, action, tool_use):
+        """Run one toolUse block, errors go back to the model as an error toolResult instead of failing the request."""
+        if action not in self.known_actions:
+            self.log.error("Unknown tool: %s: %s", action, tool_use["input"])
+            return None, "Unknown tool: {}".format(action)
+
+        self.log.info(" -- running %s %s", action, tool_use["input"])
+        with get_tracer().span(TOOL, agent=self.name, action=action):
+            try:
+                observation = self.known_actions[action](**tool_use["input"])
+                if inspect.isawaitable(observation):
+                    observation = asyncio.run(observation)
+            except Exception as e:
+                self.log.error("Tool %s failed: %s", action, e)
+                return None, str(e)
+
+        self.log.info("Observation: %s", observation)
+        return observation, None
+
+    async def __run_tool_async(self, index, action, tool_use):
+        if action not in self.known_actions:
+            self.log.error("Unknown tool: %s: %s", action, tool_use["input"])
+            return None, "Unknown tool: {}".format(action)
 
-            # Check if there is an action to run or an answer to return
-            actions = [self.action_re.match(a) for a in result.split('\n') if self.action_re.match(a)]
-            if actions:
-                next_prompt = self.__execute_action(actions)
-            else:
-                return self.__extract_answer(result)
+        self.log.info(" -- running %s %s", action, tool_use["input"])
+        with get_tracer().span(TOOL, agent=self.name, action=action):
+            try:
+                observation = await call_action_function(self.known_actions[action], tool_use["input"])
+            except Exception as e:
+                self.log.error("Tool %s failed: %s", action, e)
+                return None, str(e)
+
+        self.log.info("Observation: %s", observation)
+        return observation, None
 
     def __execute_action(self, actions):
-        action, action_input = actions[0].groups()
+        if not self.parallel_actions:
+            actions = actions[:1]
+        results = dispatch_actions(actions, self.__run_action, max_workers=self.max_parallel_actions)
+        return format_observations(results)
+
+    async def __execute_action_async(self, actions):
+        if not self.parallel_actions:
+            actions = actions[:1]
+        results = await dispatch_actions_async(actions, self.__run_action_async,
+                                               max_workers=self.max_parallel_actions)
+        return format_observations(results)
+
+    def __prepare_action(self, action, action_input):
         if action not in self.known_actions:
             self.log.error("Unknown action: %s: %s", action, action_input)
             raise Exception("Unknown action: {}: {}".format(action, action_input))
 
         self.log.info(" -- running %s %s", action, action_input)
         # Parse the JSON string into a dictionary
-        action_args = json.loads(action_input)
-        # Unpack the dictionary as keyword arguments
-        observation = self.known_actions[action](**action_args)
+        return self.known_actions[action], json.loads(action_input)
+
+    def __run_action(self, index, action, action_input):
+        function, action_args = self.__prepare_action(action, action_input)
+        with get_tracer().span(TOOL, agent=self.name, action=action):
+            # Unpack the dictionary as keyword arguments
+            observation = function(**action_args)
+            if inspect.isawaitable(observation):
+                observation = asyncio.run(observation)
+
+        self.log.info("Observation: %s", observation)
+        return observation
+
+    async def __run_action_async(self, index, action, action_input):
+        function, action_args = self.__prepare_action(action, action_input)
+        with get_tracer().span(TOOL, agent=self.name, action=action):
+            observation = await call_action_function(function, action_args)
 
         self.log.info("Observation: %s", observation)
-        return f"Observation: {observation}"
+        return observation
 
-    def __extract_answer(self, result):
-        answers = [self.answer_re.match(answer) for answer in result.split('\n') if self.answer_re.match(answer)]
-        if answers:
+    def __extract_answer(self, parsed):
+        if parsed.answer is not None:
             # There is an answer to return
-            self.log.info("Final answer: %s", answers[0].groups()[0])
-            return answers[0].groups()[0]
+            self.log.info("Final answer: %s", parsed.answer)
+            return parsed.answer
         else:
-            self.log.error("No action or answer found in: %s", result)
-            raise Exception("No action or answer found in: {}".format(result))
+            self.log.error("No action or answer found in: %s", parsed.text)
+            raise Exception("No action or answer found in: {}".format(parsed.text))
 
-    def __call_llm(self) -> str:
-        bedrock_response  = self.client.converse(
-            modelId=self.model,
-            messages=self.memory,
-            system = [{"text":  self.system_prompt}],
-            inferenceConfig={"maxTokens": 512, "temperature": 0, "topP": 0.9, "stopSequences": ["PAUSE"]},
-        )
+    def __converse_request(self) -> dict:
+        request = {
+            "modelId": self.model,
+            "messages": self.memory if self.memory_manager is None else self.memory_manager.select(self.memory),
+            "system": create_system_blocks(self.system_prompt, self.prompt_caching),
+            "inferenceConfig": {"maxTokens": 512, "temperature": 0, "topP": 0.9, "stopSequences": ["PAUSE"]},
+        }
+        if self.tool_use:
+            del request["inferenceConfig"]["stopSequences"]
+            request["toolConfig"] = self.tool_config
+        return request
+
+    def __response_text(self, bedrock_response) -> str:
         self.log.info(f"Response: {bedrock_response["output"]["message"]["content"]}")
         return bedrock_response["output"]["message"]["content"][0]["text"]
+
+    def __call_llm(self) -> str:
+        with get_tracer().span(LLM_CALL, agent=self.name, model=self.model) as span:
+            bedrock_response = self.client.converse(**self.__converse_request())
+            record_usage(span, bedrock_response.get("usage"), bedrock_response.get("metrics"))
+        return self.__response_text(bedrock_response)
+
+    def __call_llm_tools(self) -> dict:
+        with get_tracer().span(LLM_CALL, agent=self.name, model=self.model) as span:
+            bedrock_response = self.client.converse(**self.__converse_request())
+            record_usage(span, bedrock_response.get("usage"), bedrock_response.get("metrics"))
+        self.log.info(f"Response: {bedrock_response['output']['message']['content']}")
+        return bedrock_response["output"]["message"]
+
+    async def __call_llm_tools_async(self) -> dict:
+        with get_tracer().span(LLM_CALL, agent=self.name, model=self.model) as span:
+            bedrock_response = await run_blocking(self.client.converse, **self.__converse_request())
+            record_usage(span, bedrock_response.get("usage"), bedrock_response.get("metrics"))
+        self.log.info(f"Response: {bedrock_response['output']['message']['content']}")
+        return bedrock_response["output"]["message"]
+
+    async def __call_llm_async(self) -> str:
+        with get_tracer().span(LLM_CALL, agent=self.name, model=self.model) as span:
+            bedrock_response = await run_blocking(self.client.converse, **self.__converse_request())
+            record_usage(span, bedrock_response.get("usage"), bedrock_response.get("metrics"))
+        return self.__response_text(bedrock_response)
+
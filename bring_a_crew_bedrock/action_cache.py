@@ -0,0 +1,120 @@
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL_SECONDS = 60
+
+action_cache_log = logging.getLogger("main.ActionResultCache")
+
+
+def _default_key(**kwargs):
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+
+class ActionResultCache:
+    """Bounded, thread safe cache for action results, every entry expires after its own ttl."""
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, action: str, key):
+        """Return (True, result) for a fresh entry, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get((action, key))
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end((action, key))
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[(action, key)]
+            self.misses += 1
+            return False, None
+
+    def put(self, action: str, key, result, ttl: float):
+        with self._lock:
+            self._entries[(action, key)] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end((action, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, action: str):
+        """Remove all results of an action, used after an action that changes what it would return."""
+        with self._lock:
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == action]:
+                del self._entries[entry_key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def needs_action_cache(actions) -> bool:
+    """True when any action in the actions spec declares caching or invalidation."""
+    return any("cache" in value or "invalidates" in value for value in (actions or {}).values())
+
+
+def wrap_action(action: str, spec: dict, cache: ActionResultCache):
+    """
+    Wrap the function of an action according to its spec. An action with a "cache" entry is memoized, the
+    entry holds an optional "ttl" in seconds and an optional "key" function that receives the same keyword
+    arguments as the action. When the key function fails on the arguments, the action runs uncached and
+    handles them itself. An action with an "invalidates" list removes the cached results of those actions
+    after it ran.
+    """
+    function = spec["function"]
+    cache_spec = spec.get("cache")
+    invalidates = spec.get("invalidates", [])
+    if cache_spec is None and not invalidates:
+        return function
+
+    ttl = DEFAULT_TTL_SECONDS if cache_spec is None else cache_spec.get("ttl", DEFAULT_TTL_SECONDS)
+    key_function = _default_key if cache_spec is None else cache_spec.get("key", _default_key)
+
+    def _invalidate():
+        for related_action in invalidates:
+            cache.invalidate(related_action)
+
+    def _key(kwargs):
+        if cache_spec is None:
+            return None
+        try:
+            return key_function(**kwargs)
+        except Exception as e:
+            action_cache_log.warning("No cache key for %s %s, running it uncached: %s", action, kwargs, e)
+            return None
+
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def _cached_async(**kwargs):
+            key = _key(kwargs)
+            if key is not None:
+                found, result = cache.get(action, key)
+                if found:
+                    return result
+            result = await function(**kwargs)
+            if key is not None:
+                cache.put(action, key, result, ttl)
+            _invalidate()
+            return result
+        return _cached_async
+
+    @functools.wraps(function)
+    def _cached(**kwargs):
+        key = _key(kwargs)
+        if key is not None:
+            found, result = cache.get(action, key)
+            if found:
+                return result
+        result = function(**kwargs)
+        if key is not None:
+            cache.put(action, key, result, ttl)
+        _invalidate()
+        return result
+    return _cached
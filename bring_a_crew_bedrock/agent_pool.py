@@ -0,0 +1,53 @@
+import logging
+import queue
+from contextlib import contextmanager
+
+
+class AgentPool:
+    """
+    A pool of pre-built agents. Building an agent renders its system prompt and wires it to a client,
+    the pool does that up front and hands out ready agents per request. After a request the agent is
+    reset, so no memory leaks from one request into the next.
+    """
+    def __init__(self, factory, size: int = 4, prebuild: bool = True):
+        """
+        :param factory: callable without arguments that creates a new agent
+        :param size: maximum number of idle agents that are kept
+        :param prebuild: build all agents when creating the pool instead of on first use
+        """
+        self.log = logging.getLogger("main.AgentPool")
+        self.factory = factory
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        if prebuild:
+            for _ in range(size):
+                self._idle.put_nowait(factory())
+
+    def borrow(self):
+        """Take an idle agent from the pool, or build a new one when all agents are in use."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            self.log.info("No idle agent available, building a new one")
+            return self.factory()
+
+    def give_back(self, agent):
+        """Reset the agent and return it to the pool, agents that do not fit anymore are dropped."""
+        agent.reset()
+        try:
+            self._idle.put_nowait(agent)
+        except queue.Full:
+            pass
+
+    @contextmanager
+    def agent(self):
+        """Context manager that borrows an agent for the duration of one request."""
+        agent = self.borrow()
+        try:
+            yield agent
+        finally:
+            self.give_back(agent)
+
+    @property
+    def idle_count(self) -> int:
+        return self._idle.qsize()
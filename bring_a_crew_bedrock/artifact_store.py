@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_ARTIFACT_DIRECTORY = "output"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def safe_name(name: str) -> str:
+    """A file or directory name that cannot leave its parent directory."""
+    name = UNSAFE_NAME_RE.sub("_", os.path.basename(name or ""))
+    return name.lstrip(".") or "unnamed"
+
+
+class ArtifactStore:
+    """
+    Stores the files produced by inline agents on a background writer thread, so reading the completion
+    stream does not wait for the disk. The content is stored once under its SHA-256 in objects/, every
+    session sees its files under sessions/<session id>/<name> as hard links to the objects (copies where
+    links are not supported). When the objects exceed max_bytes the least recently stored ones are
+    removed together with the session files that point to them.
+    """
+    def __init__(self, directory: str = DEFAULT_ARTIFACT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.log = logging.getLogger("main.ArtifactStore")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._objects_directory = os.path.join(directory, "objects")
+        self._sessions_directory = os.path.join(directory, "sessions")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-writer")
+        self._lock = threading.Lock()
+        # hash -> size, in the order of the last store, hash -> session files that link to it and the reverse
+        self._objects = OrderedDict()
+        self._links = {}
+        self._paths = {}
+        self.counters = {"stored": 0, "deduplicated": 0, "evicted": 0, "bytes_written": 0}
+        self.__load()
+
+    def __load(self):
+        """Pick up the objects of an earlier run, oldest first, so the retention covers them too."""
+        if not os.path.isdir(self._objects_directory):
+            return
+        entries = [entry for entry in os.scandir(self._objects_directory) if entry.is_file()]
+        inodes = {}
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            self._objects[entry.name] = entry.stat().st_size
+            inodes[entry.stat().st_ino] = entry.name
+        # Session files that are hard links share the inode of their object
+        for root, _, names in os.walk(self._sessions_directory):
+            for name in names:
+                path = os.path.join(root, name)
+                digest = inodes.get(os.stat(path).st_ino)
+                if digest is not None:
+                    self._links.setdefault(digest, set()).add(path)
+                    self._paths[path] = digest
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self._objects_directory, digest)
+
+    def session_path(self, session_id: str, name: str) -> str:
+        return os.path.join(self._sessions_directory, safe_name(session_id), safe_name(name))
+
+    def submit(self, session_id: str, name: str, data: bytes):
+        """Queue a file for writing and return a future of its session path, the caller does not wait."""
+        future = self._writer.submit(self.__store, session_id, name, data)
+        future.add_done_callback(lambda done: done.exception() and self.log.error(
+            "Could not store artifact %s of session %s: %s", name, session_id, done.exception()))
+        return future
+
+    def __store(self, session_id: str, name: str, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = self.object_path(digest)
+        with self._lock:
+            known = digest in self._objects
+        if known:
+            self.counters["deduplicated"] += 1
+        else:
+            os.makedirs(self._objects_directory, exist_ok=True)
+            temporary_path = object_path + ".tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, object_path)
+            self.counters["stored"] += 1
+            self.counters["bytes_written"] += len(data)
+
+        path = self.session_path(session_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.lexists(path):
+            os.remove(path)
+        try:
+            os.link(object_path, path)
+        except OSError:
+            shutil.copyfile(object_path, path)
+
+        with self._lock:
+            # A session file replaced by other content no longer belongs to the old object
+            replaced = self._paths.get(path)
+            if replaced is not None and replaced != digest:
+                self._links[replaced].discard(path)
+            self._paths[path] = digest
+            self._objects[digest] = len(data)
+            self._objects.move_to_end(digest)
+            self._links.setdefault(digest, set()).add(path)
+        self.__enforce_retention()
+        return path
+
+    def __enforce_retention(self):
+        with self._lock:
+            evicted = []
+            total = sum(self._objects.values())
+            # The object stored last is always kept, even when it is larger than max_bytes on its own
+            while total > self.max_bytes and len(self._objects) > 1:
+                digest, size = self._objects.popitem(last=False)
+                total -= size
+                links = self._links.pop(digest, set())
+                for path in links:
+                    del self._paths[path]
+                evicted.append((digest, links))
+        for digest, links in evicted:
+            for path in [self.object_path(digest), *links]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.counters["evicted"] += 1
+            self.log.info("Evicted artifact %s and %d session files", digest, len(links))
+
+    def flush(self):
+        """Wait until every queued file is written."""
+        self._writer.submit(lambda: None).result()
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters, objects=len(self._objects), bytes=sum(self._objects.values()))
+        return stats
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore()
+        return _default_store
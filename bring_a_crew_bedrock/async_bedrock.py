@@ -0,0 +1,59 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 64
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def configure_bedrock_executor(max_workers: int = DEFAULT_MAX_WORKERS):
+    """
+    Replace the executor that runs the blocking boto3 calls for the async agents. The number of workers
+    bounds the number of Bedrock calls in flight for the whole process, not the number of sessions.
+    """
+    global _executor
+    with _executor_lock:
+        previous = _executor
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bedrock")
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return _executor
+
+
+def get_bedrock_executor() -> ThreadPoolExecutor:
+    """Return the dedicated executor for blocking Bedrock calls, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="bedrock")
+    return _executor
+
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Run a blocking function on the dedicated Bedrock executor without blocking the event loop. It runs in a
+    copy of the current context, so it sees the active trace span.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_bedrock_executor(),
+                                      functools.partial(contextvars.copy_context().run, function, *args, **kwargs))
+
+
+async def call_action_function(function, action_args: dict):
+    """
+    Call an action function from async code. Coroutine functions are awaited on the event loop, regular
+    functions run on the executor so a slow backend call does not stall other sessions.
+    """
+    if inspect.iscoroutinefunction(function):
+        return await function(**action_args)
+
+    result = await run_blocking(function, **action_args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
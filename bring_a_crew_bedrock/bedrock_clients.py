@@ -0,0 +1,44 @@
+import threading
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_REGION = "eu-west-1"
+MAX_POOL_CONNECTIONS = 50
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_bedrock_client(region_name: str = DEFAULT_REGION, service_name: str = "bedrock-runtime"):
+    """
+    Return the process wide client for a Bedrock service in a region. The client is created once, with a
+    connection pool large enough for the parallel and async agents and TCP keep-alive, and then shared.
+    boto3 clients are thread safe, creating them is not, hence the lock. Converse calls on bedrock-runtime are
+    retried by the RateLimitedBedrockClient, throttling as well as connection and read timeout errors, so
+    botocore does not retry them a second time.
+    """
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                config = Config(max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True)
+                if service_name == "bedrock-runtime":
+                    config = config.merge(Config(retries={"mode": "standard", "max_attempts": 1}))
+                client = boto3.client(service_name, region_name=region_name, config=config)
+                _clients[key] = client
+    return client
+
+
+def set_bedrock_client(client, region_name: str = DEFAULT_REGION, service_name: str = "bedrock-runtime"):
+    """Install a client as the shared client, for instance a wrapped client or a fake for offline runs."""
+    with _clients_lock:
+        _clients[(service_name, region_name)] = client
+
+
+def clear_bedrock_clients():
+    """Forget all shared clients, for instance after the credentials changed."""
+    with _clients_lock:
+        _clients.clear()
@@ -0,0 +1,116 @@
+import logging
+import re
+import threading
+
+SLIDING_WINDOW = "sliding_window"
+SUMMARIZE = "summarize"
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_summary_line_re = re.compile(r'^(Action:|Observation:|Answer:|\d+\. )')
+
+
+def estimate_tokens(message: dict) -> int:
+    """Rough token estimate for a converse message, good enough to keep a request within a budget."""
+    chars = 0
+    for block in message["content"]:
+        if "text" in block:
+            chars += len(block["text"])
+        else:
+            chars += len(str(block))
+    return MESSAGE_OVERHEAD_TOKENS + chars // CHARS_PER_TOKEN
+
+
+def compact_summary(messages, max_line_length: int = 200) -> str:
+    """Summarize turns without a model call, by keeping the Action, Observation and Answer lines."""
+    lines = []
+    for message in messages:
+        for block in message["content"]:
+            for line in block.get("text", "").split("\n"):
+                if _summary_line_re.match(line):
+                    lines.append(line[:max_line_length])
+    return "\n".join(lines)
+
+
+def llm_summarizer(client, model: str, max_tokens: int = 256):
+    """Create a summarizer that asks the model for a short summary of the turns that are dropped."""
+    def _summarize(messages):
+        transcript = "\n".join(block.get("text", "") for message in messages for block in message["content"])
+        response = client.converse(
+            modelId=model,
+            messages=[{"role": "user", "content": [{"text": transcript}]}],
+            system=[{"text": "Summarize the facts, decisions and results in this conversation in a few short lines."}],
+            inferenceConfig={"maxTokens": max_tokens, "temperature": 0},
+        )
+        return response["output"]["message"]["content"][0]["text"]
+    return _summarize
+
+
+class ConversationMemory:
+    """
+    Selects the messages that are sent to the model, so a request stays within a token budget. The first
+    user message, with the question, and the most recent turns are always sent. Older turns are dropped
+    in user/assistant pairs, which keeps the roles alternating. With the summarize strategy the dropped
+    turns are replaced by a summary that is added to the first message.
+    """
+    def __init__(self, token_budget: int = None, strategy: str = SLIDING_WINDOW, summarizer=None):
+        if strategy not in (SLIDING_WINDOW, SUMMARIZE):
+            raise ValueError("Unknown memory strategy: {}".format(strategy))
+        self.log = logging.getLogger("main.ConversationMemory")
+        self.token_budget = token_budget
+        self.strategy = strategy
+        self.summarizer = summarizer if summarizer is not None else compact_summary
+        self._stats_lock = threading.Lock()
+        self.full_tokens = 0
+        self.sent_tokens = 0
+        self._summary = (None, None)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.full_tokens - self.sent_tokens
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.full_tokens = 0
+            self.sent_tokens = 0
+        self._summary = (None, None)
+
+    def select(self, messages: list) -> list:
+        tokens = [estimate_tokens(message) for message in messages]
+        full = sum(tokens)
+        selected = messages
+        if self.token_budget is not None and full > self.token_budget and len(messages) > 2:
+            selected = self.__fit(messages, tokens)
+
+        sent = full if selected is messages else sum(estimate_tokens(message) for message in selected)
+        with self._stats_lock:
+            self.full_tokens += full
+            self.sent_tokens += sent
+        return selected
+
+    def __fit(self, messages, tokens):
+        first, rest = messages[0], messages[1:]
+        rest_tokens = tokens[1:]
+        available = self.token_budget - tokens[0]
+        remaining = sum(rest_tokens)
+
+        # Drop the oldest assistant/user pairs, the last message is always kept
+        start = 0
+        while len(rest) - start > 1 and remaining > available:
+            remaining -= rest_tokens[start] + rest_tokens[start + 1]
+            start += 2
+        dropped, rest = rest[:start], rest[start:]
+        self.log.info("Dropped %d messages to stay within %d tokens", len(dropped), self.token_budget)
+
+        if self.strategy == SUMMARIZE and dropped:
+            # The same turns are dropped again on the next call as long as nothing new was dropped
+            summary_key = (id(dropped[0]), len(dropped))
+            if self._summary[0] != summary_key:
+                self._summary = (summary_key, self.summarizer(dropped))
+            summary = self._summary[1]
+            first = {
+                "role": first["role"],
+                "content": first["content"] + [{"text": "Summary of the earlier turns:\n{}".format(summary)}]
+            }
+        return [first] + rest
@@ -0,0 +1,282 @@
+"""
+Typed events for the completion stream of invoke_inline_agent. The raw stream events are nested dicts, they
+are turned into small event objects once, so the sinks that render, count or log them do not each dig through
+the trace structure.
+"""
+
+PRE_PROCESSING = "pre_processing"
+ORCHESTRATION = "orchestration"
+POST_PROCESSING = "post_processing"
+
+
+class InlineAgentEvent:
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        return {"event": type(self).__name__, **{slot: getattr(self, slot) for slot in self.__slots__}}
+
+
+class InvocationStarted(InlineAgentEvent):
+    __slots__ = ("request_id", "session_id", "response")
+
+    def __init__(self, request_id: str, session_id: str, response: dict):
+        self.request_id = request_id
+        self.session_id = session_id
+        self.response = response
+
+    def to_dict(self) -> dict:
+        return {"event": "InvocationStarted", "request_id": self.request_id, "session_id": self.session_id}
+
+
+class Chunk(InlineAgentEvent):
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class AgentFailure(InlineAgentEvent):
+    __slots__ = ("reason",)
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+class Rationale(InlineAgentEvent):
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ToolInvocation(InlineAgentEvent):
+    """An action group call, parameters is None when the model provided none."""
+    __slots__ = ("tool", "parameters", "raw")
+
+    def __init__(self, tool: str, parameters, raw: dict):
+        self.tool = tool
+        self.parameters = parameters
+        self.raw = raw
+
+    def to_dict(self) -> dict:
+        return {"event": "ToolInvocation", "tool": self.tool, "parameters": self.parameters}
+
+
+class CodeInvocation(InlineAgentEvent):
+    __slots__ = ("code", "raw")
+
+    def __init__(self, code: str, raw: dict):
+        self.code = code
+        self.raw = raw
+
+    def to_dict(self) -> dict:
+        return {"event": "CodeInvocation", "code": self.code}
+
+
+class OtherInvocation(InlineAgentEvent):
+    """Any other invocation input, for instance a knowledge base lookup or a collaborator call."""
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+
+
+class ToolOutput(InlineAgentEvent):
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class CollaboratorOutput(InlineAgentEvent):
+    __slots__ = ("collaborator", "text")
+
+    def __init__(self, collaborator: str, text: str):
+        self.collaborator = collaborator
+        self.text = text
+
+
+class FinalResponse(InlineAgentEvent):
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ModelInvocation(InlineAgentEvent):
+    """
+    One LLM call of the agent with its token usage. The step and the seconds since the previous LLM call
+    are filled in for orchestration calls while the stream is read.
+    """
+    __slots__ = ("phase", "input_tokens", "output_tokens", "trace_id", "step", "duration_seconds")
+
+    def __init__(self, phase: str, input_tokens: int, output_tokens: int, trace_id: str = None):
+        self.phase = phase
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.trace_id = trace_id
+        self.step = None
+        self.duration_seconds = None
+
+
+class RawTrace(InlineAgentEvent):
+    """The unparsed trace, only produced when a sink asks for raw traces."""
+    __slots__ = ("trace",)
+
+    def __init__(self, trace: dict):
+        self.trace = trace
+
+
+class FilesProduced(InlineAgentEvent):
+    """
+    Files returned by the agent, for instance output of the code interpreter. Each file has name, type and
+    bytes, the session is filled in while the stream is read.
+    """
+    __slots__ = ("files", "session_id")
+
+    def __init__(self, files: list, session_id: str = None):
+        self.files = files
+        self.session_id = session_id
+
+    def to_dict(self) -> dict:
+        return {"event": "FilesProduced", "session_id": self.session_id,
+                "files": [{"name": f["name"], "type": f["type"], "size": len(f["bytes"])} for f in self.files]}
+
+
+class InvocationFinished(InlineAgentEvent):
+    __slots__ = ("result",)
+
+    def __init__(self, result):
+        self.result = result
+
+    def to_dict(self) -> dict:
+        return {"event": "InvocationFinished", **self.result.to_dict()}
+
+
+class InvocationFailed(InlineAgentEvent):
+    """Reading the stream failed, the exception is raised to the caller after the sinks have seen it."""
+    __slots__ = ("error", "input_text", "request_id", "retries")
+
+    def __init__(self, error: str, input_text: str, request_id: str, retries: int):
+        self.error = error
+        self.input_text = input_text
+        self.request_id = request_id
+        self.retries = retries
+
+
+def _usage_event(phase: str, model_invocation_output: dict) -> ModelInvocation:
+    usage = model_invocation_output["metadata"]["usage"]
+    return ModelInvocation(phase, usage["inputTokens"], usage["outputTokens"],
+                           model_invocation_output.get("traceId"))
+
+
+def _invocation_event(invocation_input: dict) -> InlineAgentEvent:
+    if "actionGroupInvocationInput" in invocation_input:
+        action_group = invocation_input["actionGroupInvocationInput"]
+        tool = action_group.get("function") or action_group.get("apiPath") or "undefined"
+        return ToolInvocation(tool, action_group.get("parameters"), invocation_input)
+    if "codeInterpreterInvocationInput" in invocation_input:
+        return CodeInvocation(invocation_input["codeInterpreterInvocationInput"]["code"], invocation_input)
+    return OtherInvocation(invocation_input)
+
+
+def parse_stream_event(event: dict, details: bool = True, raw_traces: bool = False):
+    """
+    Turn one raw completion stream event into typed events. Without details only the events needed for the
+    result are produced: the answer chunks, failures, the LLM calls with their usage and files.
+    """
+    if "chunk" in event:
+        yield Chunk(event["chunk"]["bytes"].decode("utf8"))
+
+    if "trace" in event:
+        trace = event["trace"]["trace"]
+        if "failureTrace" in trace:
+            yield AgentFailure(trace["failureTrace"]["failureReason"])
+
+        if "orchestrationTrace" in trace:
+            orchestration = trace["orchestrationTrace"]
+            if details:
+                if "rationale" in orchestration:
+                    yield Rationale(orchestration["rationale"]["text"])
+                if "invocationInput" in orchestration:
+                    yield _invocation_event(orchestration["invocationInput"])
+                if "observation" in orchestration:
+                    observation = orchestration["observation"]
+                    if "actionGroupInvocationOutput" in observation:
+                        yield ToolOutput(observation["actionGroupInvocationOutput"]["text"])
+                    if "agentCollaboratorInvocationOutput" in observation:
+                        collaborator = observation["agentCollaboratorInvocationOutput"]
+                        yield CollaboratorOutput(collaborator["agentCollaboratorName"], collaborator["output"]["text"])
+                    if "finalResponse" in observation:
+                        yield FinalResponse(observation["finalResponse"]["text"])
+            if "modelInvocationOutput" in orchestration:
+                yield _usage_event(ORCHESTRATION, orchestration["modelInvocationOutput"])
+
+        elif "preProcessingTrace" in trace:
+            if "modelInvocationOutput" in trace["preProcessingTrace"]:
+                yield _usage_event(PRE_PROCESSING, trace["preProcessingTrace"]["modelInvocationOutput"])
+
+        elif "postProcessingTrace" in trace:
+            if "modelInvocationOutput" in trace["postProcessingTrace"]:
+                yield _usage_event(POST_PROCESSING, trace["postProcessingTrace"]["modelInvocationOutput"])
+
+        if raw_traces:
+            yield RawTrace(event["trace"])
+
+    if "files" in event:
+        yield FilesProduced(event["files"]["files"])
+
+
+class InlineAgentResult:
+    """
+    What an invoke_inline_agent call returned: the answer with the request and session IDs, the LLM calls
+    with their token usage and the files the agent produced. error is set when the API call was not successful.
+    """
+    def __init__(self, answer: str = "", request_id: str = None, session_id: str = None, model_invocations=None,
+                 duration_seconds: float = 0.0, files=None, error: str = None):
+        self.answer = answer
+        self.request_id = request_id
+        self.session_id = session_id
+        self.model_invocations = list(model_invocations or [])
+        self.duration_seconds = duration_seconds
+        self.files = list(files or [])
+        self.error = error
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(invocation.input_tokens for invocation in self.model_invocations)
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(invocation.output_tokens for invocation in self.model_invocations)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def llm_calls(self) -> int:
+        return len(self.model_invocations)
+
+    @property
+    def steps(self) -> list:
+        """The orchestration steps with their duration, the time to complete the prior action, observe and orchestrate."""
+        return [{"step": invocation.step, "duration_seconds": invocation.duration_seconds,
+                 "input_tokens": invocation.input_tokens, "output_tokens": invocation.output_tokens}
+                for invocation in self.model_invocations if invocation.phase == ORCHESTRATION]
+
+    def to_dict(self) -> dict:
+        return {"answer": self.answer, "request_id": self.request_id, "session_id": self.session_id,
+                "input_tokens": self.input_tokens, "output_tokens": self.output_tokens, "llm_calls": self.llm_calls,
+                "steps": self.steps, "duration_seconds": self.duration_seconds, "files": self.files,
+                "error": self.error}
+
+    def __str__(self):
+        return self.error if self.error is not None else self.answer
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"InlineAgentResult(error={self.error!r})"
+        return (f"InlineAgentResult(answer={self.answer!r}, request_id={self.request_id!r}, "
+                f"llm_calls={self.llm_calls}, tokens={self.total_tokens} (in: {self.input_tokens}, "
+                f"out: {self.output_tokens}), duration={self.duration_seconds:,.1f}s)")
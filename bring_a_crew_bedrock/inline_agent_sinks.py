@@ -0,0 +1,232 @@
+"""
+Sinks for the typed events of invoke_inline_agent_helper. A sink has a handle(event) method and two flags:
+trace_details, when it needs the rationale, invocation and observation events, and raw_traces, when it needs
+the unparsed traces. Only what one of the sinks asks for is parsed, with no sinks only the answer and the
+token usage are extracted from the stream.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+
+from termcolor import colored
+
+from .artifact_store import get_artifact_store
+
+from .inline_agent_events import AgentFailure, CodeInvocation, CollaboratorOutput, FilesProduced, FinalResponse, \
+    InvocationFailed, InvocationFinished, InvocationStarted, ModelInvocation, ORCHESTRATION, OtherInvocation, \
+    POST_PROCESSING, PRE_PROCESSING, Rationale, RawTrace, ToolInvocation, ToolOutput
+
+TRACE_TRUNCATION_LENGTH = 300
+
+
+class InlineAgentSink(ABC):
+    trace_details = False
+    raw_traces = False
+
+    @abstractmethod
+    def handle(self, event):
+        pass
+
+
+class ConsoleSink(InlineAgentSink):
+    """
+    Renders the events like the agent console: rationale, tool calls and observations, steps with their
+    timing and token usage. trace_level is "core", "outline" (no tool parameters or observations) or "all"
+    (the raw traces instead of the rendered ones). Every event is written with a single write call.
+    """
+    def __init__(self, trace_level: str = "core", stream=None):
+        self.trace_level = trace_level
+        self.trace_details = trace_level in ["core", "outline"]
+        self.raw_traces = trace_level == "all"
+        self.stream = stream
+        self._console = None
+
+    def __write(self, *lines):
+        stream = self.stream or sys.stdout
+        stream.write("\n".join(lines) + "\n")
+
+    def __markdown(self, text: str):
+        # rich is only needed for generated code and files, and one console is enough for all of them
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console(file=self.stream)
+        from rich.markdown import Markdown
+        self._console.print(Markdown(text))
+
+    def handle(self, event):
+        handler = getattr(self, "_on_" + type(event).__name__, None)
+        if handler is not None:
+            handler(event)
+
+    def _on_InvocationStarted(self, event: InvocationStarted):
+        if self.trace_level == "all":
+            self.__write(f"invokeAgent API response object: {event.response}")
+        else:
+            self.__write(f"invokeAgent API request ID: {event.request_id}",
+                         f"invokeAgent API session ID: {event.session_id}")
+
+    def _on_AgentFailure(self, event: AgentFailure):
+        self.__write(colored(f"Agent error: {event.reason}", "red"))
+
+    def _on_Rationale(self, event: Rationale):
+        self.__write(colored(event.text, "blue"))
+
+    def _on_ToolInvocation(self, event: ToolInvocation):
+        if self.trace_level == "outline":
+            self.__write(str(event.raw), colored(f"Using tool: {event.tool}", "magenta"))
+        elif event.parameters is None:
+            self.__write(str(event.raw), colored(f"Using tool: {event.tool} with these inputs:", "magenta"),
+                         colored("  No parameters provided.\n", "magenta"))
+        elif len(event.parameters) == 1 and event.parameters[0]["name"] == "input_text":
+            self.__write(str(event.raw), colored(f"Using tool: {event.tool} with these inputs:", "magenta"),
+                         colored(f"{event.parameters[0]['value']}", "magenta"))
+        else:
+            self.__write(str(event.raw), colored(f"Using tool: {event.tool} with these inputs:", "magenta"),
+                         colored(f"{event.parameters}\n", "magenta"))
+
+    def _on_CodeInvocation(self, event: CodeInvocation):
+        self.__write(str(event.raw))
+        if self.trace_level == "outline":
+            self.__write(colored("Using code interpreter", "magenta"))
+        else:
+            self.__markdown(f"**Generated code**\n```python\n{event.code}\n```")
+
+    def _on_OtherInvocation(self, event: OtherInvocation):
+        self.__write(str(event.raw))
+
+    def _on_ToolOutput(self, event: ToolOutput):
+        if self.trace_level == "core":
+            self.__write(colored(f"--tool outputs:\n{event.text[0:TRACE_TRUNCATION_LENGTH]}...\n", "magenta"))
+
+    def _on_CollaboratorOutput(self, event: CollaboratorOutput):
+        if self.trace_level == "core":
+            self.__write(colored(f"\n----sub-agent {event.collaborator} output text:\n"
+                                 f"{event.text[0:TRACE_TRUNCATION_LENGTH]}...\n", "magenta"))
+
+    def _on_FinalResponse(self, event: FinalResponse):
+        if self.trace_level == "core":
+            self.__write(colored(f"Final response:\n{event.text[0:TRACE_TRUNCATION_LENGTH]}...", "cyan"))
+
+    def _on_ModelInvocation(self, event: ModelInvocation):
+        if event.phase == ORCHESTRATION:
+            self.__write(colored(f"---- Step {event.step} ----", "green"),
+                         colored(f"Took {event.duration_seconds:,.1f}s, using "
+                                 f"{event.input_tokens + event.output_tokens} tokens (in: {event.input_tokens}, "
+                                 f"out: {event.output_tokens}) to complete prior action, observe, orchestrate.",
+                                 "yellow"))
+        elif event.phase == PRE_PROCESSING:
+            self.__write(colored("Pre-processing trace, agent came up with an initial plan.", "yellow"),
+                         colored(f"Used LLM tokens, in: {event.input_tokens}, out: {event.output_tokens}", "yellow"))
+        elif event.phase == POST_PROCESSING:
+            self.__write(colored("Agent post-processing complete.", "yellow"),
+                         colored(f"Used LLM tokens, in: {event.input_tokens}, out: {event.output_tokens}", "yellow"))
+
+    def _on_RawTrace(self, event: RawTrace):
+        self.__write(json.dumps(event.trace, indent=2))
+
+    def _on_FilesProduced(self, event: FilesProduced):
+        self.__markdown("**Files**")
+        self.__write(*[f"{file['name']} ({file['type']})" for file in event.files])
+
+    def _on_InvocationFinished(self, event: InvocationFinished):
+        result = event.result
+        if result.error is not None:
+            if self.trace_level == "all":
+                self.__write(result.error)
+        elif self.trace_level in ["core", "outline"]:
+            self.__write(colored(f"Agent made a total of {result.llm_calls} LLM calls, using {result.total_tokens} "
+                                 f"tokens (in: {result.input_tokens}, out: {result.output_tokens}), and took "
+                                 f"{result.duration_seconds:,.1f} total seconds", "yellow"))
+        else:
+            self.__write(f"Returning agent answer as: {result.answer}")
+
+    def _on_InvocationFailed(self, event: InvocationFailed):
+        self.__write("Caught exception while processing input to invokeAgent:\n",
+                     f"  for input text:\n{event.input_text}\n",
+                     f"  request ID: {event.request_id}, retries: {event.retries}\n",
+                     f"Error: {event.error}")
+
+
+class MetricsSink(InlineAgentSink):
+    """Aggregates the invocations it sees, it can be shared by concurrent calls."""
+    trace_details = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self.tools = Counter()
+        self.durations = []
+
+    def handle(self, event):
+        with self._lock:
+            if isinstance(event, ModelInvocation):
+                self.counters["llm_calls"] += 1
+                self.counters["input_tokens"] += event.input_tokens
+                self.counters["output_tokens"] += event.output_tokens
+            elif isinstance(event, ToolInvocation):
+                self.tools[event.tool] += 1
+            elif isinstance(event, CodeInvocation):
+                self.tools["code_interpreter"] += 1
+            elif isinstance(event, AgentFailure):
+                self.counters["agent_errors"] += 1
+            elif isinstance(event, FilesProduced):
+                self.counters["files"] += len(event.files)
+            elif isinstance(event, InvocationFinished):
+                self.counters["invocations"] += 1
+                if event.result.error is not None:
+                    self.counters["failed"] += 1
+                else:
+                    self.durations.append(event.result.duration_seconds)
+            elif isinstance(event, InvocationFailed):
+                self.counters["invocations"] += 1
+                self.counters["failed"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            durations = sorted(self.durations)
+            snapshot = {key: self.counters[key] for key in
+                        ["invocations", "failed", "llm_calls", "input_tokens", "output_tokens", "agent_errors",
+                         "files"]}
+            snapshot["tool_calls"] = dict(self.tools)
+        snapshot["p50_seconds"] = durations[len(durations) // 2] if durations else None
+        snapshot["p95_seconds"] = durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else None
+        return snapshot
+
+
+class JsonLogSink(InlineAgentSink):
+    """Writes every event as one JSON line to a file path or an open text stream."""
+    trace_details = True
+
+    def __init__(self, target):
+        self._lock = threading.Lock()
+        self._owned = isinstance(target, (str, os.PathLike))
+        self.stream = open(target, "a", encoding="utf-8") if self._owned else target
+
+    def handle(self, event):
+        line = json.dumps({"time": time.time(), **event.to_dict()}, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            if isinstance(event, (InvocationFinished, InvocationFailed)):
+                self.stream.flush()
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
+
+
+class ArtifactSink(InlineAgentSink):
+    """
+    Hands the files the agent produced, for instance charts of the code interpreter, to an artifact store
+    that writes them in the background under the session of the request.
+    """
+    def __init__(self, store=None):
+        self.store = store or get_artifact_store()
+
+    def handle(self, event):
+        if isinstance(event, FilesProduced):
+            for file in event.files:
+                self.store.submit(event.session_id or "default", file["name"], file["bytes"])
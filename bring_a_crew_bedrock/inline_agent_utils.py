@@ -1,10 +1,19 @@
+import contextvars
 import json
-import os
-from datetime import datetime
+import queue
+import threading
+import time
+import uuid
+from collections import deque
 
-from rich.console import Console
-from rich.markdown import Markdown
-from termcolor import colored
+from .inline_agent_events import Chunk, FilesProduced, InlineAgentResult, InvocationFailed, InvocationFinished, \
+    InvocationStarted, ModelInvocation, ORCHESTRATION, parse_stream_event
+from .inline_agent_sinks import ArtifactSink, ConsoleSink
+from .parallel_dispatch import DEFAULT_MAX_WORKERS
+
+
+class InlineAgentTimeout(Exception):
+    """The completion stream of an inline agent was not read completely within the timeout."""
 
 
 def load_json_file(file_path) -> str:
@@ -14,301 +23,145 @@ def load_json_file(file_path) -> str:
     return json.dumps(data, indent=2)
 
 
-def invoke_inline_agent_helper(client, request_params, trace_level="core"):
-    _time_before_call = datetime.now()
-
-    _agent_resp = client.invoke_inline_agent(
-        **request_params
-    )
-
-    if request_params["enableTrace"]:
-        if trace_level == "all":
-            print(f"invokeAgent API response object: {_agent_resp}")
-        else:
-            print(
-                f"invokeAgent API request ID: {_agent_resp['ResponseMetadata']['RequestId']}"
-            )
-            session_id = request_params["sessionId"]
-            print(f"invokeAgent API session ID: {session_id}")
-
-    # Return error message if invoke was unsuccessful
-    if _agent_resp["ResponseMetadata"]["HTTPStatusCode"] != 200:
-        _error_message = f"API Response was not 200: {_agent_resp}"
-        if request_params["enableTrace"] and trace_level == "all":
-            print(_error_message)
-        return _error_message
-
-    _total_in_tokens = 0
-    _total_out_tokens = 0
-    _total_llm_calls = 0
-    _orch_step = 0
-    _sub_step = 0
-    _trace_truncation_lenght = 300
-    _time_before_orchestration = datetime.now()
-
-    _agent_answer = ""
-    _event_stream = _agent_resp["completion"]
-
+def default_sinks(request_params, trace_level="core") -> list:
+    """The console and the artifact store when tracing is enabled, nothing otherwise."""
+    if request_params.get("enableTrace"):
+        return [ConsoleSink(trace_level), ArtifactSink()]
+    return []
+
+
+def invoke_inline_agent_helper(client, request_params, trace_level="core", sinks=None,
+                               timeout_seconds: float = None) -> InlineAgentResult:
+    """
+    Invoke an inline agent and read its completion stream. Every event is parsed once into a typed event and
+    handed to the sinks, the details of the traces are only parsed when a sink needs them.
+
+    :param trace_level: "core", "outline" or "all", used for the console when no sinks are given
+    :param sinks: list of sinks like ConsoleSink, MetricsSink or JsonLogSink, an empty list renders nothing
+    :param timeout_seconds: stop reading the stream and raise InlineAgentTimeout when it takes longer
+    :return: the answer with the request ID, the token usage and the timing of every orchestration step
+    """
+    if sinks is None:
+        sinks = default_sinks(request_params, trace_level)
+    details = any(sink.trace_details for sink in sinks)
+    raw_traces = any(sink.raw_traces for sink in sinks)
+
+    def _emit(event):
+        for sink in sinks:
+            sink.handle(event)
+
+    time_before_call = time.perf_counter()
+    deadline = time_before_call + timeout_seconds if timeout_seconds is not None else None
+    agent_response = client.invoke_inline_agent(**request_params)
+    metadata = agent_response["ResponseMetadata"]
+    result = InlineAgentResult(request_id=metadata.get("RequestId"), session_id=request_params.get("sessionId"))
+    _emit(InvocationStarted(result.request_id, result.session_id, agent_response))
+
+    # Return the error if invoke was unsuccessful
+    if metadata["HTTPStatusCode"] != 200:
+        result.error = f"API Response was not 200: {agent_response}"
+        _emit(InvocationFinished(result))
+        return result
+
+    step = 0
+    time_before_orchestration = time.perf_counter()
+    event_stream = agent_response["completion"]
     try:
-        for _event in _event_stream:
-            _sub_agent_alias_id = None
-
-            if "chunk" in _event:
-                _data = _event["chunk"]["bytes"]
-                _agent_answer = _data.decode("utf8")
-
-            if "trace" in _event and request_params["enableTrace"]:
-                if "failureTrace" in _event["trace"]["trace"]:
-                    print(
-                        colored(
-                            f"Agent error: {_event['trace']['trace']['failureTrace']['failureReason']}",
-                            "red",
-                        )
-                    )
-
-                if "orchestrationTrace" in _event["trace"]["trace"]:
-                    _orch = _event["trace"]["trace"]["orchestrationTrace"]
-
-                    if trace_level in ["core", "outline"]:
-                        if "rationale" in _orch:
-                            _rationale = _orch["rationale"]
-                            print(colored(f"{_rationale['text']}", "blue"))
-
-                        if "invocationInput" in _orch:
-                            # NOTE: when agent determines invocations should happen in parallel
-                            # the trace objects for invocation input still come back one at a time.
-                            _input = _orch["invocationInput"]
-                            print(_input)
-
-                            if "actionGroupInvocationInput" in _input:
-                                if 'function' in _input['actionGroupInvocationInput']:
-                                    tool = _input['actionGroupInvocationInput']['function']
-                                elif 'apiPath' in _input['actionGroupInvocationInput']:
-                                    tool = _input['actionGroupInvocationInput']['apiPath']
-                                else:
-                                    tool = 'undefined'
-                                if trace_level == "outline":
-                                    print(
-                                        colored(
-                                            f"Using tool: {tool}",
-                                            "magenta",
-                                        )
-                                    )
-                                else:
-                                    print(
-                                        colored(
-                                            f"Using tool: {tool} with these inputs:",
-                                            "magenta",
-                                        )
-                                    )
-                                    # TODO made a change here to print the inputs
-                                    if "parameters" not in _input["actionGroupInvocationInput"]:
-                                        print(
-                                            colored(
-                                                f"  No parameters provided.\n",
-                                                "magenta",
-                                            )
-                                        )
-                                    else:
-                                        if (
-                                            len(
-                                                _input["actionGroupInvocationInput"][
-                                                    "parameters"
-                                                ]
-                                            )
-                                            == 1
-                                        ) and (
-                                            _input["actionGroupInvocationInput"][
-                                                "parameters"
-                                            ][0]["name"]
-                                            == "input_text"
-                                        ):
-                                            print(
-                                                colored(
-                                                    f"{_input['actionGroupInvocationInput']['parameters'][0]['value']}",
-                                                    "magenta",
-                                                )
-                                            )
-                                        else:
-                                            print(
-                                                colored(
-                                                    f"{_input['actionGroupInvocationInput']['parameters']}\n",
-                                                    "magenta",
-                                                )
-                                            )
-
-                            elif "codeInterpreterInvocationInput" in _input:
-                                if trace_level == "outline":
-                                    print(
-                                        colored(
-                                            f"Using code interpreter", "magenta"
-                                        )
-                                    )
-                                else:
-                                    console = Console()
-                                    _gen_code = _input[
-                                        "codeInterpreterInvocationInput"
-                                    ]["code"]
-                                    _code = f"```python\n{_gen_code}\n```"
-
-                                    console.print(
-                                        Markdown(f"**Generated code**\n{_code}")
-                                    )
-
-                        if "observation" in _orch:
-                            if trace_level == "core":
-                                _output = _orch["observation"]
-                                if "actionGroupInvocationOutput" in _output:
-                                    print(
-                                        colored(
-                                            f"--tool outputs:\n{_output['actionGroupInvocationOutput']['text'][0:_trace_truncation_lenght]}...\n",
-                                            "magenta",
-                                        )
-                                    )
-
-                                if "agentCollaboratorInvocationOutput" in _output:
-                                    _collab_name = _output[
-                                        "agentCollaboratorInvocationOutput"
-                                    ]["agentCollaboratorName"]
-                                    _collab_output_text = _output[
-                                        "agentCollaboratorInvocationOutput"
-                                    ]["output"]["text"][0:_trace_truncation_lenght]
-                                    print(
-                                        colored(
-                                            f"\n----sub-agent {_collab_name} output text:\n{_collab_output_text}...\n",
-                                            "magenta",
-                                        )
-                                    )
-
-                                if "finalResponse" in _output:
-                                    print(
-                                        colored(
-                                            f"Final response:\n{_output['finalResponse']['text'][0:_trace_truncation_lenght]}...",
-                                            "cyan",
-                                        )
-                                    )
-
-
-                    if "modelInvocationOutput" in _orch:
-                        _orch_step += 1
-                        _sub_step = 0
-                        print(colored(f"---- Step {_orch_step} ----", "green"))
-
-                        _llm_usage = _orch["modelInvocationOutput"]["metadata"][
-                            "usage"
-                        ]
-                        _in_tokens = _llm_usage["inputTokens"]
-                        _total_in_tokens += _in_tokens
-
-                        _out_tokens = _llm_usage["outputTokens"]
-                        _total_out_tokens += _out_tokens
-
-                        _total_llm_calls += 1
-                        _orch_duration = (
-                            datetime.now() - _time_before_orchestration
-                        )
-
-                        print(
-                            colored(
-                                f"Took {_orch_duration.total_seconds():,.1f}s, using {_in_tokens+_out_tokens} tokens (in: {_in_tokens}, out: {_out_tokens}) to complete prior action, observe, orchestrate.",
-                                "yellow",
-                            )
-                        )
-
-                        # restart the clock for next step/sub-step
-                        _time_before_orchestration = datetime.now()
-
-                elif "preProcessingTrace" in _event["trace"]["trace"]:
-                    _pre = _event["trace"]["trace"]["preProcessingTrace"]
-                    if "modelInvocationOutput" in _pre:
-                        _llm_usage = _pre["modelInvocationOutput"]["metadata"][
-                            "usage"
-                        ]
-                        _in_tokens = _llm_usage["inputTokens"]
-                        _total_in_tokens += _in_tokens
-
-                        _out_tokens = _llm_usage["outputTokens"]
-                        _total_out_tokens += _out_tokens
-
-                        _total_llm_calls += 1
-
-                        print(
-                            colored(
-                                "Pre-processing trace, agent came up with an initial plan.",
-                                "yellow",
-                            )
-                        )
-                        print(
-                            colored(
-                                f"Used LLM tokens, in: {_in_tokens}, out: {_out_tokens}",
-                                "yellow",
-                            )
-                        )
-
-                elif "postProcessingTrace" in _event["trace"]["trace"]:
-                    _post = _event["trace"]["trace"]["postProcessingTrace"]
-                    if "modelInvocationOutput" in _post:
-                        _llm_usage = _post["modelInvocationOutput"]["metadata"][
-                            "usage"
-                        ]
-                        _in_tokens = _llm_usage["inputTokens"]
-                        _total_in_tokens += _in_tokens
-
-                        _out_tokens = _llm_usage["outputTokens"]
-                        _total_out_tokens += _out_tokens
-
-                        _total_llm_calls += 1
-                        print(colored("Agent post-processing complete.", "yellow"))
-                        print(
-                            colored(
-                                f"Used LLM tokens, in: {_in_tokens}, out: {_out_tokens}",
-                                "yellow",
-                            )
-                        )
-
-                if trace_level == "all":
-                    print(json.dumps(_event["trace"], indent=2))
-
-            if "files" in _event.keys() and request_params["enableTrace"]:
-                console = Console()
-                files_event = _event["files"]
-                console.print(Markdown("**Files**"))
-
-                files_list = files_event["files"]
-                for this_file in files_list:
-                    print(f"{this_file['name']} ({this_file['type']})")
-                    file_bytes = this_file["bytes"]
-
-                    # save bytes to file, given the name of file and the bytes
-                    file_name = os.path.join("output", this_file["name"])
-                    with open(file_name, "wb") as f:
-                        f.write(file_bytes)
-
-        if request_params["enableTrace"]:
-            duration = datetime.now() - _time_before_call
-
-            if trace_level in ["core", "outline"]:
-                print(
-                    colored(
-                        f"Agent made a total of {_total_llm_calls} LLM calls, "
-                        + f"using {_total_in_tokens+_total_out_tokens} tokens "
-                        + f"(in: {_total_in_tokens}, out: {_total_out_tokens})"
-                        + f", and took {duration.total_seconds():,.1f} total seconds",
-                        "yellow",
-                    )
-                )
-
-            if trace_level == "all":
-                print(f"Returning agent answer as: {_agent_answer}")
-
-        return _agent_answer
+        for raw_event in event_stream:
+            if deadline is not None and time.perf_counter() > deadline:
+                if hasattr(event_stream, "close"):
+                    event_stream.close()
+                raise InlineAgentTimeout(f"No answer after {timeout_seconds}s")
+            for event in parse_stream_event(raw_event, details, raw_traces):
+                if isinstance(event, Chunk):
+                    result.answer = event.text
+                elif isinstance(event, ModelInvocation):
+                    if event.phase == ORCHESTRATION:
+                        step += 1
+                        now = time.perf_counter()
+                        event.step = step
+                        event.duration_seconds = now - time_before_orchestration
+                        # restart the clock for the next step
+                        time_before_orchestration = now
+                    result.model_invocations.append(event)
+                elif isinstance(event, FilesProduced):
+                    event.session_id = result.session_id
+                    result.files.extend(file["name"] for file in event.files)
+                if sinks:
+                    _emit(event)
+
+        result.duration_seconds = time.perf_counter() - time_before_call
+        _emit(InvocationFinished(result))
+        return result
 
     except Exception as e:
-        print(f"Caught exception while processing input to invokeAgent:\n")
-        input_text = request_params["inputText"]
-        print(f"  for input text:\n{input_text}\n")
-        print(
-            f"  request ID: {_agent_resp['ResponseMetadata']['RequestId']}, retries: {_agent_resp['ResponseMetadata']['RetryAttempts']}\n"
-        )
-        print(f"Error: {e}")
-        raise Exception("Unexpected exception: ", e)
\ No newline at end of file
+        _emit(InvocationFailed(str(e), request_params["inputText"], metadata.get("RequestId"),
+                               metadata.get("RetryAttempts")))
+        if isinstance(e, InlineAgentTimeout):
+            raise
+        raise Exception("Unexpected exception: ", e)
+
+
+def invoke_inline_agents(client, requests, max_workers: int = DEFAULT_MAX_WORKERS, timeout_seconds: float = None,
+                         sinks=None):
+    """
+    Invoke many inline agent requests at once and yield (index, InlineAgentResult) in the order they complete.
+    Every request gets its own sessionId unless it has one, and at most max_workers streams are read at the
+    same time. A request that fails or takes longer than timeout_seconds, counted from when it started,
+    yields a result with error set instead of raising, so one slow agent does not hold up the rest. A blocked
+    stream can not be interrupted: at its deadline its thread is abandoned and the next queued request
+    starts in its place, so hung streams never keep the queued requests waiting.
+
+    :param requests: list of request parameters for invoke_inline_agent
+    :param sinks: sinks shared by all requests, for instance a MetricsSink. The default renders nothing,
+        interleaved console traces of concurrent requests are not readable.
+    """
+    sinks = [] if sinks is None else sinks
+    requests = [dict(request, sessionId=request.get("sessionId") or uuid.uuid4().hex) for request in requests]
+    completed = queue.SimpleQueue()
+    started = {}
+
+    def _invoke(index: int, request: dict):
+        try:
+            result = invoke_inline_agent_helper(client, request, sinks=sinks, timeout_seconds=timeout_seconds)
+        except Exception as e:
+            result = InlineAgentResult(session_id=request["sessionId"], error=str(e),
+                                       duration_seconds=time.monotonic() - started[index])
+        completed.put((index, result))
+
+    def _start(index: int):
+        started[index] = time.monotonic()
+        # A daemon thread per request, an abandoned one does not keep the process alive
+        threading.Thread(target=contextvars.copy_context().run, args=(_invoke, index, requests[index]),
+                         name=f"inline-agent-{index}", daemon=True).start()
+
+    queued = deque(range(len(requests)))
+    running = set()
+    while queued or running:
+        while queued and len(running) < max(1, max_workers):
+            index = queued.popleft()
+            running.add(index)
+            _start(index)
+
+        wait_seconds = None
+        if timeout_seconds is not None:
+            # Wake up for the first running request that reaches its deadline, its stream may be blocked
+            wait_seconds = max(0.0, min(started[index] for index in running) + timeout_seconds - time.monotonic())
+        try:
+            index, result = completed.get(timeout=wait_seconds)
+        except queue.Empty:
+            pass
+        else:
+            # The late result of an abandoned request was already reported as timed out
+            if index in running:
+                running.discard(index)
+                yield index, result
+
+        if timeout_seconds is not None:
+            now = time.monotonic()
+            for index in sorted(index for index in running if now - started[index] >= timeout_seconds):
+                # The worker stops reading at the next event, its slot goes to the next request right away
+                running.discard(index)
+                yield index, InlineAgentResult(session_id=requests[index]["sessionId"],
+                                               error=f"No answer after {timeout_seconds}s",
+                                               duration_seconds=now - started[index])
@@ -1,10 +1,14 @@
+import argparse
+import base64
+import hashlib
 import json
 import logging
 import os
-import shutil
+import random
+import tempfile
 import time
-import uuid
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 import boto3
@@ -14,9 +18,46 @@ logging.basicConfig(format='[%(asctime)s] p%(process)s {%(filename)s:%(lineno)d}
                     level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BASIC_EXECUTION_POLICY_ARN = 'arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
+DEFAULT_MAX_WORKERS = 4
+LAMBDA_PACKAGE_CACHE = os.environ.get(
+    "LAMBDA_PACKAGE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "bring_a_crew_bedrock", "lambda_packages"))
+ACTION_GROUP_RUNTIME = "action_group_runtime.py"
+# The earliest date a zip can hold, the same for every build
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+WAITER_CONFIG = {'Delay': 1, 'MaxAttempts': 120}
+# A new role can not be assumed by Lambda until IAM has propagated it, and a function can not be changed
+# while an update is in progress
+RETRYABLE_ERRORS = ('InvalidParameterValueException', 'ResourceConflictException', 'TooManyRequestsException',
+                    'ThrottlingException', 'Throttling', 'ServiceException')
+
+
+def _error_code(exception):
+    # Errors without a response, like a read timeout, can have a response attribute that is None
+    return (getattr(exception, 'response', None) or {}).get('Error', {}).get('Code')
+
+
+def call_with_backoff(function, max_attempts=8, base_delay=0.5, max_delay=8.0, **kwargs):
+    """
+    Call an AWS API and retry the errors that go away by themselves, with jittered exponential backoff.
+    InvalidParameterValueException is only retried while the role can not be assumed yet.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return function(**kwargs)
+        except Exception as e:
+            code = _error_code(e)
+            retryable = code in RETRYABLE_ERRORS and (
+                code != 'InvalidParameterValueException' or 'assume' in str(e).lower())
+            if not retryable or attempt == max_attempts - 1:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.info(f"{code} calling {getattr(function, '__name__', function)}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
 
 def create_iam_role(iam_client, lambda_role_name):
-    """Create IAM role for Lambda function"""
+    """Create IAM role for Lambda function, waiting until IAM reports it instead of sleeping"""
     assume_role_policy_document = {
         "Version": "2012-10-17",
         "Statement": [
@@ -51,12 +92,13 @@ def create_iam_role(iam_client, lambda_role_name):
             )
 
             # Wait for role to be created
-            time.sleep(10)
+            iam_client.get_waiter('role_exists').wait(RoleName=lambda_role_name, WaiterConfig=WAITER_CONFIG)
 
             # Attach basic execution role policy
-            iam_client.attach_role_policy(
+            call_with_backoff(
+                iam_client.attach_role_policy,
                 RoleName=lambda_role_name,
-                PolicyArn='arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
+                PolicyArn=BASIC_EXECUTION_POLICY_ARN
             )
 
             return lambda_iam_role
@@ -64,50 +106,129 @@ def create_iam_role(iam_client, lambda_role_name):
             logger.error(f"Error creating IAM role: {str(e)}")
             raise
 
-def prepare_lambda_code(lambda_code_path):
-    """Prepare Lambda code by copying it to a temporary directory with correct structure"""
-    # Create a temporary directory
-    temp_dir = "/tmp/lambda_deploy_" + str(uuid.uuid4())
-    os.makedirs(temp_dir, exist_ok=True)
+def package_files(lambda_code_path):
+    """
+    The files of the deployment package of a Lambda, by their name in the zip: the handler as lambda_function.py
+    and the shared action group runtime from the same directory that it imports
+    """
+    files = {"lambda_function.py": lambda_code_path}
+    runtime_path = os.path.join(os.path.dirname(os.path.abspath(lambda_code_path)), ACTION_GROUP_RUNTIME)
+    if os.path.exists(runtime_path):
+        files[ACTION_GROUP_RUNTIME] = runtime_path
+    return files
+
+
+def source_hash(files):
+    """SHA-256 over the names and contents of the package files, the key of the package cache"""
+    digest = hashlib.sha256()
+    for arcname in sorted(files):
+        with open(files[arcname], "rb") as file:
+            content = file.read()
+        digest.update(f"{arcname}\0{len(content)}\0".encode("utf-8"))
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def build_deterministic_zip(files):
+    """
+    Zip the files in name order with a fixed timestamp and permissions, so the same sources always give the
+    same bytes and the same CodeSha256 in Lambda
+    """
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        for arcname in sorted(files):
+            info = zipfile.ZipInfo(arcname, date_time=ZIP_TIMESTAMP)
+            # Unix, whatever the platform that builds the zip, so the permissions are read the same way
+            info.create_system = 3
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(files[arcname], "rb") as file:
+                z.writestr(info, file.read())
+    return buffer.getvalue()
+
 
-    # Copy the lambda function to the temp directory
-    target_path = os.path.join(temp_dir, "lambda_function.py")
-    shutil.copy2(lambda_code_path, target_path)
+def code_sha256(zip_content):
+    """The hash Lambda reports as CodeSha256: the base64 encoded SHA-256 of the zip"""
+    return base64.b64encode(hashlib.sha256(zip_content).digest()).decode("ascii")
 
-    return target_path
 
+def prepare_lambda_code(lambda_code_path, cache_directory=None):
+    """
+    Prepare the deployment package of a Lambda. Packages are cached by source hash, unchanged sources are not
+    zipped again. The package is written to a temporary file next to the cache entry and renamed, nothing is
+    left behind in /tmp.
 
-def create_lambda_function(lambda_client, lambda_name, lambda_code_path, role_arn):
-    """Create Lambda function or return existing function if it exists"""
+    :return: dict with the zip_content, its code_sha256 and the source_hash
+    """
+    cache_directory = cache_directory or LAMBDA_PACKAGE_CACHE
+    files = package_files(lambda_code_path)
+    key = source_hash(files)
+    cache_path = os.path.join(cache_directory, f"{key}.zip")
+    try:
+        with open(cache_path, "rb") as file:
+            zip_content = file.read()
+        logger.info(f"Using cached package {cache_path}")
+    except FileNotFoundError:
+        zip_content = build_deterministic_zip(files)
+        os.makedirs(cache_directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_directory, suffix=".tmp", delete=False) as file:
+            try:
+                file.write(zip_content)
+            except Exception:
+                os.remove(file.name)
+                raise
+        os.replace(file.name, cache_path)
+    return {"zip_content": zip_content, "code_sha256": code_sha256(zip_content), "source_hash": key}
+
+
+def create_lambda_function(lambda_client, lambda_name, lambda_code_path, role_arn, cache_directory=None):
+    """
+    Create Lambda function, or update the code of an existing function when its CodeSha256 differs from the
+    local package. Unchanged functions are not uploaded again.
+    """
+    package = prepare_lambda_code(lambda_code_path, cache_directory)
     try:
         # Check if the Lambda function already exists
         lambda_function = lambda_client.get_function(FunctionName=lambda_name)
-        logger.info(f"Lambda function {lambda_name} already exists.")
-        return lambda_function['Configuration']
     except lambda_client.exceptions.ResourceNotFoundException:
         try:
-            # Package lambda function code
-            s = BytesIO()
-            with zipfile.ZipFile(s, 'w') as z:
-                # Use just the filename, not the full path
-                z.write(lambda_code_path, "lambda_function.py")
-            zip_content = s.getvalue()
-
-            # Create lambda function
-            lambda_function = lambda_client.create_function(
+            # Create lambda function, retried until the new role can be assumed by Lambda
+            lambda_function = call_with_backoff(
+                lambda_client.create_function,
                 FunctionName=lambda_name,
                 Runtime='python3.12',
                 Timeout=180,
                 Role=role_arn,
-                Code={'ZipFile': zip_content},
+                Code={'ZipFile': package['zip_content']},
                 Handler='lambda_function.lambda_handler'
             )
 
+            # Wait until the function can be invoked
+            lambda_client.get_waiter('function_active_v2').wait(FunctionName=lambda_name,
+                                                                WaiterConfig=WAITER_CONFIG)
             return lambda_function
         except Exception as e:
             logger.error(f"Error creating Lambda function: {str(e)}")
             raise
 
+    configuration = lambda_function['Configuration']
+    if configuration.get('CodeSha256') == package['code_sha256']:
+        logger.info(f"Lambda function {lambda_name} already exists with the same code.")
+        return configuration
+
+    try:
+        logger.info(f"Lambda function {lambda_name} exists with other code, updating it.")
+        configuration = call_with_backoff(
+            lambda_client.update_function_code,
+            FunctionName=lambda_name,
+            ZipFile=package['zip_content']
+        )
+        lambda_client.get_waiter('function_updated_v2').wait(FunctionName=lambda_name, WaiterConfig=WAITER_CONFIG)
+        return configuration
+    except Exception as e:
+        logger.error(f"Error updating Lambda function code: {str(e)}")
+        raise
+
 
 def add_bedrock_permission(lambda_client, lambda_name, region, account_id):
     """Add Bedrock permission to Lambda function if it does not already exist"""
@@ -121,7 +242,8 @@ def add_bedrock_permission(lambda_client, lambda_name, region, account_id):
                 return
 
         # Permission does not exist, add it
-        lambda_client.add_permission(
+        call_with_backoff(
+            lambda_client.add_permission,
             FunctionName=lambda_name,
             StatementId='allow_bedrock2',
             Action='lambda:InvokeFunction',
@@ -132,7 +254,8 @@ def add_bedrock_permission(lambda_client, lambda_name, region, account_id):
     except lambda_client.exceptions.ClientError as e:
         if e.response['Error']['Code'] == 'ResourceNotFoundException':
             logger.info(f"No existing policy found for Lambda function {lambda_name}. Adding new permission.")
-            lambda_client.add_permission(
+            call_with_backoff(
+                lambda_client.add_permission,
                 FunctionName=lambda_name,
                 StatementId='allow_bedrock2',
                 Action='lambda:InvokeFunction',
@@ -148,13 +271,16 @@ def create_lambda_function_and_its_resources(
         region,
         account_id,
         custom_name,
-        lambda_code_path
+        lambda_code_path,
+        iam_client=None,
+        lambda_client=None,
+        cache_directory=None
 ):
-    """Main function to create all Lambda resources"""
+    """Main function to create all Lambda resources, the clients can be passed in to share or stub them"""
     try:
         # Initialize AWS clients
-        iam_client = boto3.client('iam', region_name=region)
-        lambda_client = boto3.client('lambda', region_name=region)
+        iam_client = iam_client or boto3.client('iam', region_name=region)
+        lambda_client = lambda_client or boto3.client('lambda', region_name=region)
 
         # Generate names with suffix
         suffix = f"{region}-{account_id}"
@@ -169,7 +295,8 @@ def create_lambda_function_and_its_resources(
             lambda_client,
             lambda_name,
             lambda_code_path,
-            lambda_iam_role['Role']['Arn']
+            lambda_iam_role['Role']['Arn'],
+            cache_directory
         )
 
         # Add Bedrock permission
@@ -186,13 +313,15 @@ def create_lambda_function_and_its_resources(
 def remove_lambda_function_and_its_resources(
         region,
         account_id,
-        custom_name
+        custom_name,
+        iam_client=None,
+        lambda_client=None
 ):
-    """Main function to remove all Lambda resources"""
+    """Main function to remove all Lambda resources, resources that are already gone are skipped"""
     try:
         # Initialize AWS clients
-        iam_client = boto3.client('iam', region_name=region)
-        lambda_client = boto3.client('lambda', region_name=region)
+        iam_client = iam_client or boto3.client('iam', region_name=region)
+        lambda_client = lambda_client or boto3.client('lambda', region_name=region)
 
         # Generate names with suffix
         suffix = f"{region}-{account_id}"
@@ -200,17 +329,109 @@ def remove_lambda_function_and_its_resources(
         lambda_name = f'{custom_name}-{suffix}'
 
         # Remove Lambda function
-        lambda_client.delete_function(FunctionName=lambda_name)
-        logger.info(f"Lambda function {lambda_name} deleted.")
+        try:
+            call_with_backoff(lambda_client.delete_function, FunctionName=lambda_name)
+            logger.info(f"Lambda function {lambda_name} deleted.")
+        except lambda_client.exceptions.ResourceNotFoundException:
+            logger.info(f"Lambda function {lambda_name} does not exist.")
 
-        # Detach and delete IAM role
-        iam_client.detach_role_policy(
-            RoleName=lambda_role_name,
-            PolicyArn='arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
-        )
-        iam_client.delete_role(RoleName=lambda_role_name)
-        logger.info(f"IAM role {lambda_role_name} deleted.")
+        # Detach the policy, a role that was created but never got the policy can still be deleted
+        try:
+            call_with_backoff(
+                iam_client.detach_role_policy,
+                RoleName=lambda_role_name,
+                PolicyArn=BASIC_EXECUTION_POLICY_ARN
+            )
+        except iam_client.exceptions.NoSuchEntityException:
+            logger.info(f"IAM role {lambda_role_name} does not exist or has no policy attached.")
+
+        # Delete IAM role
+        try:
+            call_with_backoff(iam_client.delete_role, RoleName=lambda_role_name)
+            logger.info(f"IAM role {lambda_role_name} deleted.")
+        except iam_client.exceptions.NoSuchEntityException:
+            logger.info(f"IAM role {lambda_role_name} does not exist.")
 
     except Exception as e:
         logger.error(f"Error removing Lambda resources: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def load_manifest(manifest_path):
+    """
+    Load a manifest of Lambdas, a JSON list like [{"name": "schedule", "code_path": "lambda_function_schedule.py"}].
+    Code paths are relative to the manifest, custom_name defaults to inlineagent-<name>.
+    """
+    with open(manifest_path, "r") as file:
+        entries = json.load(file)
+    base_directory = os.path.dirname(os.path.abspath(manifest_path))
+    return [
+        {
+            'name': entry['name'],
+            'custom_name': entry.get('custom_name', f"inlineagent-{entry['name']}"),
+            'code_path': os.path.join(base_directory, entry['code_path']),
+        }
+        for entry in entries
+    ]
+
+
+def _run_for_manifest(function, manifest, max_workers):
+    """Run function for every Lambda of the manifest at the same time, return the results by name"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {entry['name']: executor.submit(function, entry) for entry in manifest}
+    errors = {name: future.exception() for name, future in futures.items() if future.exception() is not None}
+    if errors:
+        raise Exception(f"Failed for {', '.join(sorted(errors))}: {errors}")
+    return {name: future.result() for name, future in futures.items()}
+
+
+def provision_lambdas(manifest, region, account_id, iam_client=None, lambda_client=None,
+                      max_workers=DEFAULT_MAX_WORKERS, cache_directory=None):
+    """
+    Create the roles, functions and Bedrock permissions of all Lambdas in the manifest concurrently.
+    boto3 clients are thread safe, one IAM and one Lambda client are shared by all workers.
+    Returns the resources by name, like create_lambda_function_and_its_resources.
+    """
+    iam_client = iam_client or boto3.client('iam', region_name=region)
+    lambda_client = lambda_client or boto3.client('lambda', region_name=region)
+    return _run_for_manifest(
+        lambda entry: create_lambda_function_and_its_resources(
+            region, account_id, entry['custom_name'], entry['code_path'], iam_client, lambda_client,
+            cache_directory),
+        manifest, max_workers)
+
+
+def teardown_lambdas(manifest, region, account_id, iam_client=None, lambda_client=None,
+                     max_workers=DEFAULT_MAX_WORKERS):
+    """Remove the functions and roles of all Lambdas in the manifest concurrently"""
+    iam_client = iam_client or boto3.client('iam', region_name=region)
+    lambda_client = lambda_client or boto3.client('lambda', region_name=region)
+    _run_for_manifest(
+        lambda entry: remove_lambda_function_and_its_resources(
+            region, account_id, entry['custom_name'], iam_client, lambda_client),
+        manifest, max_workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision or remove the Lambdas of a manifest")
+    parser.add_argument("command", choices=["provision", "teardown"])
+    parser.add_argument("--manifest", default=os.path.join(os.path.dirname(__file__), "lambdas", "manifest.json"))
+    parser.add_argument("--region", default="eu-west-1")
+    parser.add_argument("--account-id", help="Defaults to the account of the current credentials")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    args = parser.parse_args()
+
+    account_id = args.account_id or boto3.client("sts").get_caller_identity()["Account"]
+    manifest = load_manifest(args.manifest)
+    start = time.perf_counter()
+    if args.command == "provision":
+        resources = provision_lambdas(manifest, args.region, account_id, max_workers=args.max_workers)
+        for name, resource in resources.items():
+            print(f"{name}: {resource['lambda_function']['FunctionArn']}")
+    else:
+        teardown_lambdas(manifest, args.region, account_id, max_workers=args.max_workers)
+    logger.info(f"{args.command} of {len(manifest)} Lambdas took {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Shared runtime for the action group Lambdas of the Bedrock agents. A handler is created from a route table
+that maps every apiPath to its function and the types of its parameters:
+
+    lambda_handler = create_handler({
+        "/book_room": (book_room, {"req_date": str, "timeslot": str, "number_of_people": int}),
+    })
+
+Deployed, this module sits next to lambda_function.py in the zip, lambda_creator packages it.
+"""
+import json
+import logging
+import os
+import random
+
+# Share of the invocations that log their full event and response, PAYLOAD_LOG_SAMPLE_RATE=1 logs all of them
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get("PAYLOAD_LOG_SAMPLE_RATE", "0.01"))
+
+logger = logging.getLogger()
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+
+_TRUE_VALUES = frozenset(("true", "yes", "1"))
+_FALSE_VALUES = frozenset(("false", "no", "0"))
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE_VALUES:
+        return True
+    if text in _FALSE_VALUES:
+        return False
+    raise ValueError(f"Not a boolean: {value}")
+
+
+# Bedrock sends every parameter value as a string
+_COERCIONS = {str: str, int: int, float: float, bool: _to_bool}
+
+
+def parse_parameters(parameters, types: dict) -> dict:
+    """
+    Read the parameters of an event in one pass and convert every value to its type. Parameters that are
+    not in the types are ignored, missing ones are None like an optional parameter.
+    """
+    arguments = dict.fromkeys(types)
+    for parameter in parameters:
+        name = parameter["name"]
+        parameter_type = types.get(name)
+        if parameter_type is not None:
+            try:
+                arguments[name] = _COERCIONS[parameter_type](parameter["value"])
+            except (TypeError, ValueError):
+                raise ValueError(f"Parameter {name} is not a valid {parameter_type.__name__}: {parameter['value']}")
+    return arguments
+
+
+def _response(event: dict, status_code: int, body: str) -> dict:
+    return {
+        "response": {
+            "actionGroup": event["actionGroup"],
+            "apiPath": event["apiPath"],
+            "httpMethod": event.get("httpMethod", "POST"),
+            "httpStatusCode": status_code,
+            "responseBody": {"application/json": {"body": body}},
+        }
+    }
+
+
+def create_handler(routes: dict, sample_rate: float = None):
+    """
+    Create a lambda_handler for a route table of apiPath -> (function, {parameter name: type}). Events and
+    responses are only serialised for the sampled invocations, or for all of them at DEBUG level.
+    """
+    sample_rate = PAYLOAD_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    def lambda_handler(event, context):
+        log_payload = logger.isEnabledFor(logging.DEBUG) or (sample_rate > 0 and random.random() < sample_rate)
+        if log_payload:
+            logger.info("Received event: %s", json.dumps(event))
+
+        api_path = event["apiPath"]
+        try:
+            route = routes.get(api_path)
+            if route is None:
+                raise ValueError(f"Unknown API path: {api_path}")
+            function, types = route
+            response = _response(event, 200, function(**parse_parameters(event.get("parameters", ()), types)))
+        except Exception as e:
+            logger.exception("Exception occurred for API path %s", api_path)
+            response = _response(event, 400, json.dumps({"status": "error", "message": str(e)}))
+
+        if log_payload:
+            logger.info("Returning response: %s", json.dumps(response))
+        return response
+
+    return lambda_handler
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .rate_limiter import rate_limited
+
+CACHED_REQUEST_FIELDS = ("modelId", "system", "messages", "inferenceConfig", "toolConfig")
+
+
+def request_key(request: dict) -> str:
+    """Stable hash of the parts of a converse request that determine the response."""
+    relevant = {field: request[field] for field in CACHED_REQUEST_FIELDS if field in request}
+    serialized = json.dumps(relevant, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(request: dict) -> bool:
+    """Only requests sampled at temperature 0 give the same response for the same input."""
+    return request.get("inferenceConfig", {}).get("temperature") == 0
+
+
+class LRUResponseCache:
+    """In memory cache that evicts the least recently used response when it holds more than maxsize entries."""
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteResponseCache:
+    """On disk cache in a SQLite file, entries older than ttl_seconds are treated as missing and removed."""
+    def __init__(self, path: str, ttl_seconds: float = 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, response TEXT)"
+            )
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT created, response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            created, response = row
+            if time.time() - created > self.ttl_seconds:
+                with self._connection:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+        return json.loads(response)
+
+    def put(self, key, response):
+        serialized = json.dumps(response, default=str)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, created, response) VALUES (?, ?, ?)",
+                (key, time.time(), serialized)
+            )
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCache:
+    """
+    Two tier cache for converse responses: an in memory LRU in front of an optional on disk tier. Any object
+    with get(key) and put(key, response) can be used as a tier.
+    """
+    def __init__(self, memory=None, disk=None):
+        self.log = logging.getLogger("main.ResponseCache")
+        self.memory = memory if memory is not None else LRUResponseCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key):
+        response = self.memory.get(key)
+        from_disk = False
+        if response is None and self.disk is not None:
+            response = self.disk.get(key)
+            if response is not None:
+                from_disk = True
+                self.memory.put(key, response)
+
+        with self._stats_lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if from_disk:
+                    self.disk_hits += 1
+        return response
+
+    def put(self, key, response):
+        self.memory.put(key, response)
+        if self.disk is not None:
+            self.disk.put(key, response)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+            }
+
+
+class CachingBedrockClient:
+    """
+    Wraps a bedrock-runtime client and answers deterministic converse requests from a ResponseCache.
+    All other calls, including converse_stream, go straight to the wrapped client. The rate limiter sits
+    below the cache, so a cache hit does not wait for the limiter or use any of the quota.
+    """
+    handles_rate_limits = True
+
+    def __init__(self, client, cache: ResponseCache = None):
+        self.client = rate_limited(client)
+        self.cache = cache if cache is not None else ResponseCache()
+
+    def converse(self, **request):
+        if not is_deterministic(request):
+            return self.client.converse(**request)
+
+        key = request_key(request)
+        response = self.cache.get(key)
+        if response is not None:
+            self.cache.log.info("Cache hit for converse request %s", key[:12])
+            return response
+
+        response = self.client.converse(**request)
+        self.cache.put(key, response)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
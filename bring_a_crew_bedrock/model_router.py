@@ -0,0 +1,170 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from .bedrock_clients import DEFAULT_REGION, get_bedrock_client
+from .rate_limiter import DEFAULT_MAX_RETRIES, RateLimitedBedrockClient, is_retryable_error
+from .tracing import current_span
+
+DEFAULT_MODEL_ID = "eu.amazon.nova-lite-v1:0"
+DEFAULT_ROLE = "default"
+
+
+class Target:
+    """A model or inference profile in a region, with the rolling latency and error samples of its calls."""
+    def __init__(self, model_id: str, region_name: str = DEFAULT_REGION, window_seconds: float = 300,
+                 max_samples: int = 200):
+        self.model_id = model_id
+        self.region_name = region_name
+        self.window_seconds = window_seconds
+        # (time, latency seconds or None for a failed call)
+        self._samples = deque(maxlen=max_samples)
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency_seconds: float = None):
+        with self._lock:
+            self._samples.append((time.monotonic(), latency_seconds))
+
+    def __recent(self) -> list:
+        horizon = time.monotonic() - self.window_seconds
+        with self._lock:
+            while self._samples and self._samples[0][0] < horizon:
+                self._samples.popleft()
+            return list(self._samples)
+
+    def stats(self) -> dict:
+        samples = self.__recent()
+        latencies = sorted(latency for _, latency in samples if latency is not None)
+        errors = sum(1 for _, latency in samples if latency is None)
+        return {
+            "model_id": self.model_id,
+            "region_name": self.region_name,
+            "samples": len(samples),
+            "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else None,
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+class ModelRouter:
+    """
+    Maps agent roles, the agent names, to a list of targets and sends every call to the fastest healthy one.
+    A target is healthy when it is not cooling down after a failure and its error rate in the rolling window
+    stays below max_error_rate. Targets without recent samples come first, so a target that was avoided is
+    measured again once its old samples left the window. Roles without a route use the default role.
+    """
+    def __init__(self, routes: dict, cooldown_seconds: float = 30, max_error_rate: float = 0.5,
+                 min_samples: int = 5):
+        self.log = logging.getLogger("main.ModelRouter")
+        self.routes = routes
+        self.cooldown_seconds = cooldown_seconds
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self._fallback = [Target(DEFAULT_MODEL_ID)]
+
+    @classmethod
+    def from_config(cls, config: dict, **kwargs):
+        """
+        Build a router from a dict like {"food_manager": [{"model_id": ..., "region_name": ...}], ...}, the
+        same target listed for several roles shares its statistics.
+        """
+        targets = {}
+        routes = {}
+        for role, entries in config.items():
+            routes[role] = []
+            for entry in entries:
+                key = (entry["model_id"], entry.get("region_name", DEFAULT_REGION))
+                if key not in targets:
+                    targets[key] = Target(*key)
+                routes[role].append(targets[key])
+        return cls(routes, **kwargs)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs):
+        with open(path, encoding="utf-8") as file:
+            return cls.from_config(json.load(file), **kwargs)
+
+    def targets(self, role: str) -> list:
+        """The targets of a role ordered by preference: healthy before unhealthy, then by p50 and p95 latency."""
+        candidates = self.routes.get(role) or self.routes.get(DEFAULT_ROLE) or self._fallback
+        now = time.monotonic()
+
+        def _rank(target):
+            stats = target.stats()
+            unhealthy = target.cooldown_until > now or (
+                stats["samples"] >= self.min_samples and stats["error_rate"] > self.max_error_rate)
+            cooldown = target.cooldown_until if unhealthy else 0
+            if stats["p50_ms"] is None:
+                return unhealthy, cooldown, 0, 0
+            return unhealthy, cooldown, stats["p50_ms"], stats["p95_ms"]
+
+        return sorted(candidates, key=_rank)
+
+    def record_success(self, target: Target, latency_seconds: float):
+        target.record(latency_seconds)
+
+    def record_failure(self, target: Target, exception: Exception):
+        target.record(None)
+        target.cooldown_until = time.monotonic() + self.cooldown_seconds
+        self.log.warning("Call to %s in %s failed, cooling down for %.0f s: %s",
+                         target.model_id, target.region_name, self.cooldown_seconds, exception)
+
+    def stats(self) -> dict:
+        return {role: [target.stats() for target in targets] for role, targets in self.routes.items()}
+
+
+def is_failover_error(exception: Exception) -> bool:
+    """
+    Throttling, service, connection and read timeout errors are worth another target. Invalid requests and
+    bugs, like a ParamValidationError or a KeyError, would fail on every target.
+    """
+    return is_retryable_error(exception)
+
+
+class RoutedBedrockClient:
+    """
+    Client for one agent role that rewrites the modelId of every converse call to the chosen target and
+    calls the bedrock-runtime client of its region through the rate limiter. A failed call moves on to the
+    next target, only the last target left retries in place. client_factory returns the client for a region,
+    by default the shared one, for instance to use another session or a fake. The model and region of the
+    target that served the call, or failed it last, are set on the current trace span.
+    """
+    handles_rate_limits = True
+
+    def __init__(self, router: ModelRouter, role: str, client_factory=get_bedrock_client):
+        self.router = router
+        self.role = role
+        self.client_factory = client_factory
+
+    def converse(self, **request):
+        return self.__call("converse", request)
+
+    def converse_stream(self, **request):
+        return self.__call("converse_stream", request)
+
+    def __call(self, operation: str, request: dict):
+        targets = self.router.targets(self.role)
+        span = current_span()
+        for index, target in enumerate(targets):
+            last = index == len(targets) - 1
+            span.set(model=target.model_id, region_name=target.region_name, failovers=index)
+            client = RateLimitedBedrockClient(self.client_factory(target.region_name),
+                                              max_retries=DEFAULT_MAX_RETRIES if last else 0)
+            start = time.perf_counter()
+            try:
+                response = getattr(client, operation)(**dict(request, modelId=target.model_id))
+            except Exception as e:
+                if not is_failover_error(e):
+                    raise
+                self.router.record_failure(target, e)
+                if last:
+                    raise
+                continue
+            self.router.record_success(target, time.perf_counter() - start)
+            self.router.log.debug("%s call of %s served by %s in %s", operation, self.role, target.model_id,
+                                  target.region_name)
+            return response
@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def submit_in_context(executor, function, *args):
+    """Submit to an executor with a copy of the current context, so the worker sees the active trace span."""
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+def dispatch_actions(actions, run_action, max_workers: int = DEFAULT_MAX_WORKERS):
+    """
+    Run all actions of one model turn on a bounded thread pool.
+
+    :param actions: list of (action, action_input) tuples in the order the model wrote them
+    :param run_action: callable that receives the position, action and action_input and returns the observation
+    :param max_workers: upper bound for the number of actions running at the same time
+    :return: list of (action, observation) tuples in the same order as the actions
+    """
+    if len(actions) == 1:
+        action, action_input = actions[0]
+        return [(action, run_action(0, action, action_input))]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(actions))) as executor:
+        futures = [submit_in_context(executor, run_action, index, action, action_input)
+                   for index, (action, action_input) in enumerate(actions)]
+        return [(action, future.result()) for (action, _), future in zip(actions, futures)]
+
+
+async def dispatch_actions_async(actions, run_action, max_workers: int = DEFAULT_MAX_WORKERS):
+    """
+    Async variant of dispatch_actions, run_action is a coroutine function. At most max_workers actions
+    are awaited at the same time, the results keep the order of the actions.
+    """
+    if len(actions) == 1:
+        action, action_input = actions[0]
+        return [(action, await run_action(0, action, action_input))]
+
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def _bounded(index, action, action_input):
+        async with semaphore:
+            return await run_action(index, action, action_input)
+
+    observations = await asyncio.gather(*[_bounded(index, action, action_input)
+                                          for index, (action, action_input) in enumerate(actions)])
+    return [(action, observation) for (action, _), observation in zip(actions, observations)]
+
+
+def format_observations(results) -> str:
+    """Combine the observations of one turn into a single, ordered and labelled Observation block."""
+    if len(results) == 1:
+        return f"Observation: {results[0][1]}"
+
+    lines = ["Observation:"]
+    for index, (action, observation) in enumerate(results, start=1):
+        lines.append(f"{index}. {action}: {observation}")
+    return "\n".join(lines)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .parallel_dispatch import DEFAULT_MAX_WORKERS, submit_in_context
+
+
+class PlanError(Exception):
+    """The model returned something that is not a valid plan."""
+
+
+class PlanStep:
+    """One delegation in a plan: a request for an agent that may wait for the results of other steps."""
+    def __init__(self, step_id: str, agent: str, request: str, depends_on=None):
+        self.id = step_id
+        self.agent = agent
+        self.request = request
+        self.depends_on = list(depends_on or [])
+
+    def resolve_request(self, results: dict) -> str:
+        """The request with every {step_id} of a dependency replaced by the result of that step."""
+        request = self.request
+        for dependency in self.depends_on:
+            request = request.replace("{" + dependency + "}", str(results[dependency]))
+        return request
+
+
+class PlanResult:
+    """The outcome of running a plan: the results of the steps that ran, and the first failure if any."""
+    def __init__(self, results: dict, failed: PlanStep = None, error: str = None, skipped=None):
+        self.results = results
+        self.failed = failed
+        self.error = error
+        self.skipped = list(skipped or [])
+
+
+def parse_plan(text: str, agents, completed=None) -> list:
+    """
+    Parse and validate the JSON plan in a model response. Every step must use a known agent and a new id, and
+    may only depend on steps of the plan, or on steps completed by an earlier plan, without cycles.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise PlanError("No JSON plan found in: {}".format(text))
+    try:
+        raw_steps = json.loads(text[start:end + 1])["steps"]
+        steps = [PlanStep(str(step["id"]), step["agent"], step["request"], step.get("depends_on"))
+                 for step in raw_steps]
+    except (ValueError, KeyError, TypeError) as e:
+        raise PlanError("Invalid plan: {}".format(e))
+    if not steps:
+        raise PlanError("The plan has no steps")
+
+    completed = completed or {}
+    ids = [step.id for step in steps]
+    if len(set(ids)) != len(ids):
+        raise PlanError("Step ids are not unique: {}".format(ids))
+    reused = [step_id for step_id in ids if step_id in completed]
+    if reused:
+        raise PlanError("Step ids of completed steps can not be used again: {}".format(reused))
+    for step in steps:
+        if step.agent not in agents:
+            raise PlanError("Unknown agent in step {}: {}".format(step.id, step.agent))
+        unknown = [dependency for dependency in step.depends_on if dependency not in ids and dependency not in completed]
+        if unknown:
+            raise PlanError("Step {} depends on unknown steps: {}".format(step.id, unknown))
+
+    # Kahn's algorithm, whatever cannot be ordered is part of a cycle
+    remaining = {step.id: {dependency for dependency in step.depends_on if dependency in ids} for step in steps}
+    while remaining:
+        ready = [step_id for step_id, dependencies in remaining.items() if not dependencies]
+        if not ready:
+            raise PlanError("The plan has a cycle between steps: {}".format(sorted(remaining)))
+        for step_id in ready:
+            del remaining[step_id]
+        for dependencies in remaining.values():
+            dependencies.difference_update(ready)
+    return steps
+
+
+def execute_plan(steps, run_step, max_workers: int = DEFAULT_MAX_WORKERS, completed=None) -> PlanResult:
+    """
+    Run the steps of a plan on a thread pool, every step starts as soon as all its dependencies are done.
+    After the first failure no new steps start, the running ones finish and the rest is reported as skipped.
+
+    :param run_step: function called with (step, resolved request) that returns the result of the step
+    :param completed: results of steps of an earlier plan that the steps may depend on
+    """
+    known = dict(completed or {})
+    results = {}
+    pending = {step.id: step for step in steps}
+    running = {}
+    failed, error = None, None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            if failed is None:
+                for step in [step for step in pending.values() if all(d in known for d in step.depends_on)]:
+                    del pending[step.id]
+                    running[submit_in_context(executor, run_step, step, step.resolve_request(known))] = step
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                try:
+                    known[step.id] = results[step.id] = future.result()
+                except Exception as e:
+                    if failed is None:
+                        failed, error = step, str(e)
+    return PlanResult(results, failed, error, skipped=pending.values())
+
+
+async def execute_plan_async(steps, run_step, max_workers: int = DEFAULT_MAX_WORKERS, completed=None) -> PlanResult:
+    """Async variant of execute_plan, run_step is a coroutine function and at most max_workers steps run at once."""
+    known = dict(completed or {})
+    results = {}
+    pending = {step.id: step for step in steps}
+    running = {}
+    failed, error = None, None
+    while True:
+        if failed is None:
+            for step in [step for step in pending.values() if all(d in known for d in step.depends_on)]:
+                if len(running) >= max_workers:
+                    break
+                del pending[step.id]
+                running[asyncio.ensure_future(run_step(step, step.resolve_request(known)))] = step
+        if not running:
+            break
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            step = running.pop(task)
+            try:
+                known[step.id] = results[step.id] = task.result()
+            except Exception as e:
+                if failed is None:
+                    failed, error = step, str(e)
+    return PlanResult(results, failed, error, skipped=pending.values())
+
+
+def format_step_results(steps, results: dict) -> str:
+    return "\n".join(f"- {step.id} ({step.agent}): {results[step.id]}" for step in steps if step.id in results)
+
+
+def format_plan_outcome(steps, outcome: PlanResult) -> str:
+    """The observation for the model after running a plan: the results, and on failure what is left to do."""
+    lines = format_step_results(steps, outcome.results)
+    if outcome.failed is None:
+        return f"Observation: All steps are done.\n{lines}\nReply with the final answer."
+    skipped = ", ".join(step.id for step in outcome.skipped) or "none"
+    return (f"Observation: Step {outcome.failed.id} ({outcome.failed.agent}) failed: {outcome.error}\n"
+            f"Completed steps:\n{lines or '- none'}\nSteps not run: {skipped}\n"
+            f"Reply with a new plan for the remaining work only.")
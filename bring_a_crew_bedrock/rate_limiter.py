@@ -0,0 +1,291 @@
+import logging
+import random
+import threading
+import time
+
+from botocore.exceptions import ConnectionClosedError, ConnectionError as BotocoreConnectionError, ReadTimeoutError
+
+from .conversation_memory import estimate_tokens
+
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_TOKENS_PER_MINUTE = 400_000
+DEFAULT_MAX_RETRIES = 6
+THROTTLING_ERRORS = ("ThrottlingException", "TooManyRequestsException")
+TRANSIENT_ERRORS = ("ServiceUnavailableException", "InternalServerException", "ModelNotReadyException")
+# Failures before a response arrived, botocore does not retry them itself for bedrock-runtime
+CONNECTION_ERRORS = (BotocoreConnectionError, ReadTimeoutError, ConnectionClosedError)
+
+
+def error_code(exception) -> str:
+    """The error code of a botocore ClientError, None for other exceptions."""
+    # Some botocore errors, like ReadTimeoutError, have a response attribute that is None
+    return (getattr(exception, "response", None) or {}).get("Error", {}).get("Code")
+
+
+def is_retryable_error(exception) -> bool:
+    """Throttling, transient service errors and connection or read timeout errors are worth another attempt."""
+    return isinstance(exception, CONNECTION_ERRORS) or error_code(exception) in THROTTLING_ERRORS + TRANSIENT_ERRORS
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """Upper bound guess of the tokens a converse request uses: its input plus the maximum output."""
+    input_tokens = sum(estimate_tokens(message) for message in request.get("messages", []))
+    input_tokens += sum(len(block.get("text", "")) // 4 for block in request.get("system", []))
+    return input_tokens + request.get("inferenceConfig", {}).get("maxTokens", 512)
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations. A reservation always succeeds and may leave the bucket in
+    debt, the caller waits the returned number of seconds. Waiting callers are served in arrival order.
+    A rate of None means unlimited.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            self.__refill(time.monotonic())
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, amount: float):
+        """Give back tokens that were reserved but not used, a negative amount takes extra tokens."""
+        if self.rate is None:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def set_rate(self, rate: float):
+        if self.rate is None:
+            return
+        with self._lock:
+            self.__refill(time.monotonic())
+            self.rate = rate
+
+
+class _ModelLimit:
+    def __init__(self, requests_per_second: float, tokens_per_minute: float):
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second or 0))
+        self.tokens = TokenBucket(tokens_per_minute / 60 if tokens_per_minute else None,
+                                  tokens_per_minute or 0)
+        self.factor = 1.0
+        self.last_decrease = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "queued_requests": 0,
+                      "queued_seconds_total": 0.0, "queued_seconds_max": 0.0}
+
+
+class AdaptiveRateLimiter:
+    """
+    Limits the converse calls per modelId with a requests per second bucket and a tokens per minute bucket.
+    The rates adapt with AIMD: a throttling error halves them, every successful call adds back a small step
+    until the configured quota is reached again. Quotas apply per process, divide them over worker processes.
+    """
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE, decrease_factor: float = 0.5,
+                 increase_step: float = 0.02, min_factor: float = 0.05, decrease_interval_seconds: float = 1.0):
+        self.log = logging.getLogger("main.AdaptiveRateLimiter")
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.min_factor = min_factor
+        self.decrease_interval_seconds = decrease_interval_seconds
+        self._quotas = {}
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def set_quota(self, model_id: str, requests_per_second: float = None, tokens_per_minute: float = None):
+        """Use a different quota for one model, for instance the quota of the account for that model."""
+        with self._lock:
+            self._quotas[model_id] = (requests_per_second, tokens_per_minute)
+            self._limits.pop(model_id, None)
+
+    def __limit(self, model_id: str) -> _ModelLimit:
+        limit = self._limits.get(model_id)
+        if limit is None:
+            with self._lock:
+                limit = self._limits.get(model_id)
+                if limit is None:
+                    requests_per_second, tokens_per_minute = self._quotas.get(
+                        model_id, (self.requests_per_second, self.tokens_per_minute))
+                    limit = _ModelLimit(requests_per_second, tokens_per_minute)
+                    self._limits[model_id] = limit
+        return limit
+
+    def acquire(self, model_id: str, tokens: int) -> float:
+        """Block until a call with this many tokens may be made, returns the seconds spent waiting."""
+        limit = self.__limit(model_id)
+        wait = max(limit.requests.reserve(1), limit.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            limit.stats["requests"] += 1
+            if wait > 0:
+                limit.stats["queued_requests"] += 1
+                limit.stats["queued_seconds_total"] += wait
+                limit.stats["queued_seconds_max"] = max(limit.stats["queued_seconds_max"], wait)
+        return wait
+
+    def record_usage(self, model_id: str, reserved_tokens: int, used_tokens: int):
+        """Correct the token bucket with the usage reported by Bedrock."""
+        self.__limit(model_id).tokens.refund(reserved_tokens - used_tokens)
+
+    def on_success(self, model_id: str):
+        limit = self.__limit(model_id)
+        if limit.factor < 1.0:
+            with self._lock:
+                limit.factor = min(1.0, limit.factor + self.increase_step)
+                self.__apply_factor(limit)
+
+    def on_throttle(self, model_id: str):
+        limit = self.__limit(model_id)
+        now = time.monotonic()
+        with self._lock:
+            limit.stats["throttled"] += 1
+            # Calls that were already in flight get throttled too, one decrease per interval is enough
+            if now - limit.last_decrease < self.decrease_interval_seconds:
+                return
+            limit.last_decrease = now
+            limit.factor = max(self.min_factor, limit.factor * self.decrease_factor)
+            self.__apply_factor(limit)
+        self.log.warning("Throttled on %s, rate factor is now %.2f", model_id, limit.factor)
+
+    def on_retry(self, model_id: str):
+        limit = self.__limit(model_id)
+        with self._lock:
+            limit.stats["retries"] += 1
+
+    @staticmethod
+    def __apply_factor(limit: _ModelLimit):
+        if limit.requests_per_second:
+            limit.requests.set_rate(limit.requests_per_second * limit.factor)
+        if limit.tokens_per_minute:
+            limit.tokens.set_rate(limit.tokens_per_minute * limit.factor / 60)
+
+    def stats(self) -> dict:
+        """Counters per model: requests, throttles, retries, time spent queued and the current rate factor."""
+        with self._lock:
+            return {model_id: dict(limit.stats, rate_factor=limit.factor)
+                    for model_id, limit in self._limits.items()}
+
+
+class _MeteredStream:
+    """Pass the events of a converse_stream through and report the usage of the metadata event."""
+    def __init__(self, stream, on_usage):
+        self._stream = stream
+        self._on_usage = on_usage
+
+    def __iter__(self):
+        for event in self._stream:
+            if "metadata" in event and "usage" in event["metadata"]:
+                self._on_usage(event["metadata"]["usage"])
+            yield event
+
+    def close(self):
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+
+
+class RateLimitedBedrockClient:
+    """
+    Wraps a bedrock-runtime client so converse and converse_stream go through an AdaptiveRateLimiter.
+    Throttling, transient and connection errors are retried with exponential backoff and full jitter, other
+    attributes are delegated to the wrapped client.
+    """
+    def __init__(self, client, limiter: AdaptiveRateLimiter = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_base_seconds: float = 0.25, backoff_max_seconds: float = 20.0):
+        self.client = client
+        self._limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+
+    @property
+    def limiter(self) -> AdaptiveRateLimiter:
+        return self._limiter if self._limiter is not None else get_rate_limiter()
+
+    def converse(self, **request):
+        return self.__call(self.client.converse, request, streaming=False)
+
+    def converse_stream(self, **request):
+        return self.__call(self.client.converse_stream, request, streaming=True)
+
+    def __call(self, method, request: dict, streaming: bool):
+        limiter = self.limiter
+        model_id = request.get("modelId")
+        reserved = estimate_request_tokens(request)
+
+        def _record(usage):
+            limiter.record_usage(model_id, reserved, usage.get("totalTokens", reserved))
+
+        attempt = 0
+        while True:
+            limiter.acquire(model_id, reserved)
+            try:
+                response = method(**request)
+            except Exception as e:
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    raise
+                if error_code(e) in THROTTLING_ERRORS:
+                    limiter.on_throttle(model_id)
+                # The failed call did not use its tokens
+                limiter.record_usage(model_id, reserved, 0)
+                limiter.on_retry(model_id)
+                time.sleep(random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt)))
+                attempt += 1
+                continue
+
+            limiter.on_success(model_id)
+            if streaming:
+                return dict(response, stream=_MeteredStream(response["stream"], _record))
+            if "usage" in response:
+                _record(response["usage"])
+            return response
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Return the process wide rate limiter, creating it with the default quota on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = AdaptiveRateLimiter()
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: AdaptiveRateLimiter):
+    """Install the process wide rate limiter, for instance one with the quota of the account."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
+
+
+def rate_limited(client):
+    """
+    Wrap a client with the process wide rate limiter. Clients that are already wrapped, or that limit their
+    own calls like the RoutedBedrockClient, are returned as is.
+    """
+    if isinstance(client, RateLimitedBedrockClient) or getattr(client, "handles_rate_limits", False):
+        return client
+    return RateLimitedBedrockClient(client)
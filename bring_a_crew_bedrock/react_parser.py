@@ -0,0 +1,119 @@
+import re
+
+ACTION_RE = re.compile(r'^Action: (\w+): (.*)$')
+ANSWER_RE = re.compile(r'^Answer: (.*)$')
+PAUSE = "PAUSE"
+
+
+class ReActParser:
+    """
+    Incremental parser for the ReAct output of a model. Text is fed in chunks as it arrives; every line is
+    matched once, as soon as it is complete. The parser is done when it sees a PAUSE line or a finished
+    Answer line, everything after that is ignored.
+    """
+    def __init__(self, action_re=ACTION_RE, answer_re=ANSWER_RE):
+        self.action_re = action_re
+        self.answer_re = answer_re
+        self.actions = []
+        self.answer = None
+        # Usage and metrics from the metadata event, only present when the stream was read to the end
+        self.usage = None
+        self.metrics = None
+        self.done = False
+        self._lines = []
+        self._pending = ""
+
+    @property
+    def text(self) -> str:
+        """The text consumed so far, without the part after PAUSE or the Answer."""
+        return "\n".join(self._lines + ([self._pending] if self._pending else []))
+
+    def feed(self, chunk: str):
+        """Add a chunk of model output and return the actions that were completed by it."""
+        new_actions = []
+        if self.done:
+            return new_actions
+
+        self._pending += chunk
+        while not self.done and "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            self.__consume(line, new_actions)
+        if self.done:
+            self._pending = ""
+        return new_actions
+
+    def close(self):
+        """Signal the end of the output and return the actions completed by the last, unterminated line."""
+        new_actions = []
+        if not self.done and self._pending:
+            line, self._pending = self._pending, ""
+            self.__consume(line, new_actions)
+        self.done = True
+        return new_actions
+
+    def stop(self):
+        """Stop parsing early, the unfinished last line is dropped."""
+        self._pending = ""
+        self.done = True
+
+    def __consume(self, line, new_actions):
+        self._lines.append(line)
+        if line.startswith("Action: "):
+            match = self.action_re.match(line)
+            if match:
+                self.actions.append(match.groups())
+                new_actions.append(match.groups())
+        elif line.startswith("Answer: "):
+            match = self.answer_re.match(line)
+            if match:
+                self.answer = match.group(1)
+                self.done = True
+        elif line.strip() == PAUSE:
+            self._lines.pop()
+            self.done = True
+
+
+def parse_response(text: str, action_re=ACTION_RE, answer_re=ANSWER_RE) -> ReActParser:
+    """Parse a complete model response in a single pass."""
+    parser = ReActParser(action_re=action_re, answer_re=answer_re)
+    parser.feed(text)
+    parser.close()
+    return parser
+
+
+def stream_react_turn(client, request: dict, on_action, max_actions: int = None,
+                      action_re=ACTION_RE, answer_re=ANSWER_RE) -> ReActParser:
+    """
+    Run a converse_stream call and feed the text deltas through a ReActParser. Every complete Action line
+    is handed to on_action(index, action, action_input) right away, while the model is still generating.
+    Reading stops at PAUSE, at a finished Answer, or after max_actions actions.
+    """
+    parser = ReActParser(action_re=action_re, answer_re=answer_re)
+    stream = client.converse_stream(**request)["stream"]
+    try:
+        for event in stream:
+            if "metadata" in event:
+                parser.usage = event["metadata"].get("usage")
+                parser.metrics = event["metadata"].get("metrics")
+            delta = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+            if delta is None:
+                continue
+            new_actions = parser.feed(delta)
+            first_index = len(parser.actions) - len(new_actions)
+            for index, (action, action_input) in enumerate(new_actions, start=first_index):
+                on_action(index, action, action_input)
+            if parser.done:
+                break
+            if max_actions is not None and len(parser.actions) >= max_actions:
+                parser.stop()
+                break
+        else:
+            new_actions = parser.close()
+            first_index = len(parser.actions) - len(new_actions)
+            for index, (action, action_input) in enumerate(new_actions, start=first_index):
+                on_action(index, action, action_input)
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    return parser
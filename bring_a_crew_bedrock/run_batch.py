@@ -0,0 +1,139 @@
+"""
+Run many questions through the orchestration agent, spread over a pool of processes.
+
+The input is a JSONL file, or stdin, with one {"id": ..., "question": ...} object per line. Every result is
+appended to the output file as soon as it is finished, with its answer or error, the latency and the token
+usage. Questions whose id already has an answer in the output file are skipped, so an interrupted run can be
+started again with the same arguments.
+
+Run with: python -m bring_a_crew_bedrock.run_batch questions.jsonl --output results.jsonl --workers 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+from bring_a_crew_bedrock.setup_logging import setup_logging
+from bring_a_crew_bedrock.tracing import Tracer, use_tracer
+
+batch_log = logging.getLogger("main.batch")
+
+
+def read_questions(lines):
+    """Parse the JSONL input, a missing id becomes the line number."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        yield {"id": str(item.get("id", number)), "question": item["question"]}
+
+
+def completed_ids(output_path: str) -> set:
+    """The ids that already have an answer in the output file, failed questions are run again."""
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # The last line can be cut off when the previous run crashed while writing
+                continue
+            if "answer" in result:
+                done.add(result["id"])
+    return done
+
+
+def _init_worker(pool_size: int):
+    load_dotenv()
+    setup_logging()
+    from bring_a_crew_bedrock.run_orchestration import get_agent_pool
+    get_agent_pool(size=pool_size)
+
+
+def answer_question(item: dict) -> dict:
+    """Answer one question in a worker process, with its own tracer to count the tokens of this question."""
+    from bring_a_crew_bedrock.run_orchestration import get_agent_pool
+
+    result = {"id": item["id"], "question": item["question"]}
+    tracer = Tracer()
+    start = time.perf_counter()
+    with use_tracer(tracer):
+        try:
+            with get_agent_pool().agent() as agent:
+                result["answer"] = agent.call_agent(item["question"])
+        except Exception as e:
+            result["error"] = str(e)
+    result["latency_seconds"] = time.perf_counter() - start
+    result["tokens"] = tracer.token_totals()
+    result["worker_pid"] = os.getpid()
+    return result
+
+
+def run_batch(questions, output_path: str, workers: int = None, max_in_flight: int = None) -> dict:
+    """
+    Answer the questions with a process pool and append each result to output_path when it is finished.
+
+    :param questions: iterable of {"id", "question"} dicts
+    :param workers: number of worker processes, defaults to the number of cores
+    :param max_in_flight: number of questions submitted at the same time, defaults to two per worker
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    done = completed_ids(output_path)
+    summary = {"answered": 0, "failed": 0, "skipped": 0}
+    pending = set()
+    start = time.perf_counter()
+
+    def write(futures, output):
+        for future in futures:
+            result = future.result()
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            summary["answered" if "answer" in result else "failed"] += 1
+            batch_log.info("Finished %s in %.2f s", result["id"], result["latency_seconds"])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(1,)) as executor, \
+            open(output_path, "a", encoding="utf-8") as output:
+        for item in questions:
+            if item["id"] in done:
+                summary["skipped"] += 1
+                continue
+            if len(pending) >= max_in_flight:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(finished, output)
+            pending.add(executor.submit(answer_question, item))
+        write(wait(pending).done, output)
+
+    summary["wall_seconds"] = time.perf_counter() - start
+    batch_log.info("Batch finished: %s", summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with the orchestration agent")
+    parser.add_argument("input", nargs="?", help="JSONL file with questions, reads stdin when omitted")
+    parser.add_argument("--output", required=True, help="JSONL file the results are appended to")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="Questions submitted at the same time")
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_logging()
+    if args.input:
+        with open(args.input, encoding="utf-8") as file:
+            summary = run_batch(read_questions(file), args.output, args.workers, args.max_in_flight)
+    else:
+        summary = run_batch(read_questions(sys.stdin), args.output, args.workers, args.max_in_flight)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
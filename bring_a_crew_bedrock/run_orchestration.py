@@ -1,33 +1,79 @@
+import functools
 import logging
+import os
+import threading
+import time
 
 from dotenv import load_dotenv
 
+from bring_a_crew_bedrock.agent_pool import AgentPool
+from bring_a_crew_bedrock.conversation_memory import ConversationMemory
+from bring_a_crew_bedrock.model_router import ModelRouter
 from bring_a_crew_bedrock.team.food_manager_action_agent import create_agent as create_agent_food_manager
 from bring_a_crew_bedrock.team.orchestration_agent import OrchestrationAgent
 from bring_a_crew_bedrock.team.room_manager_action_agent import create_agent as create_agent_room_manager
 from bring_a_crew_bedrock.team.schedule_manager_action_agent import create_agent as create_agent_schedule_manager
 from bring_a_crew_bedrock.setup_logging import setup_logging
+from bring_a_crew_bedrock.speculation import Speculator
+from bring_a_crew_bedrock.tracing import JsonLinesExporter, Tracer, set_tracer
 
+main_log = logging.getLogger("main")
+
+_agent_pool = None
+_agent_pool_lock = threading.Lock()
 
-def main(question: str):
-    main_log.info("Start handling question: %s", question)
-    room_manager = create_agent_room_manager()
-    schedule_manager = create_agent_schedule_manager()
-    food_manager = create_agent_food_manager()
 
-    or_agent = OrchestrationAgent(
+def create_orchestration_agent(client=None, router: ModelRouter = None, planning: bool = False,
+                               speculator: Speculator = None, structured_delegation: bool = True):
+    """
+    Create the orchestration agent with its team. The optional client, for instance a CachingBedrockClient,
+    is used by all agents; without it they use the shared bedrock-runtime client. With a router, instead of a
+    client, every agent calls the model and region the router picks for its role. With planning the orchestrator writes one plan
+    of all delegations and runs it as a DAG. A speculator prefetches the predictable first delegations. With
+    structured delegation the orchestrator can call the actions of its team directly, without their LLM turns.
+    """
+    room_manager = create_agent_room_manager(client=client, scoped_sessions=True, router=router)
+    schedule_manager = create_agent_schedule_manager(client=client, scoped_sessions=True, router=router)
+    food_manager = create_agent_food_manager(client=client, scoped_sessions=True, router=router)
+
+    return OrchestrationAgent(
         name="orchestration_agent",
         description="This agent orchestrates the conversation between the user and the other agents",
-        agents=[room_manager, food_manager, schedule_manager]
+        agents=[room_manager, food_manager, schedule_manager],
+        parallel_actions=True,
+        client=client,
+        memory_manager=ConversationMemory(token_budget=4000),
+        router=router,
+        planning=planning,
+        speculator=speculator,
+        structured_delegation=structured_delegation
     )
 
-    response = or_agent.call_agent(question)
+
+def get_agent_pool(size: int = 4, router: ModelRouter = None) -> AgentPool:
+    """Return the process wide pool with warm orchestration agents, creating it on first use."""
+    global _agent_pool
+    with _agent_pool_lock:
+        if _agent_pool is None:
+            _agent_pool = AgentPool(functools.partial(create_orchestration_agent, router=router), size=size)
+    return _agent_pool
+
+
+def main(question: str):
+    main_log.info("Start handling question: %s", question)
+    start = time.perf_counter()
+    with get_agent_pool().agent() as or_agent:
+        main_log.info("Agent setup took %.2f ms", (time.perf_counter() - start) * 1000)
+        response = or_agent.call_agent(question)
+        main_log.info("Input tokens saved by memory management: %d", or_agent.tokens_saved())
     main_log.info("Final response: %s", response)
     return response
 
 if __name__ == "__main__":
     load_dotenv()
     setup_logging()
-    main_log = logging.getLogger("main")
+    if os.getenv("TRACE_FILE"):
+        set_tracer(Tracer(JsonLinesExporter(os.getenv("TRACE_FILE"))))
+    get_agent_pool(router=ModelRouter.from_file(os.getenv("ROUTER_CONFIG")) if os.getenv("ROUTER_CONFIG") else None)
 
-    main("Organise a meeting between Bob and Alice somewhere next week, book a room and order lunch.")
\ No newline at end of file
+    main("Organise a meeting between Bob and Alice somewhere next week, book a room and order lunch.")
@@ -0,0 +1,255 @@
+"""
+Long running asyncio HTTP service in front of the OrchestrationAgent.
+
+Endpoints:
+ - POST /sessions                    create a session, returns {"session_id": ...}
+ - POST /sessions/<id>/messages      body {"message": ...}, streams server-sent events: started, answer or error
+ - DELETE /sessions/<id>             end a session
+ - GET /health                       liveness
+ - GET /metrics                      sessions, in flight questions, counters and latency
+
+Run with: python -m bring_a_crew_bedrock.service --port 8080
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from bring_a_crew_bedrock.setup_logging import setup_logging
+
+MAX_BODY_BYTES = 64 * 1024
+# A client that does not send its complete request within this time is disconnected
+READ_TIMEOUT_SECONDS = 30
+
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 408: "Request Timeout", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Session:
+    def __init__(self, session_id: str, agent):
+        self.session_id = session_id
+        self.agent = agent
+        self.last_used = time.monotonic()
+        # Messages of one session are answered one after the other, the agent memory is not shared safely
+        self.lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+
+class SessionService:
+    """
+    Keeps a warm OrchestrationAgent, with its sub-agents, per session. The number of questions answered at
+    the same time is limited, sessions that are idle for longer than idle_timeout_seconds are evicted.
+    """
+    def __init__(self, agent_factory, max_sessions: int = 1000, max_concurrent_questions: int = 100,
+                 idle_timeout_seconds: float = 900):
+        self.log = logging.getLogger("main.SessionService")
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.sessions = {}
+        self._question_slots = asyncio.Semaphore(max_concurrent_questions)
+        self.max_concurrent_questions = max_concurrent_questions
+        self.in_flight = 0
+        self.questions_total = 0
+        self.errors_total = 0
+        self.evicted_total = 0
+        self.latency_total_seconds = 0.0
+
+    def create_session(self) -> Session:
+        if len(self.sessions) >= self.max_sessions:
+            raise HttpError(503, "Maximum number of sessions reached")
+        session = Session(uuid.uuid4().hex, self.agent_factory())
+        self.sessions[session.session_id] = session
+        self.log.info("Created session %s", session.session_id)
+        return session
+
+    def get_session(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HttpError(404, "Unknown session: {}".format(session_id))
+        return session
+
+    def end_session(self, session_id: str):
+        self.get_session(session_id)
+        del self.sessions[session_id]
+
+    async def ask(self, session: Session, message: str) -> str:
+        async with session.lock, self._question_slots:
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                return await session.agent.call_agent_async(message)
+            except Exception:
+                self.errors_total += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                self.questions_total += 1
+                self.latency_total_seconds += time.perf_counter() - start
+                session.last_used = time.monotonic()
+
+    def evict_idle_sessions(self) -> int:
+        now = time.monotonic()
+        idle = [session_id for session_id, session in self.sessions.items()
+                if not session.busy and now - session.last_used > self.idle_timeout_seconds]
+        for session_id in idle:
+            del self.sessions[session_id]
+        self.evicted_total += len(idle)
+        if idle:
+            self.log.info("Evicted %d idle sessions", len(idle))
+        return len(idle)
+
+    async def run_eviction(self, interval_seconds: float = 30):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            self.evict_idle_sessions()
+
+    def metrics(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "in_flight": self.in_flight,
+            "max_concurrent_questions": self.max_concurrent_questions,
+            "questions_total": self.questions_total,
+            "errors_total": self.errors_total,
+            "evicted_total": self.evicted_total,
+            "average_latency_seconds": self.latency_total_seconds / self.questions_total
+            if self.questions_total else 0.0,
+        }
+
+
+async def _read_request(reader):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        return None
+    method, target, _ = request_line.split(" ", 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, target.split("?", 1)[0], body
+
+
+async def _write_response(writer, status: int, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _write_event(writer, event: str, payload: dict):
+    data = f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+    writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+    await writer.drain()
+
+
+async def _stream_answer(service: SessionService, writer, session: Session, message: str):
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                 b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+    await _write_event(writer, "started", {"session_id": session.session_id})
+    try:
+        answer = await service.ask(session, message)
+        await _write_event(writer, "answer", {"session_id": session.session_id, "answer": answer})
+    except Exception as e:
+        service.log.error("Question failed in session %s: %s", session.session_id, e)
+        await _write_event(writer, "error", {"session_id": session.session_id, "error": str(e)})
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def _route(service: SessionService, writer, method: str, path: str, body: bytes):
+    parts = [part for part in path.split("/") if part]
+    if parts == ["health"] and method == "GET":
+        return await _write_response(writer, 200, {"status": "ok"})
+    if parts == ["metrics"] and method == "GET":
+        return await _write_response(writer, 200, service.metrics())
+    if parts == ["sessions"] and method == "POST":
+        session = service.create_session()
+        return await _write_response(writer, 201, {"session_id": session.session_id})
+    if len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+        service.end_session(parts[1])
+        return await _write_response(writer, 204)
+    if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages" and method == "POST":
+        session = service.get_session(parts[1])
+        try:
+            message = json.loads(body)["message"]
+        except (ValueError, KeyError, TypeError):
+            raise HttpError(400, "Expected a JSON body with a message")
+        return await _stream_answer(service, writer, session, message)
+    raise HttpError(404, "Unknown endpoint: {} {}".format(method, path))
+
+
+def create_handler(service: SessionService, read_timeout_seconds: float = READ_TIMEOUT_SECONDS):
+    async def _handle(reader, writer):
+        try:
+            try:
+                request = await asyncio.wait_for(_read_request(reader), read_timeout_seconds)
+            except asyncio.TimeoutError:
+                raise HttpError(408, "No complete request after {}s".format(read_timeout_seconds))
+            if request is not None:
+                await _route(service, writer, *request)
+        except HttpError as e:
+            await _write_response(writer, e.status, {"error": e.message})
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            await _write_response(writer, 400, {"error": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return _handle
+
+
+async def serve(service: SessionService, host: str = "127.0.0.1", port: int = 8080,
+                read_timeout_seconds: float = READ_TIMEOUT_SECONDS):
+    server = await asyncio.start_server(create_handler(service, read_timeout_seconds), host, port)
+    eviction = asyncio.create_task(service.run_eviction())
+    service.log.info("Serving on %s:%d", host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        eviction.cancel()
+
+
+def main():
+    from bring_a_crew_bedrock.run_orchestration import create_orchestration_agent
+
+    parser = argparse.ArgumentParser(description="HTTP session service for the orchestration agent")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--max-concurrent", type=int, default=100)
+    parser.add_argument("--idle-timeout", type=float, default=900)
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_logging()
+    service = SessionService(create_orchestration_agent, max_sessions=args.max_sessions,
+                             max_concurrent_questions=args.max_concurrent, idle_timeout_seconds=args.idle_timeout)
+    asyncio.run(serve(service, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from .tracing import Tracer, use_tracer
+
+CALENDAR_WORDS = {"Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday", "January",
+                  "February", "March", "April", "May", "June", "July", "August", "September", "October",
+                  "November", "December", "I"}
+SENTENCE_END_RE = re.compile(r"[.!?]\s+")
+WORD_RE = re.compile(r"\b[A-Za-z]+\b")
+ISO_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+HEADCOUNT_RE = re.compile(r"\b(\d+)\s+(?:people|persons|attendees)\b", re.IGNORECASE)
+TIMESLOT_RE = re.compile(r"\b(morning|afternoon)\b", re.IGNORECASE)
+# A delegation that changes something is never answered by a read-only speculation
+WRITE_INTENT_RE = re.compile(r"\b(?:book|reserv|order|cancel|confirm|prepar|assign)", re.IGNORECASE)
+
+
+class Speculation:
+    """
+    A read-only delegation that is likely to be asked for. A request matches when it has the same read
+    intent: it matches every keyword pattern, asks for no booking and, when the speculation is about people,
+    names nobody else. A structured call matches on its agent, action and arguments.
+    """
+    def __init__(self, agent: str, request: str, keywords, action: str = None, arguments: dict = None,
+                 people=None):
+        self.agent = agent
+        self.request = request
+        self.keywords = [re.compile(keyword, re.IGNORECASE) for keyword in keywords]
+        # A request that also asks about someone else needs more than this speculation's result
+        self.people = set(people) if people is not None else None
+        self.action = action
+        self.arguments = arguments
+        self.future = None
+        self.tracer = Tracer()
+        self.claimed = False
+
+    def matches(self, agent: str, request: str) -> bool:
+        return (not self.claimed and agent == self.agent and not WRITE_INTENT_RE.search(request)
+                and all(keyword.search(request) for keyword in self.keywords)
+                and (self.people is None or set(named_people(request)) <= self.people))
+
+    def matches_call(self, agent: str, action: str, arguments) -> bool:
+        return (not self.claimed and self.action is not None and agent == self.agent and action == self.action
+                and isinstance(arguments, dict) and _normalized(arguments) == _normalized(self.arguments))
+
+    def tokens(self) -> int:
+        totals = self.tracer.token_totals()
+        return (totals["input_tokens"] + totals["output_tokens"] + totals["cache_read_input_tokens"]
+                + totals["cache_write_input_tokens"])
+
+
+def _normalized(arguments: dict) -> dict:
+    return {name: str(value).strip().lower() for name, value in arguments.items()}
+
+
+def _word(text: str) -> str:
+    return rf"\b{re.escape(text)}\b"
+
+
+def _number(number: str) -> str:
+    # Not part of a longer number or of a date, the 2 of 2 people does not match 2026-10-20
+    return rf"(?<![\w-]){re.escape(number)}(?![\w-])"
+
+
+def named_people(question: str) -> list:
+    """Capitalised words that do not start a sentence and are no day or month, a cheap guess at names."""
+    people = []
+    for sentence in SENTENCE_END_RE.split(question):
+        for word in WORD_RE.findall(sentence)[1:]:
+            if word[0].isupper() and word[1:].islower() and word not in CALENDAR_WORDS and word not in people:
+                people.append(word)
+    return people
+
+
+def predict_delegations(question: str, agents, today: date = None) -> list:
+    """
+    Predict the read-only delegations a question will start with: the availability of every named person for
+    the week asked for, and a room check when the headcount, date and timeslot are known.
+    """
+    today = today or datetime.now().date()
+    iso_date = ISO_DATE_RE.search(question)
+    if iso_date:
+        day = date.fromisoformat(iso_date.group(1))
+    elif "next week" in question.lower():
+        day = today + timedelta(days=7)
+    else:
+        day = None
+
+    speculations = []
+    people = named_people(question)
+    if day is not None and "schedule_manager" in agents:
+        week_start = (day - timedelta(days=day.weekday())).isoformat()
+        for person in people:
+            speculations.append(Speculation(
+                "schedule_manager", f"Check the availability of {person} for the week starting {week_start}",
+                [_word(person), "availab", _word(week_start)],
+                action="check_availability", arguments={"date": week_start, "person": person}, people=[person]))
+
+    headcount = HEADCOUNT_RE.search(question)
+    timeslot = TIMESLOT_RE.search(question)
+    if iso_date and timeslot and "room_manager" in agents:
+        number_of_people = headcount.group(1) if headcount else str(len(people))
+        if number_of_people != "0":
+            speculations.append(Speculation(
+                "room_manager", f"Check for an available room for {number_of_people} people on "
+                                f"{iso_date.group(1)} in the {timeslot.group(1).lower()}",
+                [r"\broom", "availab", _number(number_of_people), _word(iso_date.group(1))],
+                action="check_available_room", arguments={"req_date": iso_date.group(1),
+                                                          "timeslot": timeslot.group(1).lower(),
+                                                          "number_of_people": int(number_of_people)}))
+    return speculations
+
+
+class SpeculationBatch:
+    """The speculations started for one question."""
+    def __init__(self, speculator, speculations):
+        self.speculator = speculator
+        self.speculations = speculations
+        self._lock = threading.Lock()
+
+    def claim(self, agent: str, request: str):
+        """Return the future of a matching speculation and mark it used, None when nothing matches."""
+        return self.__claim(lambda speculation: speculation.matches(agent, request))
+
+    def claim_call(self, agent: str, action: str, arguments):
+        """Like claim, for a structured call of an action with its arguments."""
+        return self.__claim(lambda speculation: speculation.matches_call(agent, action, arguments))
+
+    def __claim(self, matches):
+        with self._lock:
+            for speculation in self.speculations:
+                if matches(speculation):
+                    speculation.claimed = True
+                    self.speculator.record_hit(speculation)
+                    return speculation.future
+        return None
+
+    def finish(self):
+        """Drop the speculations that were not used, their tokens are counted as wasted."""
+        with self._lock:
+            for speculation in self.speculations:
+                if not speculation.claimed:
+                    speculation.claimed = True
+                    self.speculator.record_waste(speculation)
+
+
+class Speculator:
+    """
+    Starts predicted read-only delegations in the background while the orchestrator's first LLM call runs.
+    Every speculation runs on a clone of the agent with its own tracer, so the tokens of used and of wasted
+    speculations can be compared. For an orchestrator with structured delegation the speculations call the
+    predicted action directly, without the LLM turns of the agent.
+    """
+    def __init__(self, max_workers: int = 4, today: date = None):
+        self.log = logging.getLogger("main.Speculator")
+        self.today = today
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculation")
+        self._lock = threading.Lock()
+        self.counters = {"started": 0, "hits": 0, "wasted": 0, "tokens_used": 0, "tokens_wasted": 0}
+
+    def start(self, question: str, agents: dict, structured: bool = False) -> SpeculationBatch:
+        speculations = predict_delegations(question, agents, self.today)
+        for speculation in speculations:
+            speculation.future = self._executor.submit(self.__run, agents[speculation.agent].clone(), speculation,
+                                                       structured)
+            self.log.info("Speculating %s: %s", speculation.agent, speculation.request)
+        with self._lock:
+            self.counters["started"] += len(speculations)
+        return SpeculationBatch(self, speculations)
+
+    @staticmethod
+    def __run(agent, speculation: Speculation, structured: bool):
+        with use_tracer(speculation.tracer):
+            if structured and speculation.action in agent.action_specs:
+                return agent.call_action(speculation.action, speculation.arguments)
+            return agent.perform_action(command=speculation.request)
+
+    def __count_tokens(self, speculation: Speculation, counter: str):
+        def _add(_):
+            with self._lock:
+                self.counters[counter] += speculation.tokens()
+        speculation.future.add_done_callback(_add)
+
+    def record_hit(self, speculation: Speculation):
+        with self._lock:
+            self.counters["hits"] += 1
+        self.__count_tokens(speculation, "tokens_used")
+
+    def record_waste(self, speculation: Speculation):
+        with self._lock:
+            self.counters["wasted"] += 1
+        # A speculation that did not start yet is cancelled and costs nothing
+        if not speculation.future.cancel():
+            self.__count_tokens(speculation, "tokens_wasted")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["hit_rate"] = stats["hits"] / stats["started"] if stats["started"] else 0.0
+        return stats
@@ -1,6 +1,6 @@
 from bring_a_crew_bedrock.action_agent import ActionAgent
 
-def create_agent():
+def create_agent(**kwargs):
     return ActionAgent(
         name="food_manager",
         intro="This agent prepares and serves food for the meetings. You can book food in a specific room using the id of the room. Always return that it is ok and the booking is received.",
@@ -15,5 +15,6 @@ def create_agent():
                     {"name": "room_id", "type": "str"}
                 ]
             }
-        }
+        },
+        **kwargs
     )
\ No newline at end of file
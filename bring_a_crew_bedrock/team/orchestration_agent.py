@@ -1,22 +1,57 @@
+import asyncio
+import json
 import logging
 import re
 from abc import ABC
-from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
+from bring_a_crew_bedrock.action_agent import PARALLEL_ACTIONS_RULE, ActionAgent, create_system_blocks
+from bring_a_crew_bedrock.async_bedrock import run_blocking
+from bring_a_crew_bedrock.bedrock_clients import get_bedrock_client
+from bring_a_crew_bedrock.conversation_memory import ConversationMemory
+from bring_a_crew_bedrock.model_router import DEFAULT_MODEL_ID, ModelRouter, RoutedBedrockClient
+from bring_a_crew_bedrock.plan_executor import PlanError, execute_plan, execute_plan_async, format_plan_outcome, \
+    parse_plan
+from bring_a_crew_bedrock.parallel_dispatch import DEFAULT_MAX_WORKERS, dispatch_actions, dispatch_actions_async, \
+    format_observations, submit_in_context
+from bring_a_crew_bedrock.rate_limiter import rate_limited
+from bring_a_crew_bedrock.react_parser import parse_response, stream_react_turn
+from bring_a_crew_bedrock.speculation import Speculator
+from bring_a_crew_bedrock.tool_use import ArgumentError
+from bring_a_crew_bedrock.tracing import LLM_CALL, QUESTION, TURN, get_tracer, record_usage
 
-from bring_a_crew_bedrock.action_agent import ActionAgent
+STRUCTURED_DELEGATION_RULE = """
+An action of an agent can also be called directly, with its arguments as a json document: Action: [agent].[action]: [arguments]. Call an action directly whenever the subquestion maps to one action and you know all its arguments, ask the agent a subquestion otherwise.
+""".strip()
 
-MODEL = 'phi4'
 
+PLAN_ANSWER_REMINDER = """
+Observation: All steps are done, do not plan again. Reply with the final answer only:
+Answer: [Use the results to write a friendly response with the answer to the question]
+""".strip()
 
-def create_system_prompt(agents: list[ActionAgent]):
-    agents_str = "\n".join([f" - `{agent.name}`; for {agent.intro}" for agent in agents])
+
+def _describe_actions(agent: ActionAgent) -> str:
+    def _extract_arguments(arguments):
+        return ",".join([f" `{argument["name"]}`({argument["type"]})" for argument in arguments])
+    return "\n".join([f"   - `{agent.name}.{action}`; for {value["description"]} with arguments {_extract_arguments(value["arguments"])}"
+                      for action, value in agent.action_specs.items()])
+
+
+def create_system_prompt(agents: list[ActionAgent], parallel_actions: bool = False,
+                         structured_delegation: bool = False):
+    if structured_delegation:
+        agents_str = "\n".join([f" - `{agent.name}`; for {agent.intro}\n{_describe_actions(agent)}" for agent in agents])
+    else:
+        agents_str = "\n".join([f" - `{agent.name}`; for {agent.intro}" for agent in agents])
+    rules = [PARALLEL_ACTIONS_RULE] if parallel_actions else []
+    if structured_delegation:
+        rules.append(f"{5 + len(rules)}. {STRUCTURED_DELEGATION_RULE}")
+    extra_rules = "".join(f"\n{rule}" for rule in rules)
     return f"""
 You are an AI Orchestration agent following the ReAct framework, where you **Think**, **Act**, and process **Observations** in response to a given **Question**.  During thinking you analyse the question, break it down into subquestions, and decide on the actions to take to answer the question. You then act by calling other agents. After each action, you pause to observe the results of the action. You then continue the cycle by thinking about the new observation and deciding on the next action to take. You continue this cycle until you have enough information to answer the original question.
 
-The date for today is: {datetime.now().strftime("%Y-%m-%d")}
-
 You will always follow this structured format:
 Question: [User’s question]
 Think: [Your reasoning about how to answer the question using available actions only]
@@ -37,7 +72,7 @@ Rules:
 2. Never generate output after "PAUSE"
 3. Observations will be provided as a response to an action; never generate your own output for an action.
 4. These are the only available actions:
-{agents_str}
+{agents_str}{extra_rules}
 
 Example Interactions:
 - User Input:
@@ -70,6 +105,46 @@ Think: Now that I have the result, I can provide the final answer.
 Answer: I have booked a room for 4 people for next tuesday in the morning including lunch in room max_8_people.
 """.strip()
 
+def create_planning_prompt(agents: list[ActionAgent]):
+    agents_str = "\n".join([f" - `{agent.name}`; for {agent.intro}" for agent in agents])
+    return f"""
+You are an AI Orchestration planner. You answer a **Question** by delegating subquestions to other agents. Instead of calling the agents one at a time, you first write the complete plan as a JSON object. The steps of the plan are run for you, steps that do not depend on each other run at the same time.
+
+Reply with the plan only, in this format:
+{{"steps": [{{"id": "[short unique id]", "agent": "[agent]", "request": "[subquestion for the agent]", "depends_on": ["[id of a step whose result this step needs]"]}}]}}
+
+Rules:
+1. These are the only available agents:
+{agents_str}
+2. A step that needs the result of another step lists that step in depends_on, and refers to its result with {{id}} in its request.
+3. Only add a dependency when a step really needs the result, steps without dependencies run in parallel.
+4. Never make up the result of a step.
+5. When you receive the results of all steps, reply with the final answer only:
+Answer: [Use the results to write a friendly response with the answer to the question]
+6. When a step failed, you receive the completed results and the error. Reply with a new plan for the remaining work only, its steps can depend on the ids of completed steps.
+
+Example Interaction:
+- User Input:
+I like to book a room for 4 people for next tuesday in the morning including lunch?
+- Model Response:
+{{"steps": [
+  {{"id": "room", "agent": "room_manager", "request": "Check availability for a room for 4 people on next tuesday in the morning", "depends_on": []}},
+  {{"id": "book_room", "agent": "room_manager", "request": "Book a room for 4 people on next tuesday in the morning, availability: {{room}}", "depends_on": ["room"]}},
+  {{"id": "lunch", "agent": "food_manager", "request": "Prepare lunch for 4 people on next tuesday in the morning in the room of this booking: {{book_room}}", "depends_on": ["book_room"]}}
+]}}
+
+User Provides an Observation:
+Observation: All steps are done.
+- room (room_manager): A room for 8 people is available next tuesday in the morning.
+- book_room (room_manager): I have booked room with id max_8_people.
+- lunch (food_manager): Lunch will be served next tuesday for 4 people in the room max_8_people.
+Reply with the final answer.
+
+Model Continues:
+Answer: I have booked a room for 4 people for next tuesday in the morning including lunch in room max_8_people.
+""".strip()
+
+
 class OrchestrationAgent(ABC):
     """
     An agent that orchestrates the conversation between the user and the other agents. The
@@ -80,15 +155,41 @@ class OrchestrationAgent(ABC):
     then continues the cycle by thinking about the new observation and deciding on the next action to take.
     It continues this cycle until it has enough information to answer the original question.
     """
-    def __init__(self, name: str, description: str, agents: list[ActionAgent]):
+    def __init__(self, name: str, description: str, agents: list[ActionAgent], parallel_actions: bool = False,
+                 max_parallel_actions: int = DEFAULT_MAX_WORKERS, stream: bool = False, client=None,
+                 memory_manager: ConversationMemory = None, prompt_caching: bool = True, router: ModelRouter = None,
+                 planning: bool = False, max_replans: int = 2, speculator: Speculator = None,
+                 structured_delegation: bool = False):
         self.log = logging.getLogger("main.OrchestrationAgent")
         self.log.info("Initializing Orchestration Agent")
 
         # Initialize the messages with the system message
         self.memory = []
-        self.system_prompt = create_system_prompt(agents=agents)
-        self.model = "eu.amazon.nova-lite-v1:0"
-        self.client = boto3.client("bedrock-runtime", region_name="eu-west-1")
+        # Optional manager that keeps the messages sent to the model within a token budget
+        self.memory_manager = memory_manager
+        # With planning the model writes one plan of all delegations, which runs as a DAG, instead of
+        # deciding on the next delegation every turn
+        self.planning = planning
+        self.max_replans = max_replans
+        if planning:
+            self.system_prompt = create_planning_prompt(agents=agents)
+        else:
+            self.system_prompt = create_system_prompt(agents=agents, parallel_actions=parallel_actions,
+                                                      structured_delegation=structured_delegation)
+        # With structured delegation the model can call an action of a sub-agent with JSON arguments, which
+        # runs locally without the LLM turns of the sub-agent
+        self.structured_delegation = structured_delegation
+        # Mark the static system prompt with a Bedrock cache point, so it is not processed again every call
+        self.prompt_caching = prompt_caching
+        # The default model, with a router the model of every call is on its LLM_CALL span
+        self.model = DEFAULT_MODEL_ID
+        # With a router the model and region of every call are chosen per call for the orchestrator role
+        if router is not None:
+            if client is not None:
+                raise Exception("Pass either a client or a router, not both. A RoutedBedrockClient with a "
+                                "client_factory combines them")
+            client = RoutedBedrockClient(router, role=name)
+        self.client = rate_limited(client if client is not None else get_bedrock_client())
 
 
         # Initialize the known agents
@@ -97,46 +198,318 @@ class OrchestrationAgent(ABC):
             for agent in agents:
                 self.known_agents[agent.name] = agent
 
+        # When enabled, all delegations of one turn run together instead of only the first one
+        self.parallel_actions = parallel_actions
+        self.max_parallel_actions = max_parallel_actions
+        # When enabled, the response is streamed and delegations start as soon as their line is complete
+        self.stream = stream
+
+        # Optional stage that prefetches predictable read-only delegations while the first LLM call runs
+        self.speculator = speculator
+        self.speculation_batch = None
+
         self.max_turns = 10
-        self.action_re = re.compile(r'^Action: (\w+): (.*)$')
+        self.action_re = re.compile(r'^Action: ([\w.]+): (.*)$' if structured_delegation else r'^Action: (\w+): (.*)$')
         self.answer_re = re.compile(r'^Answer: (.*)$')
 
+    def reset(self):
+        """Forget the conversation of this agent and of all the agents it orchestrates."""
+        self.memory = []
+        if self.memory_manager is not None:
+            self.memory_manager.reset_stats()
+        for agent in self.known_agents.values():
+            agent.reset()
+
+    def tokens_saved(self) -> int:
+        """Estimated input tokens kept out of the requests by this agent and its team since the last reset."""
+        saved = self.memory_manager.tokens_saved if self.memory_manager is not None else 0
+        return saved + sum(agent.tokens_saved() for agent in self.known_agents.values())
+
     def call_agent(self, question):
-        i = 0
+        tracer = get_tracer()
+        with tracer.span(QUESTION, agent="orchestrator", question=question), self.__speculating(question):
+            if self.planning:
+                return self.__plan_and_execute(question)
+            i = 0
+            next_prompt = question
+            while i < self.max_turns:
+                i += 1
+                with tracer.span(TURN, agent="orchestrator", turn=i) as span:
+                    # Check if there is an action to run or an answer to return
+                    if self.stream:
+                        parsed, observation = self.__handle_user_message_streaming(next_prompt)
+                    else:
+                        parsed = parse_response(self.__handle_user_message(next_prompt), self.action_re, self.answer_re)
+                        observation = self.__execute_action(parsed.actions) if parsed.actions else None
+                    span.set(actions=len(parsed.actions))
+
+                if observation is None:
+                    return self.__extract_answer(parsed)
+                next_prompt = observation
+
+    async def call_agent_async(self, question):
+        """Async variant of call_agent, sub-agents are called through their perform_action_async."""
+        tracer = get_tracer()
+        with tracer.span(QUESTION, agent="orchestrator", question=question), self.__speculating(question):
+            if self.planning:
+                return await self.__plan_and_execute_async(question)
+            i = 0
+            next_prompt = question
+            while i < self.max_turns:
+                i += 1
+                with tracer.span(TURN, agent="orchestrator", turn=i) as span:
+                    result = await self.__handle_user_message_async(next_prompt)
+
+                    # Check if there is an action to run or an answer to return
+                    parsed = parse_response(result, self.action_re, self.answer_re)
+                    span.set(actions=len(parsed.actions))
+                    if parsed.actions:
+                        next_prompt = await self.__execute_action_async(parsed.actions)
+
+                if not parsed.actions:
+                    return self.__extract_answer(parsed)
+
+    def __plan_and_execute(self, question):
+        """
+        Ask for a plan, run it as a DAG, and ask for the final answer. When the plan is invalid or a step
+        fails, the model gets the results so far and plans the remaining work, at most max_replans times.
+        """
+        tracer = get_tracer()
+        completed = {}
         next_prompt = question
-        while i < self.max_turns:
-            i += 1
-            result = self.__handle_user_message(next_prompt)
+        for attempt in range(1, self.max_replans + 2):
+            with tracer.span(TURN, agent="orchestrator", turn=attempt, phase="plan") as span:
+                try:
+                    steps = parse_plan(self.__handle_user_message(next_prompt), self.known_agents, completed)
+                except PlanError as e:
+                    self.log.error("Invalid plan: %s", e)
+                    next_prompt = f"Observation: {e}\nReply with a valid plan."
+                    continue
+                span.set(steps=len(steps))
 
-            # Check if there is an action to run or an answer to return
-            actions = [self.action_re.match(a) for a in result.split('\n') if self.action_re.match(a)]
-            if actions:
-                next_prompt = self.__execute_action(actions)
-            else:
-                return self.__extract_answer(result)
+            with tracer.span(TURN, agent="orchestrator", turn=attempt, phase="execute", steps=len(steps)):
+                outcome = execute_plan(steps, self.__run_step, self.max_parallel_actions, completed)
+            completed.update(outcome.results)
+            next_prompt = format_plan_outcome(steps, outcome)
+            if outcome.failed is None:
+                with tracer.span(TURN, agent="orchestrator", turn=attempt, phase="answer"):
+                    answer = self.__plan_answer(self.__handle_user_message(next_prompt))
+                    if answer is None:
+                        answer = self.__plan_answer(self.__handle_user_message(PLAN_ANSWER_REMINDER), retry=False)
+                    return answer
 
-    def __execute_action(self, actions):
-        action, action_input = actions[0].groups()
-        if action not in self.known_agents:
+        raise Exception("No plan completed after {} attempts".format(self.max_replans + 1))
+
+    async def __plan_and_execute_async(self, question):
+        """Async variant of __plan_and_execute."""
+        tracer = get_tracer()
+        completed = {}
+        next_prompt = question
+        for attempt in range(1, self.max_replans + 2):
+            with tracer.span(TURN, agent="orchestrator", turn=attempt, phase="plan") as span:
+                try:
+                    steps = parse_plan(await self.__handle_user_message_async(next_prompt), self.known_agents,
+                                       completed)
+                except PlanError as e:
+                    self.log.error("Invalid plan: %s", e)
+                    next_prompt = f"Observation: {e}\nReply with a valid plan."
+                    continue
+                span.set(steps=len(steps))
+
+            with tracer.span(TURN, agent="orchestrator", turn=attempt, phase="execute", steps=len(steps)):
+                outcome = await execute_plan_async(steps, self.__run_step_async, self.max_parallel_actions, completed)
+            completed.update(outcome.results)
+            next_prompt = format_plan_outcome(steps, outcome)
+            if outcome.failed is None:
+                with tracer.span(TURN, agent="orchestrator", turn=attempt, phase="answer"):
+                    answer = self.__plan_answer(await self.__handle_user_message_async(next_prompt))
+                    if answer is None:
+                        answer = self.__plan_answer(await self.__handle_user_message_async(PLAN_ANSWER_REMINDER),
+                                                    retry=False)
+                    return answer
+
+        raise Exception("No plan completed after {} attempts".format(self.max_replans + 1))
+
+    @contextmanager
+    def __speculating(self, question):
+        if self.speculator is None:
+            yield
+            return
+        self.speculation_batch = self.speculator.start(question, self.known_agents,
+                                                       structured=self.structured_delegation)
+        try:
+            yield
+        finally:
+            self.speculation_batch.finish()
+            self.speculation_batch = None
+
+    def __prefetched(self, action, action_input):
+        """The future of a speculative run of this delegation, None when it was not predicted."""
+        batch = self.speculation_batch
+        return batch.claim(action, action_input) if batch is not None else None
+
+    def __prefetched_call(self, agent_name, action_name, arguments):
+        """Like __prefetched, for a structured call of an action."""
+        batch = self.speculation_batch
+        return batch.claim_call(agent_name, action_name, arguments) if batch is not None else None
+
+    def __run_step(self, step, request):
+        # Steps of one plan can run at the same time on the same agent, each gets its own clone
+        return self.__run_action(self.known_agents[step.agent].clone(), step.agent, request)
+
+    async def __run_step_async(self, step, request):
+        return await self.__run_action_async(self.known_agents[step.agent].clone(), step.agent, request)
+
+    def __plan_answer(self, text, retry: bool = True):
+        """
+        The answer in the reply to the results of a plan. A reply without an Answer line, for instance another
+        plan, returns None to ask once more, after that it is a planning failure.
+        """
+        parsed = parse_response(text, self.action_re, self.answer_re)
+        if parsed.answer is None:
+            if retry:
+                self.log.warning("No final answer after the plan, asking again: %s", text)
+                return None
+            self.log.error("No final answer after the plan: %s", text)
+            raise Exception("No final answer after the plan completed: {}".format(text))
+        self.log.info("Final answer: %s", parsed.answer)
+        return parsed.answer
+
+    def __select_agent(self, action, action_input, used_agents):
+        # A structured delegation names the agent and its action: agent.action
+        agent_name = action.split(".", 1)[0]
+        if agent_name not in self.known_agents:
             self.log.error("Unknown action: %s: %s", action, action_input)
             raise Exception("Unknown action: {}: {}".format(action, action_input))
 
+        # An agent keeps its memory between calls, so when the same agent is asked more than one
+        # question in a turn, the extra questions go to a fresh clone of that agent.
+        agent = self.known_agents[agent_name]
+        agent = agent.clone() if agent in used_agents else agent
+        used_agents.append(agent)
+        return agent
+
+    def __run_action(self, agent, action, action_input):
+        if "." in action:
+            return self.__run_structured(agent, action, action_input)
         self.log.info(" -- running %s %s", action, action_input)
-        observation = self.known_agents[action].perform_action(command=action_input)
+        observation = None
+        prefetched = self.__prefetched(action, action_input)
+        if prefetched is not None:
+            try:
+                observation = prefetched.result()
+            except Exception as e:
+                self.log.warning("Speculative run of %s failed, running it again: %s", action, e)
+        if observation is None:
+            observation = agent.perform_action(command=action_input)
+        self.log.info("Observation: %s", observation)
+        return observation
 
+    async def __run_action_async(self, agent, action, action_input):
+        if "." in action:
+            return await self.__run_structured_async(agent, action, action_input)
+        self.log.info(" -- running %s %s", action, action_input)
+        observation = None
+        prefetched = self.__prefetched(action, action_input)
+        if prefetched is not None:
+            try:
+                observation = await asyncio.wrap_future(prefetched)
+            except Exception as e:
+                self.log.warning("Speculative run of %s failed, running it again: %s", action, e)
+        if observation is None:
+            observation = await agent.perform_action_async(command=action_input)
         self.log.info("Observation: %s", observation)
-        return f"Observation: {observation}"
+        return observation
+
+    def __run_structured(self, agent, action, action_input):
+        """
+        Run agent.action locally with the JSON arguments, or use the speculative run of the same call. A call
+        that does not validate goes to the agent's LLM.
+        """
+        action_name = action.split(".", 1)[1]
+        try:
+            arguments = json.loads(action_input)
+            prefetched = self.__prefetched_call(agent.name, action_name, arguments)
+            if prefetched is not None:
+                try:
+                    return prefetched.result()
+                except Exception as e:
+                    self.log.warning("Speculative run of %s failed, running it again: %s", action, e)
+            return agent.call_action(action_name, arguments)
+        except (json.JSONDecodeError, ArgumentError) as e:
+            self.log.warning("Invalid structured delegation %s, asking %s instead: %s", action, agent.name, e)
+        return agent.perform_action(command=f"{action_name}: {action_input}")
+
+    async def __run_structured_async(self, agent, action, action_input):
+        action_name = action.split(".", 1)[1]
+        try:
+            arguments = json.loads(action_input)
+            prefetched = self.__prefetched_call(agent.name, action_name, arguments)
+            if prefetched is not None:
+                try:
+                    return await asyncio.wrap_future(prefetched)
+                except Exception as e:
+                    self.log.warning("Speculative run of %s failed, running it again: %s", action, e)
+            return await agent.call_action_async(action_name, arguments)
+        except (json.JSONDecodeError, ArgumentError) as e:
+            self.log.warning("Invalid structured delegation %s, asking %s instead: %s", action, agent.name, e)
+        return await agent.perform_action_async(command=f"{action_name}: {action_input}")
+
+    def __execute_action(self, actions):
+        if not self.parallel_actions:
+            actions = actions[:1]
+        agents = []
+        for action, action_input in actions:
+            self.__select_agent(action, action_input, agents)
+
+        def _run_action(index, action, action_input):
+            return self.__run_action(agents[index], action, action_input)
 
-    def __extract_answer(self, result):
-        answers = [self.answer_re.match(answer) for answer in result.split('\n') if self.answer_re.match(answer)]
-        if answers:
+        results = dispatch_actions(actions, _run_action, max_workers=self.max_parallel_actions)
+        return format_observations(results)
+
+    async def __execute_action_async(self, actions):
+        if not self.parallel_actions:
+            actions = actions[:1]
+        agents = []
+        for action, action_input in actions:
+            self.__select_agent(action, action_input, agents)
+
+        async def _run_action(index, action, action_input):
+            return await self.__run_action_async(agents[index], action, action_input)
+
+        results = await dispatch_actions_async(actions, _run_action, max_workers=self.max_parallel_actions)
+        return format_observations(results)
+
+    def __extract_answer(self, parsed):
+        if parsed.answer is not None:
             # There is an answer to return
-            self.log.info("Final answer: %s", answers[0].groups()[0])
-            return answers[0].groups()[0]
+            self.log.info("Final answer: %s", parsed.answer)
+            return parsed.answer
         else:
-            self.log.error("No action or answer found in: %s", result)
-            raise Exception("No action or answer found in: {}".format(result))
+            self.log.error("No action or answer found in: %s", parsed.text)
+            raise Exception("No action or answer found in: {}".format(parsed.text))
+
+    def __handle_user_message_streaming(self, message):
+        self.log.info(f"Received message: {message}")
+        self.memory.append({"role": "user", "content": [{"text": message}]})
+
+        agents = []
+        started = []
+        with ThreadPoolExecutor(max_workers=self.max_parallel_actions) as executor:
+            def _start_action(index, action, action_input):
+                agent = self.__select_agent(action, action_input, agents)
+                started.append((action, submit_in_context(executor, self.__run_action, agent, action, action_input)))
 
+            with get_tracer().span(LLM_CALL, agent="orchestrator", model=self.model, stream=True) as span:
+                parsed = stream_react_turn(self.client, self.__converse_request(), _start_action,
+                                           max_actions=None if self.parallel_actions else 1,
+                                           action_re=self.action_re, answer_re=self.answer_re)
+                record_usage(span, parsed.usage, parsed.metrics)
+            self.log.info(f"Response: {parsed.text}")
+            self.memory.append({"role": "assistant", "content": [{"text": parsed.text}]})
+            results = [(action, future.result()) for action, future in started]
+        return parsed, format_observations(results) if results else None
 
     def __handle_user_message(self, message):
         self.log.info(f"Received message: {message}")
@@ -145,12 +518,36 @@ class OrchestrationAgent(ABC):
         self.memory.append({"role": "assistant", "content": [{"text": result}]})
         return result
 
-    def __execute(self) -> str:
-        bedrock_response  = self.client.converse(
-            modelId=self.model,
-            messages=self.memory,
-            system = [{"text":  self.system_prompt}],
-            inferenceConfig={"maxTokens": 512, "temperature": 0, "topP": 0.9, "stopSequences": ["PAUSE"]},
-        )
+    async def __handle_user_message_async(self, message):
+        self.log.info(f"Received message: {message}")
+        self.memory.append({"role": "user", "content": [{"text": message}]})
+        result = await self.__execute_async()
+        self.memory.append({"role": "assistant", "content": [{"text": result}]})
+        return result
+
+    def __converse_request(self) -> dict:
+        return {
+            "modelId": self.model,
+            "messages": self.memory if self.memory_manager is None else self.memory_manager.select(self.memory),
+            "system": create_system_blocks(self.system_prompt, self.prompt_caching),
+            # A plan of all delegations needs more room than one ReAct turn
+            "inferenceConfig": {"maxTokens": 1024 if self.planning else 512, "temperature": 0, "topP": 0.9,
+                                "stopSequences": ["PAUSE"]},
+        }
+
+    def __response_text(self, bedrock_response) -> str:
         self.log.info(f"Response: {bedrock_response["output"]["message"]["content"]}")
         return bedrock_response["output"]["message"]["content"][0]["text"]
+
+    def __execute(self) -> str:
+        with get_tracer().span(LLM_CALL, agent="orchestrator", model=self.model) as span:
+            bedrock_response = self.client.converse(**self.__converse_request())
+            record_usage(span, bedrock_response.get("usage"), bedrock_response.get("metrics"))
+        return self.__response_text(bedrock_response)
+
+    async def __execute_async(self) -> str:
+        with get_tracer().span(LLM_CALL, agent="orchestrator", model=self.model) as span:
+            bedrock_response = await run_blocking(self.client.converse, **self.__converse_request())
+            record_usage(span, bedrock_response.get("usage"), bedrock_response.get("metrics"))
+        return self.__response_text(bedrock_response)
+
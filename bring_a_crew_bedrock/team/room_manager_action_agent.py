@@ -18,7 +18,7 @@ def book_room(req_date: str, timeslot: str, number_of_people: int):
     return f"Room with more then {number_of_people} seats is booked on {req_date} for {timeslot} with id {room_id}."
 
 
-def create_agent():
+def create_agent(**kwargs):
     return  ActionAgent(
         name="room_manager",
         intro="This agent checks the availability of rooms and books them.",
@@ -30,7 +30,12 @@ def create_agent():
                     {"name": "req_date", "type": "str"},
                     {"name": "timeslot", "type": "str"},
                     {"name": "number_of_people", "type": "int"}
-                ]
+                ],
+                "cache": {
+                    "ttl": 60,
+                    "key": lambda req_date, timeslot, number_of_people: (req_date, timeslot,
+                                                                          str(number_of_people).strip())
+                }
             },
             "book_room": {
                 "description": "Book a room with more then requested seats for the asked time and day. Rooms are only available to book for morning or afternoon. Return the room id.",
@@ -39,9 +44,11 @@ def create_agent():
                     {"name": "req_date", "type": "str"},
                     {"name": "timeslot", "type": "str"},
                     {"name": "number_of_people", "type": "int"}
-                ]
+                ],
+                "invalidates": ["check_available_room"]
             }
-        }
+        },
+        **kwargs
     )
 
 if __name__ == "__main__":
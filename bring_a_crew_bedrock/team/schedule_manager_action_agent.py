@@ -18,7 +18,7 @@ def book_person(date: str, timeslot: str, person: str):
     return f"{person} is booked for a meeting on {date} at {timeslot}."
 
 
-def create_agent():
+def create_agent(**kwargs):
     return ActionAgent(
         name="schedule_manager",
         intro="This agent manages the schedule of people. You can check for availability of people and book them for a meeting.",
@@ -29,7 +29,8 @@ def create_agent():
                 "arguments": [
                     {"name": "date", "type": "str"},
                     {"name": "person", "type": "str"}
-                ]
+                ],
+                "cache": {"ttl": 60}
             },
             "book_person": {
                 "description": "Book a person for a meeting on a given date and time.",
@@ -38,7 +39,9 @@ def create_agent():
                     {"name": "date", "type": "str"},
                     {"name": "timeslot", "type": "str"},
                     {"name": "person", "type": "str"}
-                ]
+                ],
+                "invalidates": ["check_availability"]
             }
-        }
+        },
+        **kwargs
     )
\ No newline at end of file
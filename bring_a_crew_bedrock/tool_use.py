@@ -0,0 +1,109 @@
+ARGUMENT_TYPES = {
+    "str": "string",
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+}
+
+
+class ArgumentError(ValueError):
+    """The arguments for an action do not match its spec."""
+
+
+def _coerce(value, argument_type: str):
+    if argument_type == "int":
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError("not an integer: {!r}".format(value))
+        return int(value)
+    if argument_type == "float":
+        if isinstance(value, bool):
+            raise ValueError("not a number: {!r}".format(value))
+        return float(value)
+    if argument_type == "bool":
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in ("true", "false"):
+            return str(value).lower() == "true"
+        raise ValueError("not a boolean: {!r}".format(value))
+    if isinstance(value, (dict, list)):
+        raise ValueError("not a string: {!r}".format(value))
+    return str(value)
+
+
+def validate_arguments(arguments_spec, values) -> dict:
+    """
+    Check the values for an action against its arguments spec in one pass and convert them to the declared
+    types. Raises an ArgumentError for missing, unknown or badly typed arguments.
+    """
+    if not isinstance(values, dict):
+        raise ArgumentError("Arguments must be a JSON object, got: {!r}".format(values))
+    unknown = set(values) - {argument["name"] for argument in arguments_spec}
+    if unknown:
+        raise ArgumentError("Unknown arguments: {}".format(sorted(unknown)))
+    arguments = {}
+    for argument in arguments_spec:
+        name = argument["name"]
+        if name not in values:
+            raise ArgumentError("Missing argument: {}".format(name))
+        try:
+            arguments[name] = _coerce(values[name], argument["type"])
+        except (TypeError, ValueError) as e:
+            raise ArgumentError("Invalid argument {}: {}".format(name, e))
+    return arguments
+
+
+def create_tool_config(actions) -> dict:
+    """Build a Converse toolConfig from an actions dict, using the name and type of each argument."""
+    tools = []
+    for action, value in actions.items():
+        properties = {argument["name"]: {"type": ARGUMENT_TYPES.get(argument["type"], "string")}
+                      for argument in value["arguments"]}
+        tools.append({
+            "toolSpec": {
+                "name": action,
+                "description": value["description"],
+                "inputSchema": {
+                    "json": {
+                        "type": "object",
+                        "properties": properties,
+                        "required": [argument["name"] for argument in value["arguments"]],
+                    }
+                },
+            }
+        })
+    return {"tools": tools}
+
+
+def create_tool_use_system_prompt(agent_intro: str) -> str:
+    return f"""
+{agent_intro}
+
+Use the available tools to answer the question. Call tools that do not depend on each other in the same turn. Never make up the result of a tool. When you have enough information, reply with a friendly final answer to the question only.
+""".strip()
+
+
+def tool_uses(message: dict) -> list:
+    """The toolUse blocks of an assistant message."""
+    return [block["toolUse"] for block in message["content"] if "toolUse" in block]
+
+
+def message_text(message: dict) -> str:
+    return "\n".join(block["text"] for block in message["content"] if "text" in block)
+
+
+def tool_result_message(results) -> dict:
+    """
+    Build the user message with a toolResult block per tool call.
+
+    :param results: list of (toolUse block, observation, error) tuples, error is None on success
+    """
+    content = []
+    for tool_use, observation, error in results:
+        content.append({
+            "toolResult": {
+                "toolUseId": tool_use["toolUseId"],
+                "content": [{"text": str(observation if error is None else error)}],
+                "status": "success" if error is None else "error",
+            }
+        })
+    return {"role": "user", "content": content}
@@ -0,0 +1,198 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+QUESTION = "question"
+TURN = "turn"
+PERFORM_ACTION = "perform_action"
+LLM_CALL = "llm_call"
+TOOL = "tool"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_current_tracer = contextvars.ContextVar("current_tracer", default=None)
+
+
+class Span:
+    """One timed unit of work, for instance a question, a turn, an LLM call or a tool execution."""
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end = None
+        self._start_counter = time.perf_counter()
+        self.wall_ms = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.end = time.time()
+        self.wall_ms = (time.perf_counter() - self._start_counter) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "wall_ms": self.wall_ms,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer:
+    """Tracer that records nothing, used when tracing is not enabled."""
+    @contextmanager
+    def span(self, name: str, **attributes):
+        yield _NOOP_SPAN
+
+
+class Tracer:
+    """
+    Records a tree of spans. The current span is kept in a context variable, so spans started in async
+    tasks or in threads that run a copied context get the right parent. Finished spans are kept per trace.
+    When a root span finishes, all spans of its trace are handed to the exporter and dropped, so a long
+    running process with an exporter does not keep every trace in memory.
+    """
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self._traces = {}
+        self._lock = threading.Lock()
+
+    @property
+    def spans(self) -> list:
+        """All finished spans that are still kept, trace by trace."""
+        with self._lock:
+            return [span for spans in self._traces.values() for span in spans]
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        span = Span(name, trace_id, parent.span_id if parent is not None else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=str(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            with self._lock:
+                self._traces.setdefault(trace_id, []).append(span)
+                finished = self._traces.pop(trace_id) if parent is None and self.exporter is not None else None
+            if finished is not None:
+                self.exporter.export(sorted(finished, key=lambda s: s.start))
+
+    def trace(self, trace_id: str) -> list:
+        """All finished spans of one trace, in the order they started."""
+        with self._lock:
+            return sorted(self._traces.get(trace_id, []), key=lambda s: s.start)
+
+    def token_totals(self, trace_id: str = None) -> dict:
+        """Sum the token usage of the LLM calls, for one trace or for all the spans that are still kept."""
+        spans = self.spans if trace_id is None else self.trace(trace_id)
+        counted = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_write_input_tokens")
+        totals = dict.fromkeys(counted, 0)
+        totals["llm_calls"] = 0
+        for span in spans:
+            if span.name == LLM_CALL:
+                totals["llm_calls"] += 1
+                for name in counted:
+                    totals[name] += span.attributes.get(name, 0)
+        return totals
+
+
+_NOOP_TRACER = NoopTracer()
+_default_tracer = _NOOP_TRACER
+
+
+def set_tracer(tracer):
+    """Set the process wide tracer, None switches tracing off."""
+    global _default_tracer
+    _default_tracer = tracer if tracer is not None else _NOOP_TRACER
+
+
+def get_tracer():
+    """The tracer for the current context, falls back to the process wide tracer."""
+    tracer = _current_tracer.get()
+    return tracer if tracer is not None else _default_tracer
+
+
+def current_span():
+    """The span of the current context, a span that records nothing outside of any span."""
+    span = _current_span.get()
+    return span if span is not None else _NOOP_SPAN
+
+
+@contextmanager
+def use_tracer(tracer):
+    """Use a tracer for the code in this block only, for instance one tracer per question."""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+def record_usage(span, usage: dict = None, metrics: dict = None):
+    """Copy the usage and metrics returned by converse or converse_stream onto a span."""
+    if usage:
+        span.set(input_tokens=usage.get("inputTokens", 0), output_tokens=usage.get("outputTokens", 0),
+                 cache_read_input_tokens=usage.get("cacheReadInputTokens", 0),
+                 cache_write_input_tokens=usage.get("cacheWriteInputTokens", 0))
+    if metrics:
+        span.set(model_latency_ms=metrics.get("latencyMs"))
+
+
+class JsonLinesExporter:
+    """Append every finished trace to a file, one span per line."""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+class OpenTelemetryExporter:
+    """Replay finished traces as OpenTelemetry spans, requires the opentelemetry-api package."""
+    def __init__(self, tracer_name: str = "bring_a_crew_bedrock"):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError("The OpenTelemetryExporter needs the opentelemetry-api package") from e
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name)
+
+    def export(self, spans):
+        otel_spans = {}
+        for span in spans:
+            parent = otel_spans.get(span.parent_id)
+            context = self._trace.set_span_in_context(parent) if parent is not None else None
+            attributes = {key: value for key, value in span.attributes.items()
+                          if isinstance(value, (str, bool, int, float))}
+            otel_spans[span.span_id] = self._tracer.start_span(
+                span.name, context=context, start_time=int(span.start * 1e9), attributes=attributes
+            )
+        for span in spans:
+            otel_spans[span.span_id].end(end_time=int(span.end * 1e9))
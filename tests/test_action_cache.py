@@ -0,0 +1,37 @@
+from bring_a_crew_bedrock.action_cache import ActionResultCache, wrap_action
+from bring_a_crew_bedrock.team.room_manager_action_agent import create_agent
+
+
+class NoLLMClient:
+    handles_rate_limits = True
+
+
+def test_room_check_with_a_word_for_the_headcount_runs():
+    agent = create_agent(client=NoLLMClient())
+    check = agent.known_actions["check_available_room"]
+    assert check(req_date="2026-10-20", timeslot="morning", number_of_people="four") == (
+        "Room with more then four seats is available on 2026-10-20 for morning. You can book it.")
+
+
+def test_room_check_shares_the_cache_for_a_number_and_its_string():
+    agent = create_agent(client=NoLLMClient())
+    check = agent.known_actions["check_available_room"]
+    check(req_date="2026-10-20", timeslot="morning", number_of_people=4)
+    check(req_date="2026-10-20", timeslot="morning", number_of_people=" 4")
+    assert agent.action_cache.hits == 1
+
+
+def test_action_runs_uncached_when_the_key_function_fails():
+    calls = []
+
+    def action(value):
+        calls.append(value)
+        return value
+
+    cache = ActionResultCache()
+    wrapped = wrap_action("action", {"function": action, "cache": {"key": lambda value: int(value)}}, cache)
+    assert wrapped(value="x") == "x"
+    assert wrapped(value="x") == "x"
+    assert calls == ["x", "x"]
+    assert wrapped(value="1") == "1" and wrapped(value="1") == "1"
+    assert calls == ["x", "x", "1"]
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_bedrock import FakeBedrockAgentRuntime
+from bring_a_crew_bedrock.inline_agent_sinks import InlineAgentSink
+from bring_a_crew_bedrock.inline_agent_utils import invoke_inline_agents
+
+
+def _prompts(count: int) -> list:
+    return [{"inputText": f"Prompt {index}"} for index in range(count)]
+
+
+def _collect(generator, timeout_seconds: float = 5.0) -> list:
+    """Read the generator on a thread, so a generator that hangs fails the test instead of blocking it."""
+    outcomes = []
+    reader = threading.Thread(target=lambda: outcomes.extend(generator), daemon=True)
+    reader.start()
+    reader.join(timeout_seconds)
+    assert not reader.is_alive(), "invoke_inline_agents did not finish"
+    return outcomes
+
+
+def test_results_are_yielded_in_completion_order():
+    fake = FakeBedrockAgentRuntime(answer=lambda request: request["inputText"],
+                                   latency_seconds=lambda request: 0.3 if request["inputText"] == "Prompt 0" else 0.0)
+    outcomes = _collect(invoke_inline_agents(fake, _prompts(4), max_workers=4))
+    assert sorted(index for index, _ in outcomes) == [0, 1, 2, 3]
+    assert outcomes[-1][0] == 0
+    assert all(result.answer == f"Prompt {index}" and result.error is None for index, result in outcomes)
+
+
+def test_every_request_gets_its_own_session():
+    fake = FakeBedrockAgentRuntime()
+    prompts = _prompts(5) + [{"inputText": "Prompt 5", "sessionId": "given-session"}]
+    outcomes = _collect(invoke_inline_agents(fake, prompts, max_workers=3))
+    session_ids = {result.session_id for _, result in outcomes}
+    assert len(session_ids) == 6
+    assert fake.sessions == session_ids
+    assert dict(outcomes)[5].session_id == "given-session"
+
+
+def test_slow_request_times_out_without_holding_up_the_rest():
+    fake = FakeBedrockAgentRuntime(latency_seconds=lambda request: 2.0 if request["inputText"] == "Prompt 1" else 0.0)
+    start = time.monotonic()
+    outcomes = dict(_collect(invoke_inline_agents(fake, _prompts(3), max_workers=3, timeout_seconds=0.2)))
+    assert time.monotonic() - start < 1.5
+    assert outcomes[1].error == "No answer after 0.2s"
+    assert outcomes[0].error is None and outcomes[2].error is None
+
+
+def test_hung_streams_give_up_their_workers():
+    fake = FakeBedrockAgentRuntime(hang=lambda request: request["inputText"] != "Prompt 2")
+    try:
+        start = time.monotonic()
+        outcomes = dict(_collect(invoke_inline_agents(fake, _prompts(3), max_workers=2, timeout_seconds=0.2)))
+        # The queued request starts when the hung ones reach their deadline, and gets its own deadline
+        assert time.monotonic() - start < 1.0
+    finally:
+        fake.release()
+    assert outcomes[0].error == "No answer after 0.2s"
+    assert outcomes[1].error == "No answer after 0.2s"
+    assert outcomes[2].error is None and outcomes[2].answer == "The answer"
+
+
+def test_a_sink_without_handle_cannot_be_created():
+    class NoHandleSink(InlineAgentSink):
+        trace_details = True
+
+    with pytest.raises(TypeError):
+        NoHandleSink()
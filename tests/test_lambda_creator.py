@@ -0,0 +1,119 @@
+import io
+import os
+import threading
+import zipfile
+
+import pytest
+from botocore.exceptions import ReadTimeoutError
+
+from benchmarks.fake_lambda import FakeIamClient, FakeLambdaClient
+from bring_a_crew_bedrock import lambda_creator
+
+REGION = "eu-west-1"
+ACCOUNT_ID = "123456789012"
+MANIFEST = lambda_creator.load_manifest(os.path.join(os.path.dirname(lambda_creator.__file__), "lambdas",
+                                                     "manifest.json"))
+
+
+class ConcurrencyTrackingLambdaClient(FakeLambdaClient):
+    """Counts the CreateFunction calls that run at the same time."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.running = 0
+        self.max_running = 0
+        self._tracking_lock = threading.Lock()
+
+    def create_function(self, **kwargs):
+        with self._tracking_lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            return super().create_function(**kwargs)
+        finally:
+            with self._tracking_lock:
+                self.running -= 1
+
+
+def test_provisions_the_manifest_concurrently(tmp_path):
+    iam_client = FakeIamClient()
+    lambda_client = ConcurrencyTrackingLambdaClient(iam_client, latency_seconds=0.1)
+    resources = lambda_creator.provision_lambdas(MANIFEST, REGION, ACCOUNT_ID, iam_client, lambda_client,
+                                                 max_workers=len(MANIFEST), cache_directory=str(tmp_path))
+
+    assert sorted(resources) == ["caterer", "facility", "schedule"]
+    assert lambda_client.max_running == len(MANIFEST)
+    assert sorted(lambda_client.functions) == sorted(f"{entry['custom_name']}-{REGION}-{ACCOUNT_ID}"
+                                                     for entry in MANIFEST)
+    assert all(len(statements) == 1 for statements in lambda_client.policies.values())
+    assert all(policies == {lambda_creator.BASIC_EXECUTION_POLICY_ARN} for policies in iam_client.attached.values())
+
+
+def test_retries_while_the_role_can_not_be_assumed(tmp_path):
+    iam_client = FakeIamClient(propagation_seconds=0.3)
+    lambda_client = FakeLambdaClient(iam_client)
+    entry = MANIFEST[0]
+    lambda_creator.create_lambda_function_and_its_resources(REGION, ACCOUNT_ID, entry["custom_name"],
+                                                            entry["code_path"], iam_client, lambda_client,
+                                                            cache_directory=str(tmp_path))
+
+    assert lambda_client.calls["CreateFunction"] > 1
+    assert len(lambda_client.functions) == 1
+
+
+def test_other_errors_are_not_retried():
+    calls = []
+
+    def _fails(**kwargs):
+        calls.append(kwargs)
+        raise FakeIamClient.exceptions.NoSuchEntityException("The role cannot be found.")
+
+    with pytest.raises(FakeIamClient.exceptions.NoSuchEntityException):
+        lambda_creator.call_with_backoff(_fails, RoleName="role")
+    assert len(calls) == 1
+
+
+def test_errors_without_a_response_are_raised_as_they_are():
+    calls = []
+
+    def _times_out(**kwargs):
+        calls.append(kwargs)
+        raise ReadTimeoutError(endpoint_url="https://lambda")
+
+    with pytest.raises(ReadTimeoutError):
+        lambda_creator.call_with_backoff(_times_out, FunctionName="function")
+    assert len(calls) == 1
+
+
+def test_teardown_is_idempotent(tmp_path):
+    iam_client = FakeIamClient()
+    lambda_client = FakeLambdaClient(iam_client)
+    lambda_creator.provision_lambdas(MANIFEST, REGION, ACCOUNT_ID, iam_client, lambda_client,
+                                     cache_directory=str(tmp_path))
+
+    lambda_creator.teardown_lambdas(MANIFEST, REGION, ACCOUNT_ID, iam_client, lambda_client)
+    lambda_creator.teardown_lambdas(MANIFEST, REGION, ACCOUNT_ID, iam_client, lambda_client)
+    assert lambda_client.functions == {}
+    assert iam_client.roles == {}
+
+
+def test_teardown_removes_a_role_without_the_policy():
+    iam_client = FakeIamClient()
+    lambda_client = FakeLambdaClient(iam_client)
+    entry = MANIFEST[0]
+    # A provisioning run that stopped between creating the role and attaching the policy
+    iam_client.create_role(RoleName=f"{entry['custom_name']}-lambda-role-{REGION}-{ACCOUNT_ID}",
+                           AssumeRolePolicyDocument="{}")
+
+    lambda_creator.remove_lambda_function_and_its_resources(REGION, ACCOUNT_ID, entry["custom_name"], iam_client,
+                                                            lambda_client)
+    assert iam_client.roles == {}
+
+
+def test_zip_is_deterministic_and_unix():
+    files = lambda_creator.package_files(MANIFEST[0]["code_path"])
+    content = lambda_creator.build_deterministic_zip(files)
+    assert content == lambda_creator.build_deterministic_zip(dict(reversed(list(files.items()))))
+    with zipfile.ZipFile(io.BytesIO(content)) as z:
+        assert [info.filename for info in z.infolist()] == sorted(files)
+        assert all(info.create_system == 3 and info.external_attr == 0o644 << 16 for info in z.infolist())
+        assert all(info.date_time == lambda_creator.ZIP_TIMESTAMP for info in z.infolist())
@@ -0,0 +1,91 @@
+import pytest
+from botocore.exceptions import EndpointConnectionError, ParamValidationError
+
+from bring_a_crew_bedrock.action_agent import ActionAgent
+from bring_a_crew_bedrock.model_router import ModelRouter, RoutedBedrockClient, is_failover_error
+from bring_a_crew_bedrock.rate_limiter import AdaptiveRateLimiter, set_rate_limiter
+
+
+class RegionClient:
+    """Answers with its region, or raises the error it was given."""
+    def __init__(self, region_name, error=None):
+        self.region_name = region_name
+        self.error = error
+        self.calls = []
+
+    def converse(self, **request):
+        self.calls.append(request["modelId"])
+        if self.error is not None:
+            raise self.error
+        return {"output": {"message": {"role": "assistant", "content": [{"text": self.region_name}]}}}
+
+
+@pytest.fixture(autouse=True)
+def limiter():
+    set_rate_limiter(AdaptiveRateLimiter(1000, 10_000_000))
+    yield
+    set_rate_limiter(None)
+
+
+def _router():
+    return ModelRouter.from_config({"default": [{"model_id": "model-a", "region_name": "eu-west-1"},
+                                                {"model_id": "model-b", "region_name": "eu-central-1"}]})
+
+
+def test_failover_errors():
+    throttled = Exception("throttled")
+    throttled.response = {"Error": {"Code": "ThrottlingException"}}
+    assert is_failover_error(throttled)
+    assert is_failover_error(EndpointConnectionError(endpoint_url="https://bedrock"))
+    assert not is_failover_error(ParamValidationError(report="missing modelId"))
+    assert not is_failover_error(KeyError("output"))
+
+
+def test_connection_error_fails_over_to_the_next_region():
+    clients = {"eu-west-1": RegionClient("eu-west-1", EndpointConnectionError(endpoint_url="https://bedrock")),
+               "eu-central-1": RegionClient("eu-central-1")}
+    client = RoutedBedrockClient(_router(), "tester", client_factory=clients.get)
+    response = client.converse(modelId="ignored", messages=[])
+    assert response["output"]["message"]["content"][0]["text"] == "eu-central-1"
+    assert clients["eu-west-1"].calls == ["model-a"]
+    assert clients["eu-central-1"].calls == ["model-b"]
+
+
+def test_invalid_request_does_not_fail_over():
+    clients = {"eu-west-1": RegionClient("eu-west-1", ParamValidationError(report="missing messages")),
+               "eu-central-1": RegionClient("eu-central-1")}
+    client = RoutedBedrockClient(_router(), "tester", client_factory=clients.get)
+    with pytest.raises(ParamValidationError):
+        client.converse(modelId="ignored", messages=[])
+    assert clients["eu-central-1"].calls == []
+
+
+def test_agent_refuses_a_client_and_a_router():
+    with pytest.raises(Exception, match="either a client or a router"):
+        ActionAgent("tester", "You answer.", {}, client=RegionClient("eu-west-1"), router=_router())
+
+
+def test_llm_call_span_names_the_target_that_served_it():
+    import asyncio
+
+    from bring_a_crew_bedrock.bedrock_clients import clear_bedrock_clients, set_bedrock_client
+    from bring_a_crew_bedrock.tracing import LLM_CALL, Tracer, use_tracer
+
+    set_bedrock_client(RegionClient("eu-west-1", EndpointConnectionError(endpoint_url="https://bedrock")),
+                       region_name="eu-west-1")
+    set_bedrock_client(RegionClient("Answer: done"), region_name="eu-central-1")
+    try:
+        agent = ActionAgent("tester", "You answer.", {}, router=_router())
+        tracer = Tracer()
+        with use_tracer(tracer):
+            assert agent.perform_action("Question") == "done"
+            assert asyncio.run(agent.perform_action_async("Question")) == "done"
+    finally:
+        clear_bedrock_clients()
+
+    calls = [span for span in tracer.spans if span.name == LLM_CALL]
+    assert len(calls) == 2
+    for span in calls:
+        assert span.attributes["model"] == "model-b"
+        assert span.attributes["region_name"] == "eu-central-1"
+    assert [span.attributes["failovers"] for span in calls] == [1, 0]
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from bring_a_crew_bedrock.plan_executor import PlanError, parse_plan
+from bring_a_crew_bedrock.team.orchestration_agent import OrchestrationAgent
+
+PLAN = '{"steps": [{"id": "1", "agent": "room_manager", "request": "Is room A free?"}]}'
+
+
+class ScriptedClient:
+    """Answers every converse call with the next text and records the last user message of each call."""
+    handles_rate_limits = True
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def converse(self, **request):
+        self.prompts.append(request["messages"][-1]["content"][0]["text"])
+        return {"output": {"message": {"role": "assistant", "content": [{"text": self.replies.pop(0)}]}}}
+
+
+class FakeAgent:
+    name = "room_manager"
+    intro = "Checks the availability of rooms."
+    action_specs = {}
+
+    def clone(self):
+        return self
+
+    def perform_action(self, command):
+        return "Room A is free"
+
+    async def perform_action_async(self, command):
+        return self.perform_action(command)
+
+
+def _orchestrator(client):
+    return OrchestrationAgent("orchestrator", "Plans meetings.", [FakeAgent()], planning=True, client=client,
+                              prompt_caching=False)
+
+
+def test_replan_cannot_reuse_completed_step_ids():
+    with pytest.raises(PlanError, match="completed"):
+        parse_plan(PLAN, {"room_manager"}, completed={"1": "Room A is free"})
+
+
+def test_plan_answer_asks_again_when_the_reply_has_no_answer():
+    client = ScriptedClient(PLAN, PLAN, "Answer: Room A is free")
+    assert _orchestrator(client).call_agent("Is room A free?") == "Room A is free"
+    assert "do not plan again" in client.prompts[-1]
+
+
+def test_plan_answer_without_answer_twice_is_a_planning_failure():
+    client = ScriptedClient(PLAN, PLAN, PLAN)
+    with pytest.raises(Exception, match="No final answer"):
+        _orchestrator(client).call_agent("Is room A free?")
+
+
+def test_async_plan_answer_asks_again_when_the_reply_has_no_answer():
+    client = ScriptedClient(PLAN, "Thought: all done", "Answer: Room A is free")
+    answer = asyncio.run(_orchestrator(client).call_agent_async("Is room A free?"))
+    assert answer == "Room A is free"
@@ -0,0 +1,61 @@
+import pytest
+from botocore.exceptions import EndpointConnectionError, ParamValidationError, ReadTimeoutError
+
+from bring_a_crew_bedrock.rate_limiter import AdaptiveRateLimiter, RateLimitedBedrockClient
+
+
+class FlakyClient:
+    """Raises the given errors on the first calls, then answers."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def converse(self, **request):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"output": {"message": {"role": "assistant", "content": [{"text": "ok"}]}},
+                "usage": {"inputTokens": 1, "outputTokens": 1, "totalTokens": 2}}
+
+
+def _limited(client, max_retries=3):
+    return RateLimitedBedrockClient(client, limiter=AdaptiveRateLimiter(1000, 10_000_000), max_retries=max_retries,
+                                    backoff_base_seconds=0.0)
+
+
+def test_connection_and_read_timeout_errors_are_retried():
+    client = FlakyClient(EndpointConnectionError(endpoint_url="https://bedrock"),
+                         ReadTimeoutError(endpoint_url="https://bedrock"))
+    response = _limited(client).converse(modelId="model", messages=[])
+    assert response["output"]["message"]["content"][0]["text"] == "ok"
+    assert client.calls == 3
+
+
+def test_connection_errors_are_raised_after_max_retries():
+    client = FlakyClient(*[EndpointConnectionError(endpoint_url="https://bedrock") for _ in range(3)])
+    with pytest.raises(EndpointConnectionError):
+        _limited(client, max_retries=2).converse(modelId="model", messages=[])
+    assert client.calls == 3
+
+
+def test_other_errors_are_not_retried():
+    client = FlakyClient(ParamValidationError(report="missing modelId"))
+    with pytest.raises(ParamValidationError):
+        _limited(client).converse(modelId="model", messages=[])
+    assert client.calls == 1
+
+
+def test_cache_hits_do_not_use_the_quota():
+    from bring_a_crew_bedrock.action_agent import ActionAgent
+    from bring_a_crew_bedrock.llm_cache import CachingBedrockClient, ResponseCache
+
+    limiter = AdaptiveRateLimiter(1000, 10_000_000)
+    client = CachingBedrockClient(RateLimitedBedrockClient(FlakyClient(), limiter=limiter), ResponseCache())
+    agent = ActionAgent("tester", "You answer.", {}, client=client)
+    assert agent.client is client
+
+    request = {"modelId": "model", "messages": [], "inferenceConfig": {"temperature": 0}}
+    client.converse(**request)
+    client.converse(**request)
+    assert client.client.client.calls == 1
+    assert limiter.stats()["model"]["requests"] == 1
@@ -0,0 +1,140 @@
+from bring_a_crew_bedrock.action_agent import ActionAgent
+from bring_a_crew_bedrock.react_parser import ReActParser, parse_response, stream_react_turn
+
+
+class ScriptedStream:
+    """A converse_stream stream that yields the text deltas and records how far it was read and if it was closed."""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        yield {"messageStart": {"role": "assistant"}}
+        for chunk in self.chunks:
+            self.read += 1
+            yield {"contentBlockDelta": {"delta": {"text": chunk}, "contentBlockIndex": 0}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {"metadata": {"usage": {"inputTokens": 10, "outputTokens": 5}, "metrics": {"latencyMs": 1}}}
+
+    def close(self):
+        self.closed = True
+
+
+class ScriptedStreamClient:
+    """Answers every converse_stream call with the next list of chunks."""
+    handles_rate_limits = True
+
+    def __init__(self, *turns):
+        self.turns = list(turns)
+        self.streams = []
+
+    def converse_stream(self, **request):
+        stream = ScriptedStream(self.turns.pop(0))
+        self.streams.append(stream)
+        return {"stream": stream}
+
+
+def test_action_is_only_completed_when_its_line_is():
+    parser = ReActParser()
+    assert parser.feed('Thought: look it up\nAction: lookup: {"na') == []
+    assert parser.feed('me": "Bob"}') == []
+    assert parser.feed('\nThou') == [("lookup", '{"name": "Bob"}')]
+    assert parser.actions == [("lookup", '{"name": "Bob"}')]
+    assert not parser.done
+
+
+def test_pause_ends_the_read():
+    parser = ReActParser()
+    actions = parser.feed('Action: lookup: {}\nPAUSE\nAction: ignored: {}\n')
+    assert actions == [("lookup", "{}")]
+    assert parser.done
+    assert parser.text == "Action: lookup: {}"
+    assert parser.feed("Action: later: {}\n") == []
+
+
+def test_finished_answer_ends_the_read():
+    parser = ReActParser()
+    parser.feed("Thought: done\nAnswer: 4")
+    assert parser.answer is None and not parser.done
+    parser.feed("2 people\nAction: ignored: {}\n")
+    assert parser.answer == "42 people"
+    assert parser.done
+    assert parser.actions == []
+
+
+def test_action_without_trailing_newline_is_completed_on_close():
+    parser = ReActParser()
+    assert parser.feed("Action: lookup: {}") == []
+    assert parser.close() == [("lookup", "{}")]
+    assert parser.done
+
+
+def test_parse_response_matches_a_complete_response():
+    parsed = parse_response("Thought: two things\nAction: a: {}\nAction: b: {\"x\": 1}")
+    assert parsed.actions == [("a", "{}"), ("b", '{"x": 1}')]
+    assert parsed.answer is None
+
+
+def test_stream_dispatches_actions_while_reading():
+    client = ScriptedStreamClient(["Action: a: {}\nAct", "ion: b: {}\nPAUSE\n", "Action: c: {}\n"])
+    started = []
+    parsed = stream_react_turn(client, {}, lambda index, action, action_input: started.append((index, action)))
+    assert started == [(0, "a"), (1, "b")]
+    # The stream stops at PAUSE, the chunk after it is never read
+    assert client.streams[0].read == 2
+    assert client.streams[0].closed
+    assert parsed.usage is None
+
+
+def test_stream_with_max_actions_closes_early():
+    client = ScriptedStreamClient(["Action: a: {}\n", "Action: b: {}\n", "PAUSE\n"])
+    started = []
+    parsed = stream_react_turn(client, {}, lambda index, action, action_input: started.append(action),
+                               max_actions=1)
+    assert started == ["a"]
+    assert parsed.actions == [("a", "{}")]
+    assert client.streams[0].read == 1
+    assert client.streams[0].closed
+
+
+def test_stream_completes_last_action_without_newline():
+    client = ScriptedStreamClient(["Thought: one more\n", "Action: a: {}"])
+    started = []
+    parsed = stream_react_turn(client, {}, lambda index, action, action_input: started.append(action))
+    assert started == ["a"]
+    # Read to the end, so the metadata event was seen
+    assert parsed.usage == {"inputTokens": 10, "outputTokens": 5}
+    assert client.streams[0].closed
+
+
+def _agent(client, parallel_actions):
+    calls = []
+
+    def lookup(name):
+        calls.append(name)
+        return f"{name} is available"
+
+    actions = {"lookup": {"description": "Look up the availability of a person.", "function": lookup,
+                          "arguments": [{"name": "name", "type": "str"}]}}
+    agent = ActionAgent("tester", "You look up people.", actions, parallel_actions=parallel_actions, stream=True,
+                        client=client)
+    return agent, calls
+
+
+def test_agent_streaming_runs_one_action_per_turn_without_parallel_actions():
+    client = ScriptedStreamClient(['Action: lookup: {"name": "Bob"}\n', 'Action: lookup: {"name": "Ann"}\n'],
+                                  ["Answer: Bob is available\n"])
+    agent, calls = _agent(client, parallel_actions=False)
+    assert agent.perform_action("Is Bob available?") == "Bob is available"
+    assert calls == ["Bob"]
+    assert client.streams[0].read == 1 and client.streams[0].closed
+    assert agent.memory[1]["content"][0]["text"] == 'Action: lookup: {"name": "Bob"}'
+
+
+def test_agent_streaming_runs_all_actions_of_a_turn_with_parallel_actions():
+    client = ScriptedStreamClient(['Action: lookup: {"name": "Bob"}\nAction: look', 'up: {"name": "Ann"}'],
+                                  ["Answer: Both are available"])
+    agent, calls = _agent(client, parallel_actions=True)
+    assert agent.perform_action("Are Bob and Ann available?") == "Both are available"
+    assert sorted(calls) == ["Ann", "Bob"]
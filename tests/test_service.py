@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from bring_a_crew_bedrock.service import SessionService, create_handler
+
+
+class FakeAgent:
+    """Answers every question with its text, a question "fail" raises."""
+    def __init__(self):
+        self.questions = []
+
+    async def call_agent_async(self, question):
+        self.questions.append(question)
+        if question == "fail":
+            raise Exception("The agent failed")
+        return f"Answer to {question}"
+
+
+async def _request(port: int, method: str, path: str, body: bytes = b"") -> tuple:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), head.decode("latin-1"), content
+
+
+def _events(content: bytes) -> list:
+    """The server-sent events of a chunked response, as (event, data) tuples."""
+    events = []
+    for block in content.decode("utf-8").split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if line.startswith(("event: ", "data: ")))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _run(test, read_timeout_seconds: float = 5):
+    async def _main():
+        service = SessionService(FakeAgent)
+        server = await asyncio.start_server(create_handler(service, read_timeout_seconds), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await test(service, port)
+    return asyncio.run(_main())
+
+
+def test_create_session():
+    async def _test(service, port):
+        status, _, content = await _request(port, "POST", "/sessions")
+        assert status == 201
+        assert json.loads(content)["session_id"] in service.sessions
+    _run(_test)
+
+
+def test_message_streams_started_and_answer_events():
+    async def _test(service, port):
+        _, _, content = await _request(port, "POST", "/sessions")
+        session_id = json.loads(content)["session_id"]
+        status, head, content = await _request(port, "POST", f"/sessions/{session_id}/messages",
+                                               json.dumps({"message": "Book a room"}).encode())
+        assert status == 200
+        assert "text/event-stream" in head
+        assert _events(content) == [("started", {"session_id": session_id}),
+                                    ("answer", {"session_id": session_id, "answer": "Answer to Book a room"})]
+        assert service.metrics()["questions_total"] == 1
+    _run(_test)
+
+
+def test_failing_question_streams_an_error_event():
+    async def _test(service, port):
+        _, _, content = await _request(port, "POST", "/sessions")
+        session_id = json.loads(content)["session_id"]
+        _, _, content = await _request(port, "POST", f"/sessions/{session_id}/messages",
+                                       json.dumps({"message": "fail"}).encode())
+        assert _events(content)[-1] == ("error", {"session_id": session_id, "error": "The agent failed"})
+        assert service.metrics()["errors_total"] == 1
+    _run(_test)
+
+
+def test_bad_json_is_a_bad_request():
+    async def _test(service, port):
+        _, _, content = await _request(port, "POST", "/sessions")
+        session_id = json.loads(content)["session_id"]
+        status, _, content = await _request(port, "POST", f"/sessions/{session_id}/messages", b"{not json")
+        assert status == 400
+        assert json.loads(content) == {"error": "Expected a JSON body with a message"}
+    _run(_test)
+
+
+def test_delete_ends_the_session():
+    async def _test(service, port):
+        _, _, content = await _request(port, "POST", "/sessions")
+        session_id = json.loads(content)["session_id"]
+        status, _, content = await _request(port, "DELETE", f"/sessions/{session_id}")
+        assert status == 204 and content == b""
+        assert service.sessions == {}
+        status, _, _ = await _request(port, "DELETE", f"/sessions/{session_id}")
+        assert status == 404
+    _run(_test)
+
+
+def test_silent_client_is_disconnected():
+    async def _test(service, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"POST /sessions HTTP/1.1\r\n")
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 2)
+        writer.close()
+        assert response.startswith(b"HTTP/1.1 408 Request Timeout")
+    _run(_test, read_timeout_seconds=0.2)
@@ -0,0 +1,114 @@
+from datetime import date
+
+from bring_a_crew_bedrock.speculation import Speculation, SpeculationBatch, predict_delegations
+
+QUESTION = "Organise a meeting between Bob and Alice on 2026-10-20 in the morning for 2 people, book a room."
+AGENTS = {"schedule_manager": None, "room_manager": None}
+
+
+class CountingSpeculator:
+    def __init__(self):
+        self.hits = []
+
+    def record_hit(self, speculation):
+        self.hits.append(speculation)
+
+    def record_waste(self, speculation):
+        pass
+
+
+def _room_speculation() -> Speculation:
+    return [speculation for speculation in predict_delegations(QUESTION, AGENTS, date(2026, 10, 14))
+            if speculation.agent == "room_manager"][0]
+
+
+def test_predicts_the_read_only_delegations():
+    speculations = predict_delegations(QUESTION, AGENTS, date(2026, 10, 14))
+    assert [speculation.request for speculation in speculations] == [
+        "Check the availability of Bob for the week starting 2026-10-19",
+        "Check the availability of Alice for the week starting 2026-10-19",
+        "Check for an available room for 2 people on 2026-10-20 in the morning"]
+    assert speculations[0].action == "check_availability"
+    assert speculations[0].arguments == {"date": "2026-10-19", "person": "Bob"}
+
+
+def test_same_read_request_matches():
+    speculation = _room_speculation()
+    assert speculation.matches("room_manager", "Check the availability of a room for 2 people on 2026-10-20")
+    assert not speculation.matches("schedule_manager", "Check the availability of a room for 2 people on 2026-10-20")
+
+
+def test_booking_does_not_match_the_read():
+    speculation = _room_speculation()
+    assert not speculation.matches("room_manager", "Book the available room for 2 people on 2026-10-20")
+    assert not speculation.matches("room_manager", "Reserve an available room for 2 people on 2026-10-20")
+
+
+def test_headcount_does_not_match_a_date():
+    speculation = _room_speculation()
+    assert not speculation.matches("room_manager", "Check the availability of a room for 4 people on 2026-10-20")
+    assert not speculation.matches("room_manager", "Check the availability of a room for 12 people on 2026-10-20")
+
+
+def test_request_for_more_people_does_not_match_one_person():
+    bob = predict_delegations(QUESTION, AGENTS, date(2026, 10, 14))[0]
+    assert bob.matches("schedule_manager", "Check the availability of Bob for the week starting 2026-10-19")
+    assert not bob.matches("schedule_manager",
+                           "Check the availability of Bob and Alice for the week starting 2026-10-19")
+
+
+def test_structured_call_matches_on_action_and_arguments():
+    speculation = _room_speculation()
+    arguments = {"req_date": "2026-10-20", "timeslot": "Morning", "number_of_people": "2"}
+    assert speculation.matches_call("room_manager", "check_available_room", arguments)
+    assert not speculation.matches_call("room_manager", "book_room", arguments)
+    assert not speculation.matches_call("room_manager", "check_available_room", dict(arguments, number_of_people=4))
+    assert not speculation.matches_call("room_manager", "check_available_room", ["2026-10-20"])
+
+
+def test_a_speculation_is_claimed_once():
+    speculator = CountingSpeculator()
+    speculation = _room_speculation()
+    speculation.future = object()
+    batch = SpeculationBatch(speculator, [speculation])
+    request = "Check for an available room for 2 people on 2026-10-20 in the morning"
+    assert batch.claim("room_manager", request) is speculation.future
+    assert batch.claim("room_manager", request) is None
+    assert batch.claim_call("room_manager", "check_available_room", speculation.arguments) is None
+    assert speculator.hits == [speculation]
+
+
+class ScriptedClient:
+    """Answers every converse call with the next text."""
+    handles_rate_limits = True
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.calls = 0
+
+    def converse(self, **request):
+        self.calls += 1
+        return {"output": {"message": {"role": "assistant", "content": [{"text": self.texts.pop(0)}]}}}
+
+
+def test_structured_delegation_uses_the_speculation_without_llm_turns():
+    from bring_a_crew_bedrock.speculation import Speculator
+    from bring_a_crew_bedrock.team.orchestration_agent import OrchestrationAgent
+    from bring_a_crew_bedrock.team.schedule_manager_action_agent import create_agent
+
+    schedule_manager = create_agent(client=ScriptedClient())
+    orchestrator_client = ScriptedClient(
+        'Action: schedule_manager.check_availability: {"date": "2026-10-19", "person": "Bob"}',
+        "Answer: Bob is available on Tuesday")
+    speculator = Speculator(today=date(2026, 10, 14))
+    orchestrator = OrchestrationAgent("orchestrator", "Plans meetings", [schedule_manager], client=orchestrator_client,
+                                      speculator=speculator, structured_delegation=True)
+
+    answer = orchestrator.call_agent("Organise a meeting with Bob next week.")
+    assert answer == "Bob is available on Tuesday"
+    assert orchestrator_client.calls == 2
+    # The speculation called the action directly and the structured delegation used its result
+    assert schedule_manager.client.calls == 0
+    assert speculator.stats()["hits"] == 1
+    assert speculator.stats()["wasted"] == 0
+    assert "Bob is available in the week starting with 2026-10-19" in orchestrator.memory[2]["content"][0]["text"]
@@ -0,0 +1,49 @@
+from bring_a_crew_bedrock.tracing import LLM_CALL, QUESTION, TOOL, Tracer
+
+
+class ListExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+def test_spans_are_kept_per_trace_without_exporter():
+    tracer = Tracer()
+    with tracer.span(QUESTION) as first:
+        with tracer.span(LLM_CALL) as call:
+            call.set(input_tokens=10, output_tokens=2)
+    with tracer.span(QUESTION) as second:
+        with tracer.span(TOOL):
+            pass
+
+    assert [span.name for span in tracer.trace(first.trace_id)] == [QUESTION, LLM_CALL]
+    assert [span.name for span in tracer.trace(second.trace_id)] == [QUESTION, TOOL]
+    assert len(tracer.spans) == 4
+    assert tracer.token_totals(first.trace_id)["input_tokens"] == 10
+    assert tracer.token_totals(second.trace_id)["llm_calls"] == 0
+
+
+def test_exported_traces_are_dropped():
+    exporter = ListExporter()
+    tracer = Tracer(exporter)
+    for _ in range(100):
+        with tracer.span(QUESTION):
+            with tracer.span(LLM_CALL):
+                pass
+
+    assert len(exporter.traces) == 100
+    assert all([span.name for span in spans] == [QUESTION, LLM_CALL] for spans in exporter.traces)
+    assert tracer.spans == []
+
+
+def test_root_span_records_the_error():
+    exporter = ListExporter()
+    tracer = Tracer(exporter)
+    try:
+        with tracer.span(QUESTION):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert exporter.traces[0][0].attributes["error"] == "boom"